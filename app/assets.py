@@ -0,0 +1,161 @@
+"""
+Static asset pipeline: content-hashed file names and precompressed copies.
+
+build() copies every file under app/static (except uploads) to
+app/static/build/<dir>/<name>.<hash><ext>, writes .gz and .br siblings for
+text formats, and records "css/invoice_print.css" -> "build/css/invoice_print.<hash>.css"
+in build/manifest.json. It runs at startup (STATIC_BUILD_ON_STARTUP) and
+from scripts/build_assets.py; unchanged files are not rewritten, so several
+workers building at once is harmless.
+
+Templates call {{ static_url("css/invoice_print.css") }}. A changed file
+gets a new name, so CachedStaticFiles can serve build/ with an immutable
+one-year lifetime and pick the precompressed sibling the browser accepts.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # gzip siblings only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = Path("app/static")
+BUILD_DIR = "build"
+MANIFEST_NAME = "manifest.json"
+HASH_LENGTH = 12
+
+# Formats worth precompressing (images and fonts are compressed already)
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".mjs", ".map", ".json", ".svg", ".ico", ".txt", ".xml", ".html", ".webmanifest"}
+MIN_COMPRESS_BYTES = 256
+
+# Superseded fingerprinted files are kept this long for pages still cached by browsers
+STALE_BUILD_SECONDS = 7 * 24 * 3600
+
+_manifest: Dict[str, str] = {}
+
+
+def _write_atomic(target: Path, data: bytes) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix=".asset-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _sources(static_dir: Path):
+    skip = {(static_dir / BUILD_DIR).resolve(), Path(settings.UPLOADS_PATH).resolve()}
+    pending = [static_dir]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if Path(entry.path).resolve() not in skip:
+                        pending.append(Path(entry.path))
+                elif entry.is_file():
+                    yield Path(entry.path)
+
+
+def _compressed_siblings(target: Path, data: bytes) -> None:
+    if target.suffix.lower() not in COMPRESSIBLE_SUFFIXES or len(data) < MIN_COMPRESS_BYTES:
+        return
+    variants = [(".gz", lambda: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", lambda: brotli.compress(data, quality=11)))
+    for suffix, compress in variants:
+        sibling = target.with_name(target.name + suffix)
+        if sibling.exists():
+            continue
+        packed = compress()
+        if len(packed) < len(data):
+            _write_atomic(sibling, packed)
+
+
+def _prune(build_dir: Path, live: set) -> int:
+    cutoff = time.time() - STALE_BUILD_SECONDS
+    removed = 0
+    for path in build_dir.rglob("*"):
+        if not path.is_file() or path.name == MANIFEST_NAME:
+            continue
+        base = path.name[:-len(path.suffix)] if path.suffix in (".gz", ".br") else path.name
+        if path.with_name(base) not in live and path.stat().st_mtime < cutoff:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def build(static_dir: Path = STATIC_DIR) -> Dict[str, str]:
+    """
+    Fingerprint every static file and write the manifest.
+
+    Returns:
+        The manifest: {path relative to static_dir: fingerprinted path}
+    """
+    global _manifest
+    build_dir = static_dir / BUILD_DIR
+    manifest: Dict[str, str] = {}
+    live = set()
+    for source in _sources(static_dir):
+        data = source.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+        relative = source.relative_to(static_dir)
+        target = build_dir / relative.parent / f"{source.stem}.{digest}{source.suffix}"
+        if not target.exists():
+            _write_atomic(target, data)
+        _compressed_siblings(target, data)
+        manifest[relative.as_posix()] = target.relative_to(static_dir).as_posix()
+        live.add(target)
+
+    _write_atomic(build_dir / MANIFEST_NAME, json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"))
+    removed = _prune(build_dir, live)
+    if removed:
+        logger.info(f"Removed {removed} superseded static build files")
+    _manifest = manifest
+    return manifest
+
+
+def load_manifest(static_dir: Path = STATIC_DIR) -> Dict[str, str]:
+    """Use a manifest written by an earlier build (e.g. at deploy time)."""
+    global _manifest
+    try:
+        _manifest = json.loads((static_dir / BUILD_DIR / MANIFEST_NAME).read_text("utf-8"))
+    except FileNotFoundError:
+        logger.warning("No static asset manifest; serving unversioned /static URLs")
+        _manifest = {}
+    return _manifest
+
+
+def in_manifest(path: str) -> bool:
+    """Whether the last build fingerprinted `path` (relative to app/static)."""
+    return path.lstrip("/") in _manifest
+
+
+def static_url(path: str) -> str:
+    """
+    URL of a file under app/static: {{ static_url("img/logo-w.png") }}.
+    Fingerprinted when the manifest knows the file, the plain path otherwise.
+    """
+    relative = path.lstrip("/")
+    if relative.startswith("static/"):
+        relative = relative[len("static/"):]
+    return f"/static/{_manifest.get(relative, relative)}"
@@ -12,6 +12,39 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./gst_billing.db")
+    # Startup refuses a database that is not at the Alembic head (run `alembic upgrade head`)
+    DB_SCHEMA_CHECK: bool = os.getenv("DB_SCHEMA_CHECK", "True").lower() == "true"
+    # Optional read replica for dashboard/report GETs (get_read_db); after a commit the
+    # client reads from the primary for this long, to cover replication lag
+    DATABASE_REPLICA_URL: str = os.getenv("DATABASE_REPLICA_URL", "")
+    DATABASE_REPLICA_STICKY_SECONDS: int = int(os.getenv("DATABASE_REPLICA_STICKY_SECONDS", "10"))
+    # Tenancy (app/tenancy.py): "shared" = one database, "database" = each shop's data in its own
+    # SQLite file under TENANT_DB_DIR or Postgres schema shop_<id> (split with scripts/split_tenants.py)
+    TENANCY_MODE: str = os.getenv("TENANCY_MODE", "shared")
+    TENANT_DB_DIR: str = os.getenv("TENANT_DB_DIR", "tenants")
+    TENANT_ENGINE_CACHE_SIZE: int = int(os.getenv("TENANT_ENGINE_CACHE_SIZE", "64"))  # open tenant databases per worker
+    TENANT_POOL_SIZE: int = int(os.getenv("TENANT_POOL_SIZE", "2"))
+    TENANT_MAX_OVERFLOW: int = int(os.getenv("TENANT_MAX_OVERFLOW", "8"))
+    # Connection pool (app/database.py): size + overflow per worker process must stay
+    # under the server's max_connections / workers; sync routes run on 40 threads
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT_SECONDS: int = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))  # under proxy/server idle timeouts; -1 = never
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+    # /health/db answers only ok/error; set to include pool counters (only where the
+    # endpoint is not reachable from the internet - it is unauthenticated)
+    DB_HEALTH_DETAILS: bool = os.getenv("DB_HEALTH_DETAILS", "False").lower() == "true"
+    # SQLite PRAGMAs set on every connection
+    DB_SQLITE_JOURNAL_MODE: str = os.getenv("DB_SQLITE_JOURNAL_MODE", "WAL")
+    DB_SQLITE_SYNCHRONOUS: str = os.getenv("DB_SQLITE_SYNCHRONOUS", "NORMAL")
+    DB_SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("DB_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    DB_SQLITE_CACHE_SIZE_KB: int = int(os.getenv("DB_SQLITE_CACHE_SIZE_KB", "20000"))  # page cache per connection
+    # SQLite writers take turns across threads and worker processes (app/write_queue.py)
+    DB_SQLITE_WRITE_QUEUE: bool = os.getenv("DB_SQLITE_WRITE_QUEUE", "True").lower() == "true"
+    DB_WRITE_QUEUE_TIMEOUT_SECONDS: int = int(os.getenv("DB_WRITE_QUEUE_TIMEOUT_SECONDS", "15"))
+    DB_WRITE_QUEUE_MAX_BATCH: int = int(os.getenv("DB_WRITE_QUEUE_MAX_BATCH", "64"))  # writes per group commit
+    DB_WRITE_QUEUE_WINDOW_MS: int = int(os.getenv("DB_WRITE_QUEUE_WINDOW_MS", "2"))  # wait this long for a batch to fill
     
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "supersecretkey-change-in-production")
@@ -27,13 +60,74 @@ class Settings(BaseSettings):
     S3_ACCESS_KEY_ID: str = os.getenv("S3_ACCESS_KEY_ID", "")
     S3_SECRET_ACCESS_KEY: str = os.getenv("S3_SECRET_ACCESS_KEY", "")
     S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL", "")  # For R2, MinIO, etc.
+    S3_MULTIPART_CHUNK_BYTES: int = int(os.getenv("S3_MULTIPART_CHUNK_BYTES", str(8 * 1024 * 1024)))
+    # Objects are private and served through presigned GET URLs valid this long;
+    # 0 = public-read objects and plain URLs (the bucket must allow ACLs)
+    S3_PRESIGNED_URL_SECONDS: int = int(os.getenv("S3_PRESIGNED_URL_SECONDS", "3600"))
+    # botocore connection pool: size it to the request threadpool (40 by default)
+    S3_MAX_POOL_CONNECTIONS: int = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "40"))
+    S3_CONNECT_TIMEOUT_SECONDS: int = int(os.getenv("S3_CONNECT_TIMEOUT_SECONDS", "5"))
+    S3_READ_TIMEOUT_SECONDS: int = int(os.getenv("S3_READ_TIMEOUT_SECONDS", "30"))
+    S3_MAX_ATTEMPTS: int = int(os.getenv("S3_MAX_ATTEMPTS", "3"))
+    # exists() remembers objects it has seen for this long (per process)
+    S3_EXISTS_CACHE_SECONDS: int = int(os.getenv("S3_EXISTS_CACHE_SECONDS", "300"))
+    S3_EXISTS_CACHE_SIZE: int = int(os.getenv("S3_EXISTS_CACHE_SIZE", "4096"))
     
     # PDF Generation
     PDF_ENGINE: str = os.getenv("PDF_ENGINE", "xhtml2pdf")  # "xhtml2pdf", "chromium", "wkhtmltopdf"
     
+    # Static assets (app/assets.py): fingerprint and precompress app/static at startup;
+    # set false when scripts/build_assets.py runs at deploy time instead
+    STATIC_BUILD_ON_STARTUP: bool = os.getenv("STATIC_BUILD_ON_STARTUP", "True").lower() == "true"
+    # Stylesheet (app/tailwind.py): "build" = compiled css/app.css from scripts/build_css.py,
+    # "cdn" = in-browser Tailwind compiler (development only), "auto" = build if compiled, else cdn
+    TAILWIND_MODE: str = os.getenv("TAILWIND_MODE", "auto")
+    
+    # Response compression (app/middleware/compression.py)
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "True").lower() == "true"
+    COMPRESSION_MIN_BYTES: int = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))  # below this, headers cost more than they save
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))  # ~gzip-6 speed, ~6% smaller on our pages
+    COMPRESSION_OFFLOAD_BYTES: int = int(os.getenv("COMPRESSION_OFFLOAD_BYTES", str(64 * 1024)))  # bigger bodies compress in a worker thread
+    COMPRESSION_STREAM_FLUSH_BYTES: int = int(os.getenv("COMPRESSION_STREAM_FLUSH_BYTES", str(16 * 1024)))
+    
     # File Paths
     UPLOADS_PATH: str = os.getenv("UPLOADS_PATH", "app/static/uploads")
-    DEFAULT_PLACEHOLDER_QR: str = os.getenv("DEFAULT_PLACEHOLDER_QR", "/static/img/qr_placeholder.png")
+    # Orphaned-upload GC (scripts/gc_uploads.py): files younger than this are kept,
+    # so uploads whose row isn't committed yet are never swept
+    UPLOAD_GC_GRACE_HOURS: int = int(os.getenv("UPLOAD_GC_GRACE_HOURS", "24"))
+    UPLOAD_GC_BATCH_SIZE: int = int(os.getenv("UPLOAD_GC_BATCH_SIZE", "500"))
+    DEFAULT_PLACEHOLDER_QR: str = os.getenv("DEFAULT_PLACEHOLDER_QR", "/static/img/qr_placeholder.print.png")
+    
+    # Fiscal-year archival (see app/services/archive_service.py)
+    ARCHIVE_PATH: str = os.getenv("ARCHIVE_PATH", "archive")  # SQLite: one DB file per archived year
+    ARCHIVE_TABLESPACE: str = os.getenv("ARCHIVE_TABLESPACE", "")  # Postgres: cold tablespace for closed partitions
+    ARCHIVE_GRACE_DAYS: int = int(os.getenv("ARCHIVE_GRACE_DAYS", "275"))  # FY end -> 31 Dec annual return due date
+    
+    # Invoice form typeahead: in-memory indexes are rebuilt after this many
+    # seconds so changes made by other worker processes show up
+    TYPEAHEAD_TTL_SECONDS: int = int(os.getenv("TYPEAHEAD_TTL_SECONDS", "60"))
+    
+    # Password hashing (see app/services/password_service.py)
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))  # existing hashes are upgraded on next login
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))  # 0 = thread executor, no subprocesses
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+    LOGIN_THROTTLE_WINDOW_SECONDS: int = int(os.getenv("LOGIN_THROTTLE_WINDOW_SECONDS", "900"))
+    LOGIN_MAX_ATTEMPTS_PER_IP: int = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_IP", "30"))
+    LOGIN_MAX_FAILURES_PER_EMAIL: int = int(os.getenv("LOGIN_MAX_FAILURES_PER_EMAIL", "5"))
+    
+    # Authenticated user/shop snapshots cached per access token; changes made
+    # by other worker processes are picked up after this many seconds
+    AUTH_CACHE_TTL_SECONDS: int = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "30"))
+    AUTH_CACHE_MAX_ENTRIES: int = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+    
+    # Access-token revocation (see app/services/revocation_service.py); checked
+    # on every request, cached principal or not, so other workers' revocations
+    # apply within REVOCATION_REFRESH_SECONDS
+    REVOCATION_REFRESH_SECONDS: int = int(os.getenv("REVOCATION_REFRESH_SECONDS", "5"))
+    REVOCATION_REBUILD_SECONDS: int = int(os.getenv("REVOCATION_REBUILD_SECONDS", "3600"))
+    REVOCATION_BLOOM_CAPACITY: int = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+    REVOCATION_BLOOM_ERROR_RATE: float = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", "0.001"))
     
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
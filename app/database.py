@@ -1,19 +1,271 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, FrozenSet, Optional
+
+from fastapi import Depends
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.sql.util import find_tables
+from starlette.requests import Request
 from app.config import settings
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL, connect_args=connect_args
-    )
-else:
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///") or ":memory:" in url or "mode=memory" in url
+
+
+def sqlite_pragmas() -> Dict[str, str]:
+    """PRAGMAs run on every new SQLite connection (DB_SQLITE_* settings)."""
+    return {
+        # Readers no longer wait for writers (and vice versa); the journal mode is persistent
+        "journal_mode": settings.DB_SQLITE_JOURNAL_MODE,
+        # NORMAL is durable across application crashes in WAL mode, and skips an fsync per commit
+        "synchronous": settings.DB_SQLITE_SYNCHRONOUS,
+        # Wait for a lock instead of failing with "database is locked"
+        "busy_timeout": str(settings.DB_SQLITE_BUSY_TIMEOUT_MS),
+        # Negative = KiB of page cache per connection
+        "cache_size": str(-settings.DB_SQLITE_CACHE_SIZE_KB),
+    }
+
+
+def _apply_pragmas(engine: Engine, pragmas: Dict[str, str]) -> None:
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+# ========== POOL STATISTICS ==========
+
+class PoolStats:
+    """Counters fed by pool events; read with pool_stats()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+
+    def _increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def attach(self, engine: Engine) -> None:
+        event.listen(engine, "connect", lambda *args: self._increment("connects"))
+        event.listen(engine, "checkout", lambda *args: self._increment("checkouts"))
+        event.listen(engine, "invalidate", lambda *args: self._increment("invalidations"))
+
+
+def create_db_engine(url: str, pool_size: Optional[int] = None, max_overflow: Optional[int] = None,
+                     connect_args: Optional[dict] = None) -> Engine:
+    """
+    Engine configured from the DB_* settings: pool sizing, recycling and
+    pre-ping for file databases and servers, plus PRAGMAs on SQLite.
+    pool_size / max_overflow override the settings (per-tenant engines).
+    """
+    options = {}
+    connect_args = dict(connect_args or {})
+    if is_sqlite(url):
+        connect_args["check_same_thread"] = False
+        # sqlite3 busy wait before the first PRAGMA runs
+        connect_args["timeout"] = settings.DB_SQLITE_BUSY_TIMEOUT_MS / 1000
+    if not (is_sqlite(url) and _is_sqlite_memory(url)):
+        # In-memory SQLite uses a single shared connection; there is no pool to size
+        options.update(
+            pool_size=settings.DB_POOL_SIZE if pool_size is None else pool_size,
+            max_overflow=settings.DB_MAX_OVERFLOW if max_overflow is None else max_overflow,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    db_engine = create_engine(url, connect_args=connect_args, **options)
+    if is_sqlite(url):
+        pragmas = sqlite_pragmas()
+        if _is_sqlite_memory(url):
+            pragmas.pop("journal_mode")  # in-memory databases cannot use WAL
+        _apply_pragmas(db_engine, pragmas)
+    return db_engine
+
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
+_stats = PoolStats()
+_stats.attach(engine)
+
+
+def pool_stats(db_engine: Engine = engine, stats: PoolStats = _stats) -> dict:
+    """
+    Current pool occupancy plus lifetime counters, for /health/db.
+
+    checked_out near size + max_overflow means requests are queueing for a
+    connection (raise DB_POOL_SIZE); invalidations count connections
+    dropped by pre-ping or errors.
+    """
+    pool = db_engine.pool
+    report = {
+        "pool": type(pool).__name__,
+        "connects": stats.connects,
+        "checkouts": stats.checkouts,
+        "invalidations": stats.invalidations,
+    }
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if method is not None:
+            report[name] = method()
+    if hasattr(pool, "_max_overflow"):
+        report["max_overflow"] = pool._max_overflow
+    return report
+
+
+# ========== READ REPLICA ==========
+
+PRIMARY_READS_COOKIE = "primary_reads_until"
+_WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER", "TRUNCATE")
+
+# Set by the read-your-writes middleware: a dict shared with the request's
+# worker threads, where mark_written() records a commit
+request_writes: ContextVar[Optional[dict]] = ContextVar("request_writes", default=None)
+
+
+def _is_write(clause) -> bool:
+    if isinstance(clause, UpdateBase):
+        return True
+    return isinstance(clause, TextClause) and clause.text.lstrip().upper().startswith(_WRITE_PREFIXES)
+
+
+class RoutingSession(Session):
+    """
+    Session that reads from the replica and writes to the primary.
+
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary;
+    after the first one, the session reads from the primary too, so it sees
+    its own changes.
+    """
+
+    def __init__(self, primary: Engine, replica: Optional[Engine] = None, use_replica: bool = True, **kwargs):
+        kwargs.pop("bind", None)  # sessionmaker always passes one
+        super().__init__(bind=primary, **kwargs)
+        self.primary = primary
+        self.replica = replica
+        self.use_replica = use_replica and replica is not None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.use_replica and (self._flushing or _is_write(clause)):
+            self.use_replica = False
+        return self.replica if self.use_replica else self.primary
+
+
+def mark_written() -> None:
+    """
+    Record that the current request committed a write, so the client's
+    next reads go to the primary (read-your-writes). Sessions from this
+    module call it on commit; code that commits elsewhere calls it itself.
+    """
+    writes = request_writes.get()
+    if writes is not None:
+        writes["at"] = time.time()
+
+
+def reads_own_writes(request: Request) -> bool:
+    """Whether the client committed within DATABASE_REPLICA_STICKY_SECONDS (primary-reads cookie)."""
+    try:
+        return float(request.cookies.get(PRIMARY_READS_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+replica_engine = create_db_engine(settings.DATABASE_REPLICA_URL) if settings.DATABASE_REPLICA_URL else None
+_replica_stats = PoolStats()
+if replica_engine is not None:
+    _replica_stats.attach(replica_engine)
+
+
+def replica_pool_stats() -> Optional[dict]:
+    return pool_stats(replica_engine, _replica_stats) if replica_engine is not None else None
+
+
+# ========== DATABASE PER TENANT ==========
+
+def _statement_tables(clause) -> set:
+    if isinstance(clause, UpdateBase):
+        return {clause.table.name}
+    return {table.name for table in find_tables(clause, include_crud=True) if hasattr(table, "name")}
+
+
+class TenantSession(Session):
+    """
+    Session whose shop-data tables (app/tenancy.py) can live in the shop's
+    own database.
+
+    With tenant_tables set (TENANCY_MODE=database), queries on those tables
+    and raw SQL go to the engine given to bind_tenant(); users, shops and
+    the other shared tables stay on the main engine. Without it this is a
+    plain Session.
+    """
+
+    def __init__(self, *args, tenant_tables: FrozenSet[str] = frozenset(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tenant_tables = tenant_tables
+        self.tenant_engine: Optional[Engine] = None
+
+    def bind_tenant(self, tenant_engine: Engine) -> None:
+        if self.tenant_engine is not None and self.tenant_engine is not tenant_engine:
+            raise RuntimeError("Session is already bound to another shop's database")
+        self.tenant_engine = tenant_engine
+
+    def _is_tenant_statement(self, mapper, clause) -> bool:
+        if mapper is not None and any(table.name in self.tenant_tables for table in mapper.tables):
+            return True
+        if isinstance(clause, TextClause):
+            # Raw SQL (search_documents) is shop data once a shop is known
+            return self.tenant_engine is not None
+        return clause is not None and not self.tenant_tables.isdisjoint(_statement_tables(clause))
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.tenant_tables and self._is_tenant_statement(mapper, clause):
+            if self.tenant_engine is None:
+                raise RuntimeError("Shop data queried before the shop's database was resolved")
+            return self.tenant_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+SessionLocal = sessionmaker(class_=TenantSession, autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(class_=RoutingSession, primary=engine, replica=replica_engine,
+                                autocommit=False, autoflush=False)
+
+
+def _track_writes(session_factory) -> None:
+    @event.listens_for(session_factory, "after_flush")
+    def note_flush(session, flush_context):
+        session.info["wrote"] = True
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def note_write_statement(orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            orm_execute_state.session.info["wrote"] = True
+
+    @event.listens_for(session_factory, "after_commit")
+    def note_commit(session):
+        if session.info.pop("wrote", False):
+            mark_written()
+
+
+_track_writes(SessionLocal)
+_track_writes(ReadSessionLocal)
 
 Base = declarative_base()
 
@@ -23,3 +275,21 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db(request: Request, db: Session = Depends(get_db)):
+    """
+    get_db for read-mostly pages (dashboard, reports): GET requests read
+    from DATABASE_REPLICA_URL when one is configured, unless this client
+    has just written something. Without a replica, or with a database per
+    tenant, this is the request's get_db session.
+    """
+    if replica_engine is None or settings.TENANCY_MODE.lower() == "database":
+        yield db
+        return
+    use_replica = request.method in ("GET", "HEAD") and not reads_own_writes(request)
+    db = ReadSessionLocal(use_replica=use_replica)
+    try:
+        yield db
+    finally:
+        db.close()
@@ -4,40 +4,80 @@ from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.config import settings
-from app import models
+from app import models, tenancy
+from app.services import api_token_service, principal_service, revocation_service
 from typing import Optional
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def get_current_user(request: Request, db: Session = Depends(get_db)) -> models.User:
-    token = request.cookies.get("access_token")
-    print(f"DEBUG: get_current_user path={request.url.path} cookies={request.cookies}")
-    if not token:
-        # Check if it's a bearer token (optional, for API clients)
-        auth_header = request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            token = auth_header.split(" ")[1]
-    
-    if not token:
-         print(f"DEBUG: No token found for {request.url.path}")
-         raise HTTPException(
+def _bearer_token(request: Request) -> Optional[str]:
+    auth_header = request.headers.get("Authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        return auth_header.split(" ")[1]
+    return None
+
+def get_api_token(request: Request, db: Session = Depends(get_db)) -> Optional[models.APIToken]:
+    """The API token sent as a Bearer header, or None for browser / JWT requests."""
+    token = _bearer_token(request)
+    if not api_token_service.is_api_token(token):
+        return None
+    api_token = api_token_service.authenticate(db, token)
+    if api_token is None:
+        raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
+            detail="Invalid or revoked API token",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return api_token
 
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    except JWTError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+def require_scope(router_scope: str):
+    """Router dependency: API tokens must carry `router_scope` (or its :read form for GETs)."""
+    def check_scope(request: Request, api_token: Optional[models.APIToken] = Depends(get_api_token)) -> None:
+        if api_token is not None and not api_token_service.scope_allows(api_token.scopes, router_scope, request.method):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"API token lacks the '{router_scope}' scope")
+    return check_scope
+
+def get_current_user(request: Request, db: Session = Depends(get_db),
+                     api_token: Optional[models.APIToken] = Depends(get_api_token)) -> models.User:
+    if api_token is not None:
+        # Machine client: already resolved by one indexed lookup on token_hash
+        user = api_token.user
+    else:
+        token = request.cookies.get("access_token")
+        if not token:
+            # Check if it's a bearer token (optional, for API clients)
+            token = _bearer_token(request)
     
+        if not token:
+             raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        cached = principal_service.get(token)
+        if cached is not None:
+            # Usually just the in-process Bloom filter; catches revocations made by other workers
+            if revocation_service.is_revoked(db, cached.claims):
+                principal_service.invalidate_token(token)
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
+            user, _ = principal_service.attach(db, cached)
+        else:
+            try:
+                payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+                email: str = payload.get("sub")
+                if email is None:
+                    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+            except JWTError:
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+            if revocation_service.is_revoked(db, payload):
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
+
+            user = db.query(models.User).filter(models.User.email == email).first()
+            if user is None:
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+            principal_service.put(token, user, user.shop, payload)
+
     # DEMO MODE RESTRICTION
     if user.email == "demo@winderinvoice.com" and request.method not in ["GET", "HEAD", "OPTIONS"]:
         raise HTTPException(
@@ -45,15 +85,32 @@ def get_current_user(request: Request, db: Session = Depends(get_db)) -> models.
             detail="Demo Mode is Read-Only. You cannot modify data."
         )
     
+    # Database per tenant: the rest of the request reads and writes this shop's database
+    tenancy.bind_tenant(db, user.shop_id)
     return user
 
+def get_session_user(current_user: models.User = Depends(get_current_user),
+                     api_token: Optional[models.APIToken] = Depends(get_api_token)) -> models.User:
+    """
+    The signed-in user, for credential management (passwords, logout, API
+    tokens). API tokens are refused whatever their scopes, so a narrow token
+    cannot mint a broader one or lock its owner out.
+    """
+    if api_token is not None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="API tokens cannot manage credentials; sign in to do this",
+        )
+    return current_user
+
 def get_current_active_user(current_user: models.User = Depends(get_current_user)) -> models.User:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 def get_current_shop(current_user: models.User = Depends(get_current_active_user), db: Session = Depends(get_db)) -> models.Shop:
-    shop = db.query(models.Shop).filter(models.Shop.id == current_user.shop_id).first()
+    # Loaded (or rehydrated from the principal cache) by get_current_user
+    shop = current_user.shop
     if not shop:
         raise HTTPException(status_code=404, detail="Shop not found")
     return shop
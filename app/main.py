@@ -1,19 +1,47 @@
 from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import JSONResponse, RedirectResponse
 from fastapi import HTTPException
 import logging
 import traceback
+from sqlalchemy import text
 
-from app.database import engine, Base
+from app.database import engine, pool_stats, replica_pool_stats
 from app.config import settings
 
-# Create tables (for local dev, normally use Alembic)
-Base.metadata.create_all(bind=engine)
+# Tables are created and migrated by Alembic (`alembic upgrade head`, see
+# entrypoint.sh); workers only check the database is at the expected revision
+from app import schema
+schema.verify(engine)
+
+# Postgres: keep fiscal-year partitions of invoices one year ahead
+from app.services.archive_service import ensure_partitions
+ensure_partitions(engine)
+
+# SQLite: writers queue for their turn instead of failing with "database is locked"
+from app import write_queue
+write_queue.setup()
+
+# Database per tenant: shop data lives in each shop's own database
+from app import tenancy
+tenancy.setup()
 
 app = FastAPI(title="GST Billing App")
 
+# Stop the bcrypt worker processes with the server
+from app.services import password_service
+app.add_event_handler("shutdown", password_service.shutdown)
+
+# brotli/gzip for HTML and JSON (PDFs, images and precompressed files are left alone)
+if settings.COMPRESSION_ENABLED:
+    from app.middleware.compression import CompressionMiddleware
+    app.add_middleware(CompressionMiddleware)
+
+# Read replica: after a commit, the client's next reads go to the primary
+if settings.DATABASE_REPLICA_URL:
+    from app.middleware.read_your_writes import ReadYourWritesMiddleware
+    app.add_middleware(ReadYourWritesMiddleware)
+
 logging.basicConfig(filename='app.log', level=logging.ERROR)
 
 @app.exception_handler(Exception)
@@ -38,12 +66,47 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         content={"detail": exc.detail},
     )
 
+@app.get("/health/db")
+def database_health():
+    """
+    {"status": "ok"} if the database answers, 503 if not. Pool occupancy and
+    counters (app/database.py) are added only with DB_HEALTH_DETAILS.
+    """
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        logging.error(f"Database health check failed: {e}")
+        return JSONResponse(status_code=503, content={"status": "error"})
+    report = {"status": "ok"}
+    if settings.DB_HEALTH_DETAILS:
+        report.update(pool_stats())
+        replica = replica_pool_stats()
+        if replica is not None:
+            report["replica"] = replica
+    return report
+
 @app.get("/demo")
 async def demo_redirect():
     return RedirectResponse(url="/auth/demo")
 
+# Fingerprint and precompress static assets (static_url() in templates)
+from app import assets
+if settings.STATIC_BUILD_ON_STARTUP:
+    assets.build()
+else:
+    assets.load_manifest()
+
+from app import tailwind
+if settings.TAILWIND_MODE.lower() == "build" and not tailwind.is_built():
+    raise RuntimeError("TAILWIND_MODE=build but app/static/css/app.css was not built: run python scripts/build_css.py")
+
 # Mount static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+from app.middleware.cache import CachedStaticFiles
+if settings.STORAGE_PROVIDER.lower() != "s3":
+    # Local uploads, served with long cache lifetimes (their names are content hashes)
+    app.mount("/static/uploads", CachedStaticFiles(directory=settings.UPLOADS_PATH, check_dir=False), name="uploads")
+app.mount("/static", CachedStaticFiles(directory="app/static"), name="static")
 
 # Templates
 templates = Jinja2Templates(directory="app/templates")
@@ -52,11 +115,14 @@ templates = Jinja2Templates(directory="app/templates")
 templates.env.globals['config'] = settings
 
 # Include routers
-from app.routers import auth, dashboard, masters, invoices, reports, settings
+from app.routers import auth, dashboard, masters, invoices, payments, reports, search
+from app.routers import settings as settings_router  # not `settings`: that name is app.config.settings
 
 app.include_router(auth.router)
 app.include_router(dashboard.router)
 app.include_router(masters.router)
 app.include_router(invoices.router)
+app.include_router(payments.router)
 app.include_router(reports.router)
-app.include_router(settings.router)
+app.include_router(search.router)
+app.include_router(settings_router.router)
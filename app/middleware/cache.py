@@ -1,24 +1,76 @@
+import mimetypes
+import re
+
+import anyio
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import Response
+from starlette.datastructures import Headers
 from datetime import datetime, timedelta
 
+from app.assets import COMPRESSIBLE_SUFFIXES
+
+# Names that are a SHA-256 of the content (content-addressed uploads and their variants)
+CONTENT_ADDRESSED_NAME = re.compile(r"(^|/)[0-9a-f]{64}(\.[a-z0-9]+)+$")
+
+# Fingerprinted static assets written by app/assets.py: build/css/invoice_print.<12 hex>.css
+FINGERPRINTED_NAME = re.compile(r"^build/.+\.[0-9a-f]{12}\.[A-Za-z0-9]+$")
+
+# Precompressed siblings (app/assets.py), in order of preference
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+def accepted_encodings(header: str) -> set:
+    """Content codings an Accept-Encoding header allows (q=0 means refused)."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
 # Cache configuration for static files
 class CachedStaticFiles(StaticFiles):
     def __init__(self, *args, **kwargs):
         self.cache_max_age = kwargs.pop('cache_max_age', 31536000)  # 1 year default
         super().__init__(*args, **kwargs)
     
+    async def _precompressed_response(self, path: str, scope):
+        """The .br/.gz sibling of `path` the client accepts, if one was built."""
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result is None or not stat_result.st_size:
+                continue
+            response = self.file_response(full_path, stat_result, scope)
+            if response.status_code == 200:
+                response.headers['Content-Encoding'] = encoding
+                response.headers['Content-Type'] = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            return response
+        return None
+
     async def get_response(self, path: str, scope):
-        response = await super().get_response(path, scope)
+        response = None
+        compressible = any(path.endswith(ext) for ext in COMPRESSIBLE_SUFFIXES)
+        if compressible and scope["method"] in ("GET", "HEAD"):
+            response = await self._precompressed_response(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
         
         # Add cache headers for static files
         if isinstance(response, Response):
-            # Cache images, fonts, and CSS/JS for 1 year
-            if any(path.endswith(ext) for ext in ['.png', '.jpg', '.jpeg', '.webp', '.woff', '.woff2', '.css', '.js']):
+            if compressible:
+                response.headers['Vary'] = 'Accept-Encoding'
+            # Fingerprinted assets and content-addressed uploads never change under the same name
+            if FINGERPRINTED_NAME.search(path) or CONTENT_ADDRESSED_NAME.search(path):
                 response.headers['Cache-Control'] = f'public, max-age={self.cache_max_age}, immutable'
-            # Cache other static files for 1 week
+            # Unversioned paths can change in place: a day, then revalidate (cheap 304 via ETag)
             else:
-                response.headers['Cache-Control'] = 'public, max-age=604800'
+                response.headers['Cache-Control'] = 'public, max-age=86400'
         
         return response
@@ -0,0 +1,189 @@
+"""
+Response compression for dynamic HTML and JSON (brotli, else gzip).
+
+Only text-like content types are compressed (COMPRESSIBLE_TYPES), so PDFs,
+ZIPs, images and other already-compressed media pass through untouched, as
+do responses that already carry a Content-Encoding (precompressed static
+files) or ask for Cache-Control: no-transform.
+
+- Whole bodies under COMPRESSION_MIN_BYTES are sent as they are.
+- Whole bodies of COMPRESSION_OFFLOAD_BYTES or more are compressed in a
+  worker thread so the event loop keeps serving other requests.
+- Streamed bodies (StreamingResponse) are compressed chunk by chunk and
+  flushed every COMPRESSION_STREAM_FLUSH_BYTES of input, so the browser can
+  start rendering before the stream ends.
+"""
+import zlib
+from typing import Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import settings
+from app.middleware.cache import accepted_encodings
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/xhtml+xml",
+    "application/x-ndjson",
+    "application/manifest+json",
+    "image/svg+xml",
+}
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return (media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+            or media_type.endswith("+json") or media_type.endswith("+xml"))
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._z.compress(data)
+
+    def flush(self) -> bytes:
+        return self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._z.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    def __init__(self, quality: int):
+        self._c = brotli.Compressor(mode=brotli.MODE_TEXT, quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.process(data)
+
+    def flush(self) -> bytes:
+        return self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app,
+        minimum_size: int = settings.COMPRESSION_MIN_BYTES,
+        gzip_level: int = settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality: int = settings.COMPRESSION_BROTLI_QUALITY,
+        offload_size: int = settings.COMPRESSION_OFFLOAD_BYTES,
+        flush_size: int = settings.COMPRESSION_STREAM_FLUSH_BYTES,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.offload_size = offload_size
+        self.flush_size = flush_size
+
+    def negotiate(self, accept_encoding: str) -> Optional[str]:
+        accepted = accepted_encodings(accept_encoding)
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def encoder(self, encoding: str):
+        if encoding == "br":
+            return _BrotliEncoder(self.brotli_quality)
+        return _GzipEncoder(self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = self.negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(self, encoding, send))
+
+
+class _CompressingSend:
+    """Wraps `send` for one response; decides on the first body message."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start_message = None
+        self.mode = None  # "passthrough" | "stream"
+        self.encoder = None
+        self.pending = 0  # input bytes since the last flush
+
+    async def _run(self, fn, data: bytes) -> bytes:
+        if len(data) >= self.middleware.offload_size:
+            return await anyio.to_thread.run_sync(fn, data)
+        return fn(data)
+
+    def _eligible(self, headers: MutableHeaders) -> bool:
+        status = self.start_message["status"]
+        if status < 200 or status in (204, 304):
+            return False
+        if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+            return False
+        return is_compressible(headers.get("content-type", ""))
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.mode is None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            if not self._eligible(headers):
+                self.mode = "passthrough"
+            else:
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body and len(body) < self.middleware.minimum_size:
+                    self.mode = "passthrough"
+                else:
+                    headers["Content-Encoding"] = self.encoding
+                    self.encoder = self.middleware.encoder(self.encoding)
+                    if not more_body:
+                        # Whole body in one message: compress it in one go
+                        encoder = self.encoder
+                        body = await self._run(lambda data: encoder.compress(data) + encoder.finish(), body)
+                        headers["Content-Length"] = str(len(body))
+                        await self.send(self.start_message)
+                        await self.send({"type": "http.response.body", "body": body})
+                        return
+                    self.mode = "stream"
+                    if "content-length" in headers:
+                        del headers["content-length"]
+            await self.send(self.start_message)
+
+        if self.mode == "passthrough":
+            await self.send(message)
+            return
+
+        # Streaming
+        out = await self._run(self.encoder.compress, body) if body else b""
+        self.pending += len(body)
+        if not more_body:
+            out += self.encoder.finish()
+        elif self.pending >= self.middleware.flush_size:
+            out += self.encoder.flush()
+            self.pending = 0
+        if out or not more_body:
+            await self.send({"type": "http.response.body", "body": out, "more_body": more_body})
@@ -0,0 +1,41 @@
+"""
+Read-your-writes for the read replica (app/database.py).
+
+Gives each request a place to record commits (database.mark_written) and,
+when the request committed something, sets a short-lived cookie so the
+client's next GETs read from the primary until the replica has caught up.
+"""
+
+from starlette.datastructures import MutableHeaders
+
+from app.config import settings
+from app.database import PRIMARY_READS_COOKIE, request_writes
+
+
+class ReadYourWritesMiddleware:
+    def __init__(self, app, sticky_seconds: int = settings.DATABASE_REPLICA_STICKY_SECONDS):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        writes = {}
+        token = request_writes.set(writes)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and "at" in writes:
+                until = int(writes["at"] + self.sticky_seconds)
+                headers = MutableHeaders(raw=message["headers"])
+                headers.append(
+                    "Set-Cookie",
+                    f"{PRIMARY_READS_COOKIE}={until}; Max-Age={self.sticky_seconds}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            request_writes.reset(token)
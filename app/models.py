@@ -1,7 +1,7 @@
 # app/models.py
 from sqlalchemy import (
     Column, Integer, String, Boolean, ForeignKey, Float, Text, Date, JSON,
-    DateTime, Enum as SAEnum, func
+    DateTime, Enum as SAEnum, Index, func
 )
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -89,6 +89,22 @@ class Shop(Base):
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
+# ---------- IMAGE VARIANT ----------
+class ImageVariant(Base):
+    """A resized, metadata-free copy of an uploaded image (see image_service)."""
+    __tablename__ = "image_variants"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source_path = Column(String, nullable=False, index=True)  # URL/path of the original upload
+    variant = Column(String(16), nullable=False)               # "print" / "screen"
+    path = Column(String, nullable=False)
+    content_type = Column(String, nullable=True)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    size = Column(Integer, nullable=True)
+
+    created_at = Column(DateTime, server_default=func.now())
+
 # ---------- BANK DETAIL ----------
 class BankDetail(Base):
     __tablename__ = "bank_details"
@@ -147,7 +163,7 @@ class APIToken(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     name = Column(String, nullable=True)
-    token_hash = Column(String, nullable=False)  # store only hashed token
+    token_hash = Column(String, nullable=False, unique=True, index=True)  # store only hashed token (SHA-256 hex)
     scopes = Column(JSON, nullable=True)         # list of scopes
     revoked = Column(Boolean, default=False)
 
@@ -155,6 +171,18 @@ class APIToken(Base):
 
     user = relationship("User", back_populates="api_tokens")
 
+class TokenRevocation(Base):
+    """A revoked access token (jti), or every token of a user issued before revoked_before."""
+    __tablename__ = "token_revocations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String(64), nullable=True, index=True)
+    subject = Column(String, nullable=True, index=True)  # JWT "sub" (user email)
+    revoked_before = Column(DateTime, nullable=True)     # set for logout-everywhere
+    expires_at = Column(DateTime, nullable=False, index=True)  # row can be purged after this
+
+    created_at = Column(DateTime, server_default=func.now())
+
 # ---------- AUDIT LOG ----------
 class AuditLog(Base):
     __tablename__ = "audit_logs"
@@ -192,9 +220,13 @@ class Customer(Base):
     phone = Column(String, nullable=True)
     email = Column(String, nullable=True)
     opening_balance = Column(Float, default=0.0)
+    # Running receivable: opening_balance + invoiced - received.
+    # Maintained incrementally by invoice/payment writes (see payment_service).
+    balance = Column(Float, default=0.0)
 
     shop = relationship("Shop", back_populates="customers")
     invoices = relationship("Invoice", back_populates="customer")
+    payments = relationship("Payment", back_populates="customer")
 
 class Product(Base):
     __tablename__ = "products"
@@ -234,11 +266,19 @@ class Invoice(Base):
     amount_in_words = Column(String, nullable=True)
 
     # Status
-    status = Column(String, default="Generated") # Generated, Paid, Cancelled
+    status = Column(String, default="Generated") # Generated, Partially Paid, Paid, Cancelled
+    amount_paid = Column(Float, default=0.0)     # sum of payment allocations
 
     shop = relationship("Shop", back_populates="invoices")
     customer = relationship("Customer", back_populates="invoices")
     items = relationship("InvoiceItem", back_populates="invoice", cascade="all, delete-orphan")
+    allocations = relationship("PaymentAllocation", back_populates="invoice")
+
+    __table_args__ = (
+        Index("ix_invoices_customer_date", "customer_id", "date"),
+        Index("ix_invoices_shop_status_date", "shop_id", "status", "date"),
+        Index("ix_invoices_shop_date_id", "shop_id", "date", "id"),  # keyset pagination
+    )
 
 class InvoiceItem(Base):
     __tablename__ = "invoice_items"
@@ -261,3 +301,79 @@ class InvoiceItem(Base):
     total_amount = Column(Float, default=0.0)
 
     invoice = relationship("Invoice", back_populates="items")
+
+# ---------- FISCAL-YEAR ARCHIVE ----------
+class ArchivedFiscalYear(Base):
+    """A closed April-March year whose invoices live in cold storage."""
+    __tablename__ = "archived_fiscal_years"
+
+    fiscal_year = Column(Integer, primary_key=True)  # FY 2023-24 -> 2023
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    location = Column(String, nullable=False)  # archive DB file (SQLite) or partition name (Postgres)
+    invoice_count = Column(Integer, default=0)
+    item_count = Column(Integer, default=0)
+    archived_at = Column(DateTime, server_default=func.now())
+
+class ArchivedInvoiceTotal(Base):
+    """Per-shop totals of invoices moved out of the live tables (SQLite archives)."""
+    __tablename__ = "archived_invoice_totals"
+
+    id = Column(Integer, primary_key=True, index=True)
+    fiscal_year = Column(Integer, nullable=False, index=True)
+    shop_id = Column(Integer, ForeignKey("shops.id"), nullable=False, index=True)
+    invoice_count = Column(Integer, default=0)
+    taxable_amount = Column(Float, default=0.0)
+    cgst_amount = Column(Float, default=0.0)
+    sgst_amount = Column(Float, default=0.0)
+    igst_amount = Column(Float, default=0.0)
+    grand_total = Column(Float, default=0.0)
+
+# ---------- PAYMENTS ----------
+class Payment(Base):
+    __tablename__ = "payments"
+
+    id = Column(Integer, primary_key=True, index=True)
+    shop_id = Column(Integer, ForeignKey("shops.id"), index=True)
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
+    date = Column(Date, nullable=False)
+    amount = Column(Float, nullable=False)
+    mode = Column(String, default="Cash")  # Cash, UPI, Bank Transfer, Cheque
+    reference = Column(String, nullable=True)
+    notes = Column(Text, nullable=True)
+    unallocated_amount = Column(Float, default=0.0)  # advance / on-account
+
+    created_at = Column(DateTime, server_default=func.now())
+
+    customer = relationship("Customer", back_populates="payments")
+    allocations = relationship("PaymentAllocation", back_populates="payment", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_payments_customer_date", "customer_id", "date"),
+    )
+
+class PaymentAllocation(Base):
+    __tablename__ = "payment_allocations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    payment_id = Column(Integer, ForeignKey("payments.id"), nullable=False, index=True)
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=False, index=True)
+    amount = Column(Float, nullable=False)
+
+    payment = relationship("Payment", back_populates="allocations")
+    invoice = relationship("Invoice", back_populates="allocations")
+
+class PriceRevisionItem(Base):
+    """Undo snapshot for a bulk price revision (one row per product touched)."""
+    __tablename__ = "price_revision_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    audit_log_id = Column(Integer, ForeignKey("audit_logs.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    old_rate = Column(Float, nullable=True)
+    new_rate = Column(Float, nullable=True)
+
+    # Undo looks rows up by (revision, product) from a correlated subquery
+    __table_args__ = (
+        Index("ix_price_revision_items_audit_product", "audit_log_id", "product_id"),
+    )
@@ -1,15 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Form
-from fastapi.templating import Jinja2Templates
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.database import get_db
+from app.templating import templates
 from app import models, schemas
-from app.services import auth_service
+from app.services import auth_service, password_service, principal_service, revocation_service
 from app.config import settings
 from datetime import timedelta
+from jose import JWTError, jwt
 
 router = APIRouter(prefix="/auth", tags=["auth"])
-templates = Jinja2Templates(directory="app/templates")
 
 # State code mapping for Indian states
 STATE_CODES = {
@@ -43,21 +44,46 @@ STATE_CODES = {
     "West Bengal": "19",
 }
 
+# login and signup are async so they can await the password hashing pool;
+# their (blocking) database work goes through run_in_threadpool.
+def _find_user(db: Session, email: str):
+    return db.query(models.User).filter(models.User.email == email).first()
+
+
+def _save_password_hash(db: Session, user: models.User, hashed_password: str):
+    user.hashed_password = hashed_password
+    db.commit()
+
+
 @router.get("/login")
 def login_page(request: Request):
     return templates.TemplateResponse("auth/login.html", {"request": request})
 
 @router.post("/login")
-def login(
+async def login(
     request: Request,
     response: Response,
     email: str = Form(...),
     password: str = Form(...),
     db: Session = Depends(get_db)
 ):
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if not user or not auth_service.verify_password(password, user.hashed_password):
+    try:
+        password_service.check_login_allowed(request.client.host if request.client else None, email)
+        user = await run_in_threadpool(_find_user, db, email)
+        valid = bool(user) and await password_service.verify_password(password, user.hashed_password)
+    except HTTPException as e:
+        return templates.TemplateResponse("auth/login.html", {"request": request, "error": e.detail},
+                                          status_code=e.status_code, headers=e.headers)
+    password_service.record_login_result(email, valid)
+    if not valid:
         return templates.TemplateResponse("auth/login.html", {"request": request, "error": "Invalid credentials"})
+
+    # Upgrade hashes made with an older work factor while we have the plaintext
+    if password_service.needs_rehash(user.hashed_password):
+        try:
+            await run_in_threadpool(_save_password_hash, db, user, await password_service.hash_password(password))
+        except HTTPException:
+            pass
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth_service.create_access_token(
@@ -79,7 +105,7 @@ def signup_page(request: Request):
     return templates.TemplateResponse("auth/signup.html", {"request": request})
 
 @router.post("/signup")
-def signup(
+async def signup(
     request: Request,
     full_name: str = Form(...),
     shop_name: str = Form(...),
@@ -107,42 +133,51 @@ def signup(
         })
     
     # Check if email already exists
-    existing_user = db.query(models.User).filter(models.User.email == email).first()
+    existing_user = await run_in_threadpool(_find_user, db, email)
     if existing_user:
         return templates.TemplateResponse("auth/signup.html", {
             "request": request, 
             "error": "Email already registered. Please sign in instead."
         })
     
-    # Get state code
-    state_code = STATE_CODES.get(state, "00")
-    
-    # Create shop
-    shop = models.Shop(
-        name=shop_name,
-        gstin=gstin if gstin else None,
-        address_line1="",  # Can be updated later in settings
-        city=city,
-        state=state,
-        pincode="",  # Can be updated later
-        business_phone=mobile,
-        business_email=email
-    )
-    db.add(shop)
-    db.commit()
-    db.refresh(shop)
-    
-    # Create user with hashed password
-    hashed_password = auth_service.get_password_hash(password)
-    user = models.User(
-        shop_id=shop.id,
-        name=full_name,
-        email=email,
-        hashed_password=hashed_password,
-        role=models.UserRoleEnum.ADMIN
-    )
-    db.add(user)
-    db.commit()
+    # Hash first: if the hashing pool is saturated, nothing has been written yet
+    try:
+        hashed_password = await password_service.hash_password(password)
+    except HTTPException as e:
+        return templates.TemplateResponse("auth/signup.html", {"request": request, "error": e.detail},
+                                          status_code=e.status_code, headers=e.headers)
+
+    def create_account():
+        # Get state code
+        state_code = STATE_CODES.get(state, "00")
+
+        # Create shop
+        shop = models.Shop(
+            name=shop_name,
+            gstin=gstin if gstin else None,
+            address_line1="",  # Can be updated later in settings
+            city=city,
+            state=state,
+            pincode="",  # Can be updated later
+            business_phone=mobile,
+            business_email=email
+        )
+        db.add(shop)
+        db.commit()
+        db.refresh(shop)
+
+        # Create user with hashed password
+        user = models.User(
+            shop_id=shop.id,
+            name=full_name,
+            email=email,
+            hashed_password=hashed_password,
+            role=models.UserRoleEnum.ADMIN
+        )
+        db.add(user)
+        db.commit()
+
+    await run_in_threadpool(create_account)
     
     # Redirect to login with success message
     return RedirectResponse(url="/auth/login?signup=success", status_code=status.HTTP_302_FOUND)
@@ -200,7 +235,16 @@ def demo_login(response: Response, db: Session = Depends(get_db)):
     return response
 
 @router.get("/logout")
-def logout(response: Response):
+def logout(request: Request, response: Response, db: Session = Depends(get_db)):
+    token = request.cookies.get("access_token")
+    if token:
+        principal_service.invalidate_token(token)
+        try:
+            claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            revocation_service.revoke_token(db, claims)
+            db.commit()
+        except JWTError:
+            pass  # expired or forged: nothing to revoke
     response = RedirectResponse(url="/", status_code=status.HTTP_302_FOUND)
     response.delete_cookie("access_token")
     return response
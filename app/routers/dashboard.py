@@ -1,15 +1,15 @@
 from fastapi import APIRouter, Depends, Request
-from fastapi.templating import Jinja2Templates
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func, extract
-from app.dependencies import get_current_user, get_current_shop
-from app.database import get_db
+from app.dependencies import get_current_user, get_current_shop, require_scope
+from app.database import get_read_db
+from app.templating import templates
 from app import models
+from app.services import archive_service, payment_service
 from datetime import datetime, timedelta
 
-router = APIRouter(tags=["dashboard"])
-templates = Jinja2Templates(directory="app/templates")
+router = APIRouter(tags=["dashboard"], dependencies=[Depends(require_scope("dashboard"))])
 
 @router.get("/")
 def homepage(request: Request):
@@ -68,6 +68,9 @@ def get_dashboard_data(db: Session, shop: models.Shop):
         models.Invoice.shop_id == shop.id
     ).scalar() or 0
     
+    # Outstanding receivables (pre-aggregated per customer at write time)
+    total_outstanding = payment_service.total_outstanding(db, shop.id)
+    
     # Get this month's revenue
     current_month = datetime.now().month
     current_year = datetime.now().year
@@ -95,6 +98,14 @@ def get_dashboard_data(db: Session, shop: models.Shop):
         models.Invoice.shop_id == shop.id
     ).scalar() or 0
     
+    # Lifetime figures include invoices moved to fiscal-year archive files
+    archived = archive_service.archived_totals(db, shop.id)
+    total_invoices += archived["invoice_count"]
+    total_revenue += archived["grand_total"]
+    total_cgst += archived["cgst_amount"]
+    total_sgst += archived["sgst_amount"]
+    total_igst += archived["igst_amount"]
+    
     
     # Chart Data: Monthly Revenue (Last 6 months)
     today = datetime.now()
@@ -119,6 +130,7 @@ def get_dashboard_data(db: Session, shop: models.Shop):
         "total_invoices": total_invoices,
         "total_products": total_products,
         "total_revenue": total_revenue,
+        "total_outstanding": total_outstanding,
         "monthly_revenue": monthly_revenue,
         "recent_invoices": recent_invoices,
         "total_cgst": total_cgst,
@@ -133,7 +145,7 @@ def dashboard(
     request: Request, 
     current_user: models.User = Depends(get_current_user),
     shop: models.Shop = Depends(get_current_shop),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Ultimate Dashboard - Default View"""
     data = get_dashboard_data(db, shop)
@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends, Request, Form, status, HTTPException
 from fastapi.responses import RedirectResponse, Response
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.dependencies import get_current_shop, get_current_user
-from app import models, schemas
-from app.services import invoice_service
+from app.templating import templates, upload_url
+from app.dependencies import get_current_shop, get_current_user, require_scope
+from app import models, schemas, write_queue
+from app.services import archive_service, image_service, invoice_service, payment_service, search_service, typeahead_service
 from typing import List, Optional
 from datetime import date
 import json
@@ -13,24 +13,97 @@ from xhtml2pdf import pisa
 from io import BytesIO
 import re
 
-router = APIRouter(tags=["invoices"])
-templates = Jinja2Templates(directory="app/templates")
+router = APIRouter(tags=["invoices"], dependencies=[Depends(require_scope("invoices"))])
+
+INVOICE_STATUSES = ["Generated", "Partially Paid", "Paid", "Cancelled"]
+
+def _use_print_images(db: Session, shop_data: dict) -> None:
+    """Swap the logo / QR for their small print variants, where one was made."""
+    keys = ("logo_path", "qr_code_path")
+    variants = image_service.variant_urls(db, [shop_data[k] for k in keys], image_service.VARIANT_PRINT)
+    for key in keys:
+        shop_data[key] = variants.get(shop_data[key], shop_data[key])
+
+
+def _invoice_page(db, shop, cursor, status, customer_id, start_date, end_date):
+    try:
+        return invoice_service.list_invoices_page(
+            db, shop.id,
+            cursor=cursor,
+            status=status or None,
+            customer_id=customer_id,
+            start_date=start_date,
+            end_date=end_date,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @router.get("/invoices")
-def list_invoices(request: Request, user: models.User = Depends(get_current_user), shop: models.Shop = Depends(get_current_shop), db: Session = Depends(get_db)):
-    invoices = db.query(models.Invoice).filter(models.Invoice.shop_id == shop.id).order_by(models.Invoice.date.desc()).all()
-    return templates.TemplateResponse("invoices/list.html", {"request": request, "user": user, "invoices": invoices, "title": "Invoices"})
+def list_invoices(
+    request: Request,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    customer_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    user: models.User = Depends(get_current_user),
+    shop: models.Shop = Depends(get_current_shop),
+    db: Session = Depends(get_db)
+):
+    invoices, next_cursor = _invoice_page(db, shop, cursor, status, customer_id, start_date, end_date)
+    customers = db.query(models.Customer.id, models.Customer.name).filter(
+        models.Customer.shop_id == shop.id
+    ).order_by(models.Customer.name).all()
+
+    filters = {k: v for k, v in {
+        "status": status,
+        "customer_id": customer_id,
+        "start_date": start_date,
+        "end_date": end_date,
+    }.items() if v}
+
+    return templates.TemplateResponse("invoices/list.html", {
+        "request": request,
+        "user": user,
+        "invoices": invoices,
+        "next_cursor": next_cursor,
+        "filters": filters,
+        "customers": customers,
+        "statuses": INVOICE_STATUSES,
+        "title": "Invoices"
+    })
+
+@router.get("/invoices/data")
+def list_invoices_json(
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    customer_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    shop: models.Shop = Depends(get_current_shop),
+    db: Session = Depends(get_db)
+):
+    """JSON page of invoices for infinite scroll. Pass back next_cursor to continue."""
+    invoices, next_cursor = _invoice_page(db, shop, cursor, status, customer_id, start_date, end_date)
+    return {
+        "items": [{
+            "id": inv.id,
+            "invoice_no": inv.invoice_no,
+            "date": inv.date.isoformat() if inv.date else None,
+            "customer_name": inv.customer_name,
+            "grand_total": inv.grand_total,
+            "status": inv.status,
+        } for inv in invoices],
+        "next_cursor": next_cursor,
+    }
 
 @router.get("/invoices/new")
 def new_invoice(request: Request, user: models.User = Depends(get_current_user), shop: models.Shop = Depends(get_current_shop), db: Session = Depends(get_db)):
-    customers = db.query(models.Customer).filter(models.Customer.shop_id == shop.id).all()
-    products = db.query(models.Product).filter(models.Product.shop_id == shop.id).all()
+    # Customers and products are looked up as you type (/customers/lookup, /products/lookup)
     next_invoice_no = invoice_service.generate_invoice_number(shop.id, db)
     return templates.TemplateResponse("invoices/create.html", {
         "request": request,
         "user": user,
-        "customers": customers, 
-        "products": products,
         "next_invoice_no": next_invoice_no,
         "today": date.today(),
         "title": "New Invoice"
@@ -47,133 +120,146 @@ async def create_invoice(
     eway_bill_no: Optional[str] = Form(None),
     items_json: str = Form(...), # Receive items as JSON string
     shop: models.Shop = Depends(get_current_shop),
-    db: Session = Depends(get_db)
 ):
     try:
         items_data = json.loads(items_json)
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid items data")
 
-    customer = db.query(models.Customer).filter(models.Customer.id == customer_id).first()
-    if not customer:
-        raise HTTPException(status_code=404, detail="Customer not found")
+    # Runs on the SQLite writer queue (group commit); committed when run_write_async returns
+    def save(db: Session):
+        customer = db.query(models.Customer).filter(models.Customer.id == customer_id, models.Customer.shop_id == shop.id).first()
+        if not customer:
+            raise HTTPException(status_code=404, detail="Customer not found")
 
-    # Determine if inter-state
-    # Logic: Prefer state_code comparison if available, otherwise fallback to normalized state names
-    def normalize(s):
-        return (str(s) or '').strip().lower()
+        # Determine if inter-state
+        # Logic: Prefer state_code comparison if available, otherwise fallback to normalized state names
+        def normalize(s):
+            return (str(s) or '').strip().lower()
 
-    c_state_code = getattr(customer, 'state_code', None)
-    s_state_code = getattr(shop, 'state_code', None)
+        c_state_code = getattr(customer, 'state_code', None)
+        s_state_code = getattr(shop, 'state_code', None)
     
-    # If both have state codes, compare them
-    if c_state_code and s_state_code:
-        is_inter_state = normalize(c_state_code) != normalize(s_state_code)
-    else:
-        # Fallback to state names
-        c_state = getattr(customer, 'state', '')
-        s_state = getattr(shop, 'state', '')
-        is_inter_state = normalize(c_state) != normalize(s_state)
+        # If both have state codes, compare them
+        if c_state_code and s_state_code:
+            is_inter_state = normalize(c_state_code) != normalize(s_state_code)
+        else:
+            # Fallback to state names
+            c_state = getattr(customer, 'state', '')
+            s_state = getattr(shop, 'state', '')
+            is_inter_state = normalize(c_state) != normalize(s_state)
 
-    # Create Invoice
-    invoice = models.Invoice(
-        shop_id=shop.id,
-        customer_id=customer_id,
-        invoice_no=invoice_no,
-        date=date.fromisoformat(date_str),
-        place_of_supply=place_of_supply,
-        vehicle_no=vehicle_no,
-        eway_bill_no=eway_bill_no,
-        status="Generated"
-    )
-    db.add(invoice)
-    db.flush() # Get ID
+        # Create Invoice
+        invoice = models.Invoice(
+            shop_id=shop.id,
+            customer_id=customer_id,
+            invoice_no=invoice_no,
+            date=date.fromisoformat(date_str),
+            place_of_supply=place_of_supply,
+            vehicle_no=vehicle_no,
+            eway_bill_no=eway_bill_no,
+            status="Generated",
+            amount_paid=0.0
+        )
+        db.add(invoice)
+        db.flush() # Get ID
 
-    total_taxable = 0
-    total_cgst = 0
-    total_sgst = 0
-    total_igst = 0
-    grand_total = 0
+        total_taxable = 0
+        total_cgst = 0
+        total_sgst = 0
+        total_igst = 0
+        grand_total = 0
+        touched_products = []
 
-    for item in items_data:
-        qty = float(item['qty'])
-        rate = float(item['rate'])
-        tax_rate = float(item['tax_rate'])
+        for item in items_data:
+            qty = float(item['qty'])
+            rate = float(item['rate'])
+            tax_rate = float(item['tax_rate'])
         
-        no_of_pkts = int(item.get('no_of_pkts', 0))
+            no_of_pkts = int(item.get('no_of_pkts', 0))
         
-        taxable_value = qty * rate
-        total_tax_amount = taxable_value * (tax_rate / 100)
+            taxable_value = qty * rate
+            total_tax_amount = taxable_value * (tax_rate / 100)
         
-        if is_inter_state:
-            igst_amount = total_tax_amount
-            cgst_amount = 0.0
-            sgst_amount = 0.0
-        else:
-            cgst_amount = total_tax_amount / 2.0
-            sgst_amount = total_tax_amount / 2.0
-            igst_amount = 0.0
+            if is_inter_state:
+                igst_amount = total_tax_amount
+                cgst_amount = 0.0
+                sgst_amount = 0.0
+            else:
+                cgst_amount = total_tax_amount / 2.0
+                sgst_amount = total_tax_amount / 2.0
+                igst_amount = 0.0
         
-        item_total = taxable_value + total_tax_amount
+            item_total = taxable_value + total_tax_amount
         
-        invoice_item = models.InvoiceItem(
-            invoice_id=invoice.id,
-            product_id=item.get('product_id'), # Optional if manual
-            description=item['description'],
-            hsn_code=item['hsn_code'],
-            no_of_pkts=no_of_pkts,
-            qty=qty,
-            unit=item['unit'],
-            rate=rate,
-            taxable_value=taxable_value,
-            tax_rate=tax_rate,
-            cgst_amount=cgst_amount,
-            sgst_amount=sgst_amount,
-            igst_amount=igst_amount,
-            total_amount=item_total
-        )
-        db.add(invoice_item)
+            invoice_item = models.InvoiceItem(
+                invoice_id=invoice.id,
+                product_id=item.get('product_id'), # Optional if manual
+                description=item['description'],
+                hsn_code=item['hsn_code'],
+                no_of_pkts=no_of_pkts,
+                qty=qty,
+                unit=item['unit'],
+                rate=rate,
+                taxable_value=taxable_value,
+                tax_rate=tax_rate,
+                cgst_amount=cgst_amount,
+                sgst_amount=sgst_amount,
+                igst_amount=igst_amount,
+                total_amount=item_total
+            )
+            db.add(invoice_item)
         
-        total_taxable += taxable_value
-        total_cgst += cgst_amount
-        total_sgst += sgst_amount
-        total_igst += igst_amount
-        grand_total += item_total
+            total_taxable += taxable_value
+            total_cgst += cgst_amount
+            total_sgst += sgst_amount
+            total_igst += igst_amount
+            grand_total += item_total
 
-        # Update Product Stock (Unit)
-        if item.get('product_id'):
-            product = db.query(models.Product).filter(models.Product.id == item['product_id']).first()
-            if product:
-                try:
-                    # Attempt to parse current stock (unit) as float
-                    current_stock = float(product.unit) if product.unit else 0.0
-                    new_stock = current_stock - qty
-                    # Update product unit, keeping it as a string since the column is String
-                    product.unit = str(int(new_stock)) if new_stock.is_integer() else str(new_stock)
-                    db.add(product)
-                except ValueError:
-                    # product.unit might not be a number (e.g., "10 pcs"), skip auto-update or handle differently
-                    print(f"Skipping stock update for product {product.id}: 'unit' ({product.unit}) is not a number.")
+            # Update Product Stock (Unit)
+            if item.get('product_id'):
+                product = db.query(models.Product).filter(models.Product.id == item['product_id']).first()
+                if product:
+                    touched_products.append(product)
+                    try:
+                        # Attempt to parse current stock (unit) as float
+                        current_stock = float(product.unit) if product.unit else 0.0
+                        new_stock = current_stock - qty
+                        # Update product unit, keeping it as a string since the column is String
+                        product.unit = str(int(new_stock)) if new_stock.is_integer() else str(new_stock)
+                        db.add(product)
+                    except ValueError:
+                        # product.unit might not be a number (e.g., "10 pcs"), skip auto-update or handle differently
+                        print(f"Skipping stock update for product {product.id}: 'unit' ({product.unit}) is not a number.")
 
-    # Update invoice totals
-    invoice.taxable_amount = total_taxable
-    invoice.cgst_amount = total_cgst
-    invoice.sgst_amount = total_sgst
-    invoice.igst_amount = total_igst
-    
-    # Round off
-    rounded_total = round(grand_total)
-    invoice.round_off = rounded_total - grand_total
-    invoice.grand_total = rounded_total
-    invoice.amount_in_words = invoice_service.num_to_words(rounded_total)
+        # Update invoice totals
+        invoice.taxable_amount = total_taxable
+        invoice.cgst_amount = total_cgst
+        invoice.sgst_amount = total_sgst
+        invoice.igst_amount = total_igst
     
-    db.commit()
+        # Round off
+        rounded_total = round(grand_total)
+        invoice.round_off = rounded_total - grand_total
+        invoice.grand_total = rounded_total
+        invoice.amount_in_words = invoice_service.num_to_words(rounded_total)
+
+        # Keep the customer's running receivable in step with the new invoice
+        payment_service.post_invoice(customer, invoice)
+        search_service.index_invoice(db, invoice, customer.name, [item['description'] for item in items_data])
+        return invoice.id, touched_products
+
+    invoice_id, touched_products = await write_queue.run_write_async(save, shop_id=shop.id)
+    for product in touched_products:
+        typeahead_service.product_saved(product)
     
-    return RedirectResponse(url=f"/invoices/{invoice.id}", status_code=status.HTTP_303_SEE_OTHER)
+    return RedirectResponse(url=f"/invoices/{invoice_id}", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.get("/invoices/{invoice_id}")
 def view_invoice(invoice_id: int, request: Request, user: models.User = Depends(get_current_user), shop: models.Shop = Depends(get_current_shop), db: Session = Depends(get_db)):
     invoice = db.query(models.Invoice).filter(models.Invoice.id == invoice_id, models.Invoice.shop_id == shop.id).first()
+    if not invoice:
+        invoice = archive_service.find_archived_invoice(db, shop.id, invoice_id)
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
     
@@ -228,9 +314,10 @@ def view_invoice(invoice_id: int, request: Request, user: models.User = Depends(
         "account_number": account_number,
         "ifsc_code": ifsc_code,
         "branch_name": getattr(shop, "branch_name", "") or getattr(shop, "address_line1", "") or "", # Fallback to address if branch name missing
-        "logo_path": getattr(shop, "logo_path", "/static/img/logo-w-gradient-new.png"),
+        "logo_path": getattr(shop, "logo_path", "/static/img/logo-w-gradient-new.print.png"),
         "qr_code_path": qr_code_path,
     }
+    _use_print_images(db, shop_data)
     
     return templates.TemplateResponse("invoices/print.html", {
         "request": request,
@@ -254,6 +341,8 @@ def download_invoice_pdf(invoice_id: int, shop: models.Shop = Depends(get_curren
     """Generate and download invoice as PDF"""
     print(f"DEBUG: PDF Route Hit. User: {db.query(models.User).filter(models.User.shop_id == shop.id).first().email if shop else 'Unknown'}")
     invoice = db.query(models.Invoice).filter(models.Invoice.id == invoice_id, models.Invoice.shop_id == shop.id).first()
+    if not invoice:
+        invoice = archive_service.find_archived_invoice(db, shop.id, invoice_id)
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
     
@@ -308,13 +397,15 @@ def download_invoice_pdf(invoice_id: int, shop: models.Shop = Depends(get_curren
         "account_number": account_number,
         "ifsc_code": ifsc_code,
         "branch_name": getattr(shop, "branch_name", "") or getattr(shop, "address_line1", "") or "", # Fallback to address if branch name missing
-        "logo_path": getattr(shop, "logo_path", "/static/img/logo-w-gradient-new.png"),
+        "logo_path": getattr(shop, "logo_path", "/static/img/logo-w-gradient-new.print.png"),
         "qr_code_path": qr_code_path,
     }
+    _use_print_images(db, shop_data)
     
     # Render HTML template using simplified PDF template
     from jinja2 import Environment, FileSystemLoader
     env = Environment(loader=FileSystemLoader('app/templates'))
+    env.filters['upload_url'] = upload_url
     template = env.get_template('invoices/print_pdf.html')
     
     html_content = template.render(
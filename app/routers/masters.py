@@ -1,14 +1,15 @@
-from fastapi import APIRouter, Depends, Request, Form, status, HTTPException
-from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Depends, Request, Form, status, HTTPException, UploadFile, File
+from fastapi.responses import RedirectResponse, JSONResponse, FileResponse
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.dependencies import get_current_shop, get_current_user
+from app.templating import templates
+from app.dependencies import get_current_shop, get_current_user, require_scope
 from app import models, schemas
+from app.services import import_service, payment_service, pricing_service, search_service, typeahead_service
 from typing import Optional
+import os
 
-router = APIRouter(tags=["masters"])
-templates = Jinja2Templates(directory="app/templates")
+router = APIRouter(tags=["masters"], dependencies=[Depends(require_scope("masters"))])
 
 # --- Customers ---
 
@@ -17,6 +18,43 @@ def list_customers(request: Request, user: models.User = Depends(get_current_use
     customers = db.query(models.Customer).filter(models.Customer.shop_id == shop.id).all()
     return templates.TemplateResponse("customers/list.html", {"request": request, "user": user, "customers": customers, "title": "Customers"})
 
+@router.get("/customers/lookup")
+def lookup_customers(q: str = "", limit: int = typeahead_service.DEFAULT_LIMIT, shop: models.Shop = Depends(get_current_shop), db: Session = Depends(get_db)):
+    return JSONResponse({"items": typeahead_service.lookup(db, shop.id, typeahead_service.KIND_CUSTOMER, q, limit)})
+
+def _import_page(request: Request, user: models.User, kind: str, result: Optional[dict] = None, error: Optional[str] = None):
+    columns = import_service.CUSTOMER_COLUMNS if kind == import_service.KIND_CUSTOMER else import_service.PRODUCT_COLUMNS
+    return templates.TemplateResponse("imports/import.html", {
+        "request": request,
+        "user": user,
+        "kind": kind,
+        "columns": columns,
+        "result": result,
+        "error": error,
+        "title": f"Import {kind.capitalize()}"
+    }, status_code=400 if error else 200)
+
+@router.get("/customers/import")
+def import_customers_form(request: Request, user: models.User = Depends(get_current_user)):
+    return _import_page(request, user, import_service.KIND_CUSTOMER)
+
+@router.post("/customers/import")
+def import_customers(request: Request, file: UploadFile = File(...), user: models.User = Depends(get_current_user), shop: models.Shop = Depends(get_current_shop), db: Session = Depends(get_db)):
+    try:
+        result = import_service.import_customers(db, shop.id, file.file)
+    except ValueError as e:
+        return _import_page(request, user, import_service.KIND_CUSTOMER, error=str(e))
+    return _import_page(request, user, import_service.KIND_CUSTOMER, result=result)
+
+@router.get("/imports/{report_id}/errors.csv")
+def download_import_errors(report_id: str, shop: models.Shop = Depends(get_current_shop)):
+    if not import_service.report_belongs_to(report_id, shop.id):
+        raise HTTPException(status_code=404, detail="Report not found")
+    path = import_service.report_path(report_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Report has expired")
+    return FileResponse(path, media_type="text/csv", filename=f"import-errors-{report_id.split('-')[1]}.csv")
+
 @router.get("/customers/new")
 def new_customer(request: Request, user: models.User = Depends(get_current_user)):
     return templates.TemplateResponse("customers/create.html", {"request": request, "user": user, "title": "New Customer"})
@@ -60,10 +98,14 @@ def create_customer(
         price_category=price_category,
         phone=phone,
         email=email,
-        opening_balance=opening_balance
+        opening_balance=opening_balance,
+        balance=opening_balance
     )
     db.add(customer)
+    db.flush()
+    search_service.index_customer(db, customer)
     db.commit()
+    typeahead_service.customer_saved(customer)
     return RedirectResponse(url="/customers", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.get("/customers/{customer_id}/edit")
@@ -115,9 +157,11 @@ def update_customer(
     customer.price_category = price_category
     customer.phone = phone
     customer.email = email
-    customer.opening_balance = opening_balance
+    payment_service.adjust_opening_balance(customer, opening_balance)
+    search_service.index_customer(db, customer)
     
     db.commit()
+    typeahead_service.customer_saved(customer)
     return RedirectResponse(url="/customers", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.post("/customers/{customer_id}/delete")
@@ -126,8 +170,10 @@ def delete_customer(customer_id: int, shop: models.Shop = Depends(get_current_sh
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     
+    search_service.remove_document(db, search_service.KIND_CUSTOMER, customer.id)
     db.delete(customer)
     db.commit()
+    typeahead_service.customer_deleted(shop.id, customer_id)
     return RedirectResponse(url="/customers", status_code=status.HTTP_303_SEE_OTHER)
 
 # --- Products ---
@@ -137,6 +183,102 @@ def list_products(request: Request, user: models.User = Depends(get_current_user
     products = db.query(models.Product).filter(models.Product.shop_id == shop.id).all()
     return templates.TemplateResponse("products/list.html", {"request": request, "user": user, "products": products, "title": "Products"})
 
+@router.get("/products/lookup")
+def lookup_products(q: str = "", limit: int = typeahead_service.DEFAULT_LIMIT, shop: models.Shop = Depends(get_current_shop), db: Session = Depends(get_db)):
+    return JSONResponse({"items": typeahead_service.lookup(db, shop.id, typeahead_service.KIND_PRODUCT, q, limit)})
+
+@router.get("/products/import")
+def import_products_form(request: Request, user: models.User = Depends(get_current_user)):
+    return _import_page(request, user, import_service.KIND_PRODUCT)
+
+@router.post("/products/import")
+def import_products(request: Request, file: UploadFile = File(...), user: models.User = Depends(get_current_user), shop: models.Shop = Depends(get_current_shop), db: Session = Depends(get_db)):
+    try:
+        result = import_service.import_products(db, shop.id, file.file)
+    except ValueError as e:
+        return _import_page(request, user, import_service.KIND_PRODUCT, error=str(e))
+    return _import_page(request, user, import_service.KIND_PRODUCT, result=result)
+
+def _parse_rate_filter(gst_rate: Optional[str]) -> Optional[float]:
+    if gst_rate in (None, ""):
+        return None
+    try:
+        return float(gst_rate)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid GST rate")
+
+@router.get("/products/revise-prices")
+def revise_prices_form(
+    request: Request,
+    mode: str = pricing_service.MODE_PERCENT,
+    value: Optional[float] = None,
+    hsn_code: Optional[str] = None,
+    gst_rate: Optional[str] = None,
+    name_pattern: Optional[str] = None,
+    user: models.User = Depends(get_current_user),
+    shop: models.Shop = Depends(get_current_shop),
+    db: Session = Depends(get_db)
+):
+    if mode not in pricing_service.MODES:
+        raise HTTPException(status_code=400, detail="Invalid mode")
+    preview = None
+    if value:
+        preview = pricing_service.preview(db, shop.id, mode, value, hsn_code, _parse_rate_filter(gst_rate), name_pattern)
+    return templates.TemplateResponse("products/revise_prices.html", {
+        "request": request,
+        "user": user,
+        "form": {"mode": mode, "value": value, "hsn_code": hsn_code or "", "gst_rate": gst_rate or "", "name_pattern": name_pattern or ""},
+        "preview": preview,
+        "revisions": pricing_service.recent_revisions(db, shop.id),
+        "title": "Revise Prices"
+    })
+
+@router.post("/products/revise-prices")
+def revise_prices(
+    request: Request,
+    mode: str = Form(...),
+    value: float = Form(...),
+    hsn_code: Optional[str] = Form(None),
+    gst_rate: Optional[str] = Form(None),
+    name_pattern: Optional[str] = Form(None),
+    user: models.User = Depends(get_current_user),
+    shop: models.Shop = Depends(get_current_shop),
+    db: Session = Depends(get_db)
+):
+    try:
+        pricing_service.apply_revision(
+            db, shop.id, user.id, mode, value,
+            hsn_code=hsn_code,
+            gst_rate=_parse_rate_filter(gst_rate),
+            name_pattern=name_pattern,
+            ip_address=request.client.host if request.client else None,
+        )
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    db.commit()
+    typeahead_service.invalidate(shop.id, typeahead_service.KIND_PRODUCT)
+    return RedirectResponse(url="/products/revise-prices", status_code=status.HTTP_303_SEE_OTHER)
+
+@router.post("/products/revise-prices/{revision_id}/undo")
+def undo_price_revision(
+    revision_id: int,
+    request: Request,
+    user: models.User = Depends(get_current_user),
+    shop: models.Shop = Depends(get_current_shop),
+    db: Session = Depends(get_db)
+):
+    try:
+        pricing_service.undo_revision(db, shop.id, user.id, revision_id,
+                                      ip_address=request.client.host if request.client else None)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    db.commit()
+    typeahead_service.invalidate(shop.id, typeahead_service.KIND_PRODUCT)
+    return RedirectResponse(url="/products/revise-prices", status_code=status.HTTP_303_SEE_OTHER)
+
 @router.get("/products/new")
 def new_product(request: Request, user: models.User = Depends(get_current_user)):
     return templates.TemplateResponse("products/create.html", {"request": request, "user": user, "title": "New Product"})
@@ -163,7 +305,10 @@ def create_product(
         description=description
     )
     db.add(product)
+    db.flush()
+    search_service.index_product(db, product)
     db.commit()
+    typeahead_service.product_saved(product)
     return RedirectResponse(url="/products", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.get("/products/{product_id}/edit")
@@ -196,8 +341,10 @@ def update_product(
     product.rate = rate
     product.gst_rate = gst_rate
     product.description = description
+    search_service.index_product(db, product)
     
     db.commit()
+    typeahead_service.product_saved(product)
     return RedirectResponse(url="/products", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.post("/products/{product_id}/delete")
@@ -206,6 +353,8 @@ def delete_product(product_id: int, shop: models.Shop = Depends(get_current_shop
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    search_service.remove_document(db, search_service.KIND_PRODUCT, product.id)
     db.delete(product)
     db.commit()
+    typeahead_service.product_deleted(shop.id, product_id)
     return RedirectResponse(url="/products", status_code=status.HTTP_303_SEE_OTHER)
@@ -0,0 +1,108 @@
+from fastapi import APIRouter, Depends, Request, Form, status, HTTPException
+from fastapi.responses import RedirectResponse
+from sqlalchemy.orm import Session, joinedload
+from app.database import get_db
+from app.templating import templates
+from app.dependencies import get_current_shop, get_current_user, require_scope
+from app import models
+from app.services import payment_service
+from typing import Optional
+from datetime import date
+
+router = APIRouter(tags=["payments"], dependencies=[Depends(require_scope("payments"))])
+
+@router.get("/payments")
+def list_payments(request: Request, user: models.User = Depends(get_current_user), shop: models.Shop = Depends(get_current_shop), db: Session = Depends(get_db)):
+    payments = db.query(models.Payment).options(joinedload(models.Payment.customer)).filter(
+        models.Payment.shop_id == shop.id
+    ).order_by(models.Payment.date.desc(), models.Payment.id.desc()).all()
+    return templates.TemplateResponse("payments/list.html", {"request": request, "user": user, "payments": payments, "title": "Payments"})
+
+@router.get("/payments/new")
+def new_payment(
+    request: Request,
+    customer_id: Optional[int] = None,
+    user: models.User = Depends(get_current_user),
+    shop: models.Shop = Depends(get_current_shop),
+    db: Session = Depends(get_db)
+):
+    customers = db.query(models.Customer).filter(models.Customer.shop_id == shop.id).order_by(models.Customer.name).all()
+    open_invoices = []
+    customer = None
+    if customer_id:
+        customer = db.query(models.Customer).filter(models.Customer.id == customer_id, models.Customer.shop_id == shop.id).first()
+        if not customer:
+            raise HTTPException(status_code=404, detail="Customer not found")
+        open_invoices = payment_service.open_invoices_for(db, shop.id, customer.id)
+
+    return templates.TemplateResponse("payments/create.html", {
+        "request": request,
+        "user": user,
+        "customers": customers,
+        "customer": customer,
+        "open_invoices": open_invoices,
+        "modes": payment_service.PAYMENT_MODES,
+        "outstanding_amount": payment_service.outstanding_amount,
+        "today": date.today(),
+        "title": "Record Payment"
+    })
+
+@router.post("/payments/new")
+async def create_payment(
+    request: Request,
+    customer_id: int = Form(...),
+    amount: float = Form(...),
+    date_str: str = Form(..., alias="date"),
+    mode: str = Form("Cash"),
+    reference: Optional[str] = Form(None),
+    notes: Optional[str] = Form(None),
+    shop: models.Shop = Depends(get_current_shop),
+    db: Session = Depends(get_db)
+):
+    customer = db.query(models.Customer).filter(models.Customer.id == customer_id, models.Customer.shop_id == shop.id).first()
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
+
+    # Per-invoice allocations arrive as alloc_<invoice_id> fields; if none are
+    # filled in the service applies the payment FIFO to the oldest invoices.
+    form = await request.form()
+    allocations = {}
+    for key, value in form.items():
+        if key.startswith("alloc_") and value:
+            try:
+                allocations[int(key[len("alloc_"):])] = float(value)
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Invalid allocation amount: {value}")
+
+    try:
+        payment_service.record_payment(
+            db,
+            shop_id=shop.id,
+            customer=customer,
+            amount=amount,
+            payment_date=date.fromisoformat(date_str),
+            mode=mode,
+            reference=reference,
+            notes=notes,
+            allocations=allocations or None,
+        )
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+    db.commit()
+    return RedirectResponse(url="/payments", status_code=status.HTTP_303_SEE_OTHER)
+
+@router.post("/payments/{payment_id}/delete")
+def delete_payment(payment_id: int, shop: models.Shop = Depends(get_current_shop), db: Session = Depends(get_db)):
+    payment = db.query(models.Payment).filter(models.Payment.id == payment_id, models.Payment.shop_id == shop.id).first()
+    if not payment:
+        raise HTTPException(status_code=404, detail="Payment not found")
+
+    try:
+        payment_service.delete_payment(db, payment)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    db.commit()
+    return RedirectResponse(url="/payments", status_code=status.HTTP_303_SEE_OTHER)
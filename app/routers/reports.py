@@ -1,14 +1,16 @@
-from fastapi import APIRouter, Depends, Request, Query
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Depends, Request, Query, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from app.database import get_db
-from app.dependencies import get_current_shop, get_current_user
-from app import models
+from app.database import get_read_db
+from app.templating import templates
+from app.dependencies import get_current_shop, get_current_user, require_scope
+from app import models, tenancy
+from app.services import archive_service, payment_service, statement_service
 from datetime import date, timedelta
+from typing import Optional
 
-router = APIRouter(tags=["reports"])
-templates = Jinja2Templates(directory="app/templates")
+router = APIRouter(tags=["reports"], dependencies=[Depends(require_scope("reports"))])
 
 @router.get("/reports/gst-summary")
 def gst_summary(
@@ -17,12 +19,13 @@ def gst_summary(
     end_date: date = Query(default=date.today()),
     user: models.User = Depends(get_current_user),
     shop: models.Shop = Depends(get_current_shop),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    invoices = db.query(models.Invoice).filter(
-        models.Invoice.shop_id == shop.id,
-        models.Invoice.date >= start_date,
-        models.Invoice.date <= end_date
+    Invoice = archive_service.invoice_source(db, start_date, end_date)
+    invoices = db.query(Invoice).filter(
+        Invoice.shop_id == shop.id,
+        Invoice.date >= start_date,
+        Invoice.date <= end_date
     ).all()
     
     total_taxable = sum(inv.taxable_amount for inv in invoices)
@@ -52,7 +55,7 @@ def customer_ledger(
     end_date: date = Query(default=date.today()),
     user: models.User = Depends(get_current_user),
     shop: models.Shop = Depends(get_current_shop),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     customers = db.query(models.Customer).filter(models.Customer.shop_id == shop.id).all()
     
@@ -62,34 +65,55 @@ def customer_ledger(
     closing_balance = 0
     
     if customer_id:
-        customer = db.query(models.Customer).filter(models.Customer.id == customer_id).first()
+        customer = db.query(models.Customer).filter(
+            models.Customer.id == customer_id,
+            models.Customer.shop_id == shop.id
+        ).first()
         if customer:
-            # Calculate opening balance before start_date
-            # This is simplified. In real app, need to sum all previous invoices/payments.
-            # For now, we just take customer opening balance + invoices before start_date
-            
-            prev_invoices = db.query(func.sum(models.Invoice.grand_total)).filter(
-                models.Invoice.customer_id == customer_id,
-                models.Invoice.date < start_date
+            # Customer.balance is the running receivable maintained at write
+            # time, so the opening balance is derived by backing out only the
+            # activity dated on/after start_date (indexed on customer_id, date)
+            # instead of summing the customer's entire history.
+            Invoice = archive_service.invoice_source(db, start_date)
+            invoiced_since = db.query(func.sum(Invoice.grand_total)).filter(
+                Invoice.customer_id == customer_id,
+                Invoice.date >= start_date
             ).scalar() or 0
-            
-            opening_balance = customer.opening_balance + prev_invoices
-            
-            # Get invoices in range
-            invoices = db.query(models.Invoice).filter(
-                models.Invoice.customer_id == customer_id,
-                models.Invoice.date >= start_date,
-                models.Invoice.date <= end_date
-            ).order_by(models.Invoice.date).all()
-            
+            received_since = db.query(func.sum(models.Payment.amount)).filter(
+                models.Payment.customer_id == customer_id,
+                models.Payment.date >= start_date
+            ).scalar() or 0
+
+            opening_balance = (customer.balance or 0) - invoiced_since + received_since
+
+            # Get invoices and payments in range
+            invoices = db.query(Invoice).filter(
+                Invoice.customer_id == customer_id,
+                Invoice.date >= start_date,
+                Invoice.date <= end_date
+            ).all()
+            payments = db.query(models.Payment).filter(
+                models.Payment.customer_id == customer_id,
+                models.Payment.date >= start_date,
+                models.Payment.date <= end_date
+            ).all()
+
+            # Invoices sort before receipts dated the same day
+            rows = [(inv.date, 0, inv.id, f"Invoice #{inv.invoice_no}", inv.grand_total, 0) for inv in invoices]
+            rows += [
+                (p.date, 1, p.id, f"Receipt ({p.mode}{' - ' + p.reference if p.reference else ''})", 0, p.amount)
+                for p in payments
+            ]
+            rows.sort(key=lambda r: (r[0], r[1], r[2]))
+
             running_balance = opening_balance
-            for inv in invoices:
-                running_balance += inv.grand_total
+            for entry_date, _, _, particulars, debit, credit in rows:
+                running_balance += debit - credit
                 ledger_entries.append({
-                    "date": inv.date,
-                    "particulars": f"Invoice #{inv.invoice_no}",
-                    "debit": inv.grand_total,
-                    "credit": 0,
+                    "date": entry_date,
+                    "particulars": particulars,
+                    "debit": debit,
+                    "credit": credit,
                     "balance": running_balance
                 })
             
@@ -108,3 +132,74 @@ def customer_ledger(
         "closing_balance": closing_balance,
         "title": "Customer Ledger"
     })
+
+@router.get("/reports/statements")
+def bulk_statements(
+    start_date: date = Query(default=date.today().replace(day=1)),
+    end_date: date = Query(default=date.today()),
+    format: str = Query(default="html"),
+    shop: models.Shop = Depends(get_current_shop)
+):
+    """Statements for every customer of the shop, streamed as one HTML document or a ZIP of PDFs."""
+    if format not in ("html", "pdf"):
+        raise HTTPException(status_code=400, detail="format must be 'html' or 'pdf'")
+
+    shop_id = shop.id
+    shop_info = {
+        "name": shop.name,
+        "address_line1": shop.address_line1,
+        "city": shop.city,
+        "state": shop.state,
+        "gstin": shop.gstin,
+    }
+    context = {"shop": shop_info, "start_date": start_date, "end_date": end_date}
+
+    def statements():
+        # Own session: the request-scoped one is closed before the body streams
+        db = tenancy.session_for(shop_id)
+        try:
+            yield from statement_service.iter_statements(db, shop_id, start_date, end_date)
+        finally:
+            db.close()
+
+    if format == "html":
+        template = templates.env.get_template("reports/statements.html")
+        return StreamingResponse(
+            template.generate(statements=statements(), **context),
+            media_type="text/html"
+        )
+
+    pdf_template = templates.env.get_template("reports/statement_pdf.html")
+    filename = f"Statements-{start_date.isoformat()}-to-{end_date.isoformat()}.zip"
+    return StreamingResponse(
+        statement_service.stream_pdf_zip(
+            statements(),
+            lambda s: pdf_template.render(s=s, **context),
+            end_date
+        ),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/reports/aging")
+def receivables_aging(
+    request: Request,
+    as_of: Optional[date] = Query(default=None),
+    user: models.User = Depends(get_current_user),
+    shop: models.Shop = Depends(get_current_shop),
+    db: Session = Depends(get_read_db)
+):
+    as_of = as_of or date.today()
+    rows = payment_service.aging_summary(db, shop.id, as_of)
+    totals = {b: sum(r[b] for r in rows) for b in payment_service.AGING_BUCKETS}
+    totals["total"] = sum(r["total"] for r in rows)
+
+    return templates.TemplateResponse("reports/aging.html", {
+        "request": request,
+        "user": user,
+        "as_of": as_of,
+        "buckets": payment_service.AGING_BUCKETS,
+        "rows": rows,
+        "totals": totals,
+        "title": "Receivables Aging"
+    })
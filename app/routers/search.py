@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, Request, Query
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.templating import templates
+from app.dependencies import get_current_shop, get_current_user, require_scope
+from app import models
+from app.services import search_service
+from typing import List, Optional
+
+router = APIRouter(tags=["search"], dependencies=[Depends(require_scope("search"))])
+
+def _run_search(db: Session, shop: models.Shop, q: str, kind: Optional[List[str]], page: int):
+    page = max(page, 1)
+    limit = search_service.SEARCH_PAGE_SIZE
+    # Fetch one extra row to know whether there is a next page
+    results = search_service.search(db, shop.id, q, kinds=kind, limit=limit + 1, offset=(page - 1) * limit)
+    has_next = len(results) > limit
+    results = results[:limit]
+    for r in results:
+        r["url"] = search_service.result_url(r)
+    return results, page, has_next
+
+@router.get("/search")
+def search_page(
+    request: Request,
+    q: str = "",
+    kind: Optional[List[str]] = Query(None),
+    page: int = 1,
+    user: models.User = Depends(get_current_user),
+    shop: models.Shop = Depends(get_current_shop),
+    db: Session = Depends(get_db)
+):
+    results, page, has_next = _run_search(db, shop, q, kind, page)
+    return templates.TemplateResponse("search/results.html", {
+        "request": request,
+        "user": user,
+        "q": q,
+        "kinds": kind or [],
+        "results": results,
+        "page": page,
+        "has_next": has_next,
+        "title": "Search"
+    })
+
+@router.get("/search/data")
+def search_json(
+    q: str = "",
+    kind: Optional[List[str]] = Query(None),
+    page: int = 1,
+    shop: models.Shop = Depends(get_current_shop),
+    db: Session = Depends(get_db)
+):
+    results, page, has_next = _run_search(db, shop, q, kind, page)
+    return {"results": results, "page": page, "has_next": has_next}
@@ -9,22 +9,24 @@ from fastapi import (
     UploadFile, File
 )
 from fastapi.responses import RedirectResponse, JSONResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, NamedTuple, Optional
 from pathlib import Path
 from datetime import datetime
-import uuid
+import logging
 
 from app.database import get_db
+from app.templating import templates
 from app import models
-from app.dependencies import get_current_user
-from app.services import validation_service, encryption_service
-from app.services.auth_service import get_password_hash, verify_password
-from app.storage import save_upload, get_file_url  # NEW: Use storage abstraction
+from app.dependencies import get_current_user, get_session_user, require_scope
+from app.services import validation_service, encryption_service, password_service, api_token_service
+from app.services import image_service, principal_service, revocation_service
+from app.storage import UploadRejected, content_addressed_path, save_derived, save_upload_addressed, get_file_url  # NEW: Use storage abstraction
 
-router = APIRouter(prefix="/settings", tags=["settings"])
-templates = Jinja2Templates(directory="app/templates")
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/settings", tags=["settings"], dependencies=[Depends(require_scope("settings"))])
 
 # ========== UPLOAD CONFIG ==========
 # Allowed extensions & size
@@ -38,18 +40,55 @@ def _parse_bool_from_form(val: Optional[str]) -> bool:
     return True if val in ("on", "true", "1", True) else False
 
 
-def save_upload_file(upload_file: UploadFile, subdirectory: str, prefix: str) -> str:
+# Leading bytes of the raster formats we accept
+_RASTER_SIGNATURES = (
+    b"\x89PNG\r\n\x1a\n",   # PNG
+    b"\xff\xd8\xff",          # JPEG
+    b"GIF87a", b"GIF89a",     # GIF
+)
+
+
+def _image_sniffer(ext: str):
+    """
+    Check the first chunk of an upload is really an image. Raster extensions
+    accept any raster format (JPEGs saved as .png are common); .svg must be SVG.
+    """
+    def sniff(head: bytes) -> None:
+        if ext == ".svg":
+            ok = b"<svg" in head[:4096].lower()
+        else:
+            ok = head.startswith(_RASTER_SIGNATURES) or (head.startswith(b"RIFF") and head[8:12] == b"WEBP")
+        if not ok:
+            raise UploadRejected("File content is not a supported image")
+    return sniff
+
+
+class SavedUpload(NamedTuple):
+    url: str
+    # image_service variant records, empty for SVGs; None when identical
+    # content was already stored (its variants are already recorded)
+    variants: Optional[List[dict]]
+
+
+def save_upload_file(upload_file: UploadFile, subdirectory: str) -> SavedUpload:
     """
     Save uploaded file using storage abstraction (S3 or local).
-    Returns accessible URL/path for the file.
+    Returns accessible URL/path for the file and its optimised variants.
+    
+    The file is streamed to storage in one pass: size and content type are
+    checked chunk by chunk and a SHA-256 is computed on the way, which
+    becomes the file name ("logos/<sha256>.png"). Identical uploads share
+    one object, so a re-upload changes nothing and stays cached. New raster
+    images then get print/screen variants (see image_service); record them
+    with image_service.record_variants. This does blocking I/O, so async
+    handlers run it with run_in_threadpool.
     
     Args:
         upload_file: FastAPI UploadFile object
         subdirectory: Folder name (e.g., 'logos', 'avatars', 'qr_codes')
-        prefix: Filename prefix (e.g., 'shop_1', 'user_5')
     
     Returns:
-        Web-accessible URL or path
+        SavedUpload with the web-accessible URL or path of the original
     
     Raises:
         HTTPException: On validation errors or upload failures
@@ -67,38 +106,33 @@ def save_upload_file(upload_file: UploadFile, subdirectory: str, prefix: str) ->
         raise HTTPException(status_code=400, detail=f"Unsupported file type: {ext}")
 
     # Basic content-type check (allow svg via extension)
-    if not upload_file.content_type.startswith("image/") and ext != ".svg":
+    if not (upload_file.content_type or "").startswith("image/") and ext != ".svg":
         raise HTTPException(status_code=400, detail="Uploaded file must be an image")
 
-    # Validate file size by reading in chunks
-    upload_file.file.seek(0)  # Reset file pointer
-    file_size = 0
-    chunk_size = 1024 * 64  # 64KB chunks
-    
-    # Create temporary file-like object to validate size
-    chunks = []
-    while True:
-        chunk = upload_file.file.read(chunk_size)
-        if not chunk:
-            break
-        file_size += len(chunk)
-        if file_size > MAX_UPLOAD_BYTES:
-            raise HTTPException(status_code=400, detail="File too large (max 4 MB)")
-        chunks.append(chunk)
-    
-    # Reset file pointer and create a bytes object
-    upload_file.file.seek(0)
-
-    # Create unique filename
-    uid = uuid.uuid4().hex
-    safe_name = f"{prefix}_{uid}{ext}"
-    file_path = f"{subdirectory}/{safe_name}"
-
     try:
-        # Use storage abstraction - automatically handles S3 or local storage
-        web_path = save_upload(upload_file.file, file_path)
-        return web_path
+        upload_file.file.seek(0)
+        stored = save_upload_addressed(
+            upload_file.file,
+            subdirectory,
+            ext,
+            max_bytes=MAX_UPLOAD_BYTES,
+            content_type=upload_file.content_type,
+            sniff=_image_sniffer(ext),
+        )
+        if stored.deduplicated:
+            logger.info(f"Upload matches stored {stored.url}")
+            return SavedUpload(stored.url, None)
+        logger.info(f"Stored upload {stored.url} ({stored.size} bytes)")
+        
+        variants = []
+        if ext != ".svg":
+            upload_file.file.seek(0)
+            file_path = content_addressed_path(subdirectory, stored.sha256, ext)
+            variants = image_service.store_variants(upload_file.file, file_path, subdirectory, save_derived)
+        return SavedUpload(stored.url, variants)
     
+    except UploadRejected as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -196,15 +230,16 @@ async def upload_avatar(
     """Upload user avatar using storage abstraction (S3 or local)."""
     try:
         # Save file using storage abstraction
-        avatar_web_path = save_upload_file(avatar, "avatars", f"user_{user.id}")
+        saved = await run_in_threadpool(save_upload_file, avatar, "avatars")
 
         # Update user record
-        user.avatar_path = avatar_web_path
+        user.avatar_path = saved.url
+        image_service.record_variants(db, saved.url, saved.variants)
         user.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(user)
 
-        return JSONResponse({"success": True, "avatar_path": avatar_web_path})
+        return JSONResponse({"success": True, "avatar_path": get_file_url(saved.url)})
     except HTTPException:
         raise
     except Exception as e:
@@ -310,13 +345,14 @@ async def upload_shop_logo(
             raise HTTPException(status_code=404, detail="Shop not found")
 
         # Save using storage abstraction
-        logo_web_path = save_upload_file(logo, "logos", f"shop_{shop.id}")
-        shop.logo_path = logo_web_path
+        saved = await run_in_threadpool(save_upload_file, logo, "logos")
+        shop.logo_path = saved.url
+        image_service.record_variants(db, saved.url, saved.variants)
         shop.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(shop)
 
-        return JSONResponse({"success": True, "logo_path": logo_web_path})
+        return JSONResponse({"success": True, "logo_path": get_file_url(saved.url)})
     except HTTPException:
         raise
     except Exception as e:
@@ -337,13 +373,14 @@ async def upload_signature(
             raise HTTPException(status_code=404, detail="Shop not found")
 
         # Save using storage abstraction
-        sig_web_path = save_upload_file(signature, "signatures", f"shop_{shop.id}")
-        shop.signature_path = sig_web_path
+        saved = await run_in_threadpool(save_upload_file, signature, "signatures")
+        shop.signature_path = saved.url
+        image_service.record_variants(db, saved.url, saved.variants)
         shop.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(shop)
 
-        return JSONResponse({"success": True, "signature_path": sig_web_path})
+        return JSONResponse({"success": True, "signature_path": get_file_url(saved.url)})
     except HTTPException:
         raise
     except Exception as e:
@@ -470,7 +507,7 @@ async def upload_qr_code(
             raise HTTPException(status_code=404, detail="Shop not found")
 
         # Save using storage abstraction
-        qr_web_path = save_upload_file(qr_code, "qr_codes", f"shop_{shop.id}")
+        saved = await run_in_threadpool(save_upload_file, qr_code, "qr_codes")
 
         bank_details = db.query(models.BankDetail).filter(
             models.BankDetail.shop_id == shop.id
@@ -479,12 +516,13 @@ async def upload_qr_code(
         if not bank_details:
             raise HTTPException(status_code=404, detail="Bank details not found. Please add bank details first.")
 
-        bank_details.qr_code_path = qr_web_path
+        bank_details.qr_code_path = saved.url
+        image_service.record_variants(db, saved.url, saved.variants)
         bank_details.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(bank_details)
 
-        return JSONResponse({"success": True, "qr_code_path": qr_web_path})
+        return JSONResponse({"success": True, "qr_code_path": get_file_url(saved.url)})
     except HTTPException:
         raise
     except Exception as e:
@@ -503,6 +541,8 @@ async def get_security(
     return templates.TemplateResponse("settings/security.html", {
         "request": request,
         "user": user,
+        "api_tokens": api_token_service.list_tokens(db, user.id),
+        "api_scopes": api_token_service.SCOPES,
         "active_tab": "security"
     })
 
@@ -511,19 +551,19 @@ async def change_password(
     current_password: str = Form(...),
     new_password: str = Form(...),
     confirm_password: str = Form(...),
-    user: models.User = Depends(get_current_user),
+    user: models.User = Depends(get_session_user),
     db: Session = Depends(get_db)
 ):
     """Change user password with basic checks."""
     try:
-        if not verify_password(current_password, user.hashed_password):
+        if not await password_service.verify_password(current_password, user.hashed_password):
             raise HTTPException(status_code=400, detail="Current password is incorrect")
         if new_password != confirm_password:
             raise HTTPException(status_code=400, detail="New passwords do not match")
         if len(new_password) < 8:
             raise HTTPException(status_code=400, detail="Password must be at least 8 characters long")
 
-        user.hashed_password = get_password_hash(new_password)
+        user.hashed_password = await password_service.hash_password(new_password)
         user.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(user)
@@ -538,22 +578,54 @@ async def change_password(
 
 @router.post("/security/logout-all")
 async def logout_all_sessions(
-    user: models.User = Depends(get_current_user),
+    user: models.User = Depends(get_session_user),
     db: Session = Depends(get_db)
 ):
-    """Revoke all API tokens for the user (logout everywhere)."""
+    """Revoke all API tokens and login sessions for the user (logout everywhere)."""
     try:
         db.query(models.APIToken).filter(
             models.APIToken.user_id == user.id,
             models.APIToken.revoked == False
         ).update({"revoked": True})
+        revocation_service.revoke_subject(db, user.email)
         db.commit()
+        principal_service.invalidate_users({user.id})
         return JSONResponse({"success": True, "message": "Logged out from all devices"})
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error logging out: {str(e)}")
 
 
+@router.post("/security/api-tokens")
+async def create_api_token(
+    request: Request,
+    user: models.User = Depends(get_session_user),
+    db: Session = Depends(get_db)
+):
+    """Issue an API token; the raw value is returned once and never stored."""
+    form = await request.form()
+    try:
+        token, raw = api_token_service.issue_token(db, user, form.get("name"), form.getlist("scopes"))
+        db.commit()
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse({"success": True, "id": token.id, "token": raw, "scopes": token.scopes})
+
+
+@router.post("/security/api-tokens/{token_id}/revoke")
+async def revoke_api_token(
+    token_id: int,
+    user: models.User = Depends(get_session_user),
+    db: Session = Depends(get_db)
+):
+    """Revoke one API token."""
+    if not api_token_service.revoke_token(db, user.id, token_id):
+        raise HTTPException(status_code=404, detail="API token not found")
+    db.commit()
+    return JSONResponse({"success": True, "message": "API token revoked"})
+
+
 # ========== NOTIFICATIONS ENDPOINTS ==========
 @router.get("/notifications", response_class=HTMLResponse)
 async def get_notifications(
@@ -0,0 +1,81 @@
+"""
+Database schema version, managed by Alembic (migrations/, alembic.ini).
+
+Workers no longer create tables on boot. The schema is migrated once per
+deploy (`alembic upgrade head`, run by entrypoint.sh), and each worker only
+checks that the database is at the revision this code was written for:
+
+- verify(engine): raises SchemaOutOfDate if the database is behind (or
+  ahead of) the migrations shipped with the code. One query.
+- upgrade(engine): runs the migrations on that engine (setup scripts,
+  benchmarks and tests with a scratch database).
+"""
+import os
+import re
+from typing import Optional, Set
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALEMBIC_INI = os.path.join(ROOT, "alembic.ini")
+
+# Tables the models do not describe: search_documents (and its FTS5 shadow
+# tables) and the fiscal-year partitions of invoices
+UNMANAGED_TABLES = re.compile(r"^(search_documents(_\w+)?|invoices_fy\d{4}|invoices_default|invoices_unpartitioned)$")
+
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    """Autogenerate filter: leave UNMANAGED_TABLES alone."""
+    return not (type_ == "table" and reflected and compare_to is None and UNMANAGED_TABLES.match(name))
+
+
+class SchemaOutOfDate(RuntimeError):
+    """The database is not at the code's Alembic head revision."""
+
+
+def alembic_config() -> Config:
+    config = Config(ALEMBIC_INI)
+    # Absolute, so this works from any working directory
+    config.set_main_option("script_location", os.path.join(ROOT, "migrations"))
+    return config
+
+
+def head_revisions() -> Set[str]:
+    return set(ScriptDirectory.from_config(alembic_config()).get_heads())
+
+
+def current_revisions(engine: Engine) -> Set[str]:
+    with engine.connect() as conn:
+        return set(MigrationContext.configure(conn).get_current_heads())
+
+
+def verify(engine: Engine) -> None:
+    """Refuse to run against a database whose schema does not match the code."""
+    if not settings.DB_SCHEMA_CHECK:
+        return
+    current, expected = current_revisions(engine), head_revisions()
+    if current == expected:
+        return
+    if not current:
+        problem = "has no Alembic revision (new database, or created before migrations)"
+    else:
+        problem = f"is at revision {', '.join(sorted(current))}"
+    raise SchemaOutOfDate(
+        f"Database {problem}; this code needs {', '.join(sorted(expected))}. "
+        f"Run `alembic upgrade head` first."
+    )
+
+
+def upgrade(engine: Engine, revision: str = "head", config: Optional[Config] = None) -> None:
+    """Migrate the database behind `engine` (the same as `alembic upgrade head`)."""
+    config = config or alembic_config()
+    with engine.begin() as conn:
+        config.attributes["connection"] = conn
+        config.attributes["configure_logger"] = False
+        command.upgrade(config, revision)
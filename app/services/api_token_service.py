@@ -0,0 +1,105 @@
+"""
+API Token Service for WinderInvoice
+Long-lived tokens for machine clients (integrations, scripts).
+
+A token is shown to the user once at creation; only its SHA-256 is stored
+(encryption_service.hash_token), in the unique-indexed token_hash column.
+Verifying one is a single indexed lookup - no bcrypt, no JWT.
+
+Scopes are router names. "invoices" grants everything under the invoices
+router, "invoices:read" only GET/HEAD requests; "*" grants all routers.
+"""
+import secrets
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, joinedload
+
+from app import models
+from app.services.encryption_service import hash_token
+
+# Tells API tokens apart from JWTs in an Authorization header
+TOKEN_PREFIX = "wit_"
+
+SCOPES = ("dashboard", "invoices", "payments", "masters", "reports", "search", "settings")
+ALL_SCOPES = "*"
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def is_api_token(token: Optional[str]) -> bool:
+    return bool(token) and token.startswith(TOKEN_PREFIX)
+
+
+def normalize_scopes(scopes: Iterable[str]) -> List[str]:
+    """
+    Validate requested scopes.
+
+    Raises:
+        ValueError: On an unknown scope or an empty list.
+    """
+    result = []
+    for scope in scopes:
+        scope = (scope or "").strip()
+        if not scope:
+            continue
+        name, _, access = scope.partition(":")
+        if scope != ALL_SCOPES and (name not in SCOPES or access not in ("", "read")):
+            raise ValueError(f"Unknown scope: {scope}")
+        if scope not in result:
+            result.append(scope)
+    if not result:
+        raise ValueError("Select at least one scope")
+    return result
+
+
+def scope_allows(scopes: Optional[List[str]], router: str, method: str) -> bool:
+    scopes = scopes or []
+    if ALL_SCOPES in scopes or router in scopes:
+        return True
+    return method in READ_METHODS and f"{router}:read" in scopes
+
+
+def issue_token(db: Session, user: models.User, name: str, scopes: Iterable[str]) -> Tuple[models.APIToken, str]:
+    """
+    Create a token for `user`.
+
+    Returns:
+        (APIToken, raw token) - the raw value is not stored and can't be shown again.
+
+    The caller is responsible for committing the session.
+    """
+    raw = TOKEN_PREFIX + secrets.token_urlsafe(32)
+    token = models.APIToken(
+        user_id=user.id,
+        name=(name or "").strip() or None,
+        token_hash=hash_token(raw),
+        scopes=normalize_scopes(scopes),
+        revoked=False,
+    )
+    db.add(token)
+    return token, raw
+
+
+def authenticate(db: Session, raw: str) -> Optional[models.APIToken]:
+    """The live token for `raw` with its user and shop loaded, in one query; None if unknown or revoked."""
+    return db.query(models.APIToken).options(
+        joinedload(models.APIToken.user).joinedload(models.User.shop)
+    ).filter(
+        models.APIToken.token_hash == hash_token(raw),
+        models.APIToken.revoked == False,  # noqa: E712
+    ).first()
+
+
+def list_tokens(db: Session, user_id: int) -> List[models.APIToken]:
+    return db.query(models.APIToken).filter(
+        models.APIToken.user_id == user_id
+    ).order_by(models.APIToken.revoked, models.APIToken.id.desc()).all()
+
+
+def revoke_token(db: Session, user_id: int, token_id: int) -> bool:
+    """Mark one of the user's tokens revoked. The caller commits."""
+    count = db.query(models.APIToken).filter(
+        models.APIToken.id == token_id,
+        models.APIToken.user_id == user_id,
+    ).update({"revoked": True}, synchronize_session=False)
+    return bool(count)
@@ -0,0 +1,379 @@
+"""
+Archive Service for WinderInvoice
+Fiscal-year (April-March) archival of invoices so the live tables only hold
+recent and still-open business.
+
+Backends:
+- Postgres: `invoices` is a declaratively partitioned table (RANGE on date,
+  one partition per fiscal year; see scripts/partition_invoices.py). Archiving
+  a year moves its partition to ARCHIVE_TABLESPACE when configured. Partitions
+  stay attached, so every query with a date predicate is pruned to the years
+  it needs and no read path has to change.
+- SQLite: a closed year's Paid/Cancelled invoices, their items and the
+  payment allocations against them are moved to
+  ARCHIVE_PATH/invoices_fy<year>.db, so no live row points at an invoice
+  that is no longer there. Read paths ask invoice_source() for
+  the invoices to query; it ATTACHes and UNIONs only the archive files that
+  overlap the requested date range.
+
+Invoices that are still open (Generated / Partially Paid) are never archived,
+so payments, aging and balances only ever touch the live tables.
+"""
+import os
+from datetime import date, timedelta
+from typing import List, Optional
+
+from sqlalchemy import Column, MetaData, Table, create_engine, func, select, text, union_all
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app import models
+from app.config import settings
+from app.services.payment_service import OPEN_STATUSES
+
+FISCAL_YEAR_START_MONTH = 4
+
+
+# ========== FISCAL YEARS ==========
+def fiscal_year_of(day: date) -> int:
+    """Fiscal year containing `day`, named by the calendar year it starts in."""
+    return day.year if day.month >= FISCAL_YEAR_START_MONTH else day.year - 1
+
+
+def fiscal_year_bounds(fiscal_year: int):
+    """(first day, last day) of a fiscal year."""
+    start = date(fiscal_year, FISCAL_YEAR_START_MONTH, 1)
+    return start, date(fiscal_year + 1, FISCAL_YEAR_START_MONTH, 1) - timedelta(days=1)
+
+
+def fiscal_year_label(fiscal_year: int) -> str:
+    return f"{fiscal_year}-{(fiscal_year + 1) % 100:02d}"
+
+
+def latest_archivable_year(today: Optional[date] = None) -> int:
+    """Newest fiscal year whose books are closed (ended ARCHIVE_GRACE_DAYS ago)."""
+    today = today or date.today()
+    return fiscal_year_of(today - timedelta(days=settings.ARCHIVE_GRACE_DAYS)) - 1
+
+
+def archived_years(db: Session) -> List[models.ArchivedFiscalYear]:
+    return db.query(models.ArchivedFiscalYear).order_by(models.ArchivedFiscalYear.fiscal_year).all()
+
+
+# ========== SQLITE ARCHIVE FILES ==========
+def _schema(fiscal_year: int) -> str:
+    return f"fy{fiscal_year}"
+
+
+def _archive_file(fiscal_year: int) -> str:
+    return os.path.abspath(os.path.join(settings.ARCHIVE_PATH, f"invoices_fy{fiscal_year}.db"))
+
+
+def _attach(conn: Connection, fiscal_year: int, path: Optional[str] = None) -> str:
+    """ATTACH an archive file to this connection once; returns its schema name."""
+    schema = _schema(fiscal_year)
+    if schema not in _attached(conn):
+        conn.exec_driver_sql(f"ATTACH DATABASE ? AS {schema}", (path or _archive_file(fiscal_year),))
+    return schema
+
+
+def _attached(conn: Connection) -> set:
+    return {row[1] for row in conn.exec_driver_sql("PRAGMA database_list")}
+
+
+_archive_tables = {}
+
+
+def _archive_table(table: Table, schema: str) -> Table:
+    """Column-only copy of a model table living in an attached archive database."""
+    key = (table.name, schema)
+    if key not in _archive_tables:
+        _archive_tables[key] = Table(
+            table.name, MetaData(), *[Column(c.name, c.type) for c in table.columns], schema=schema
+        )
+    return _archive_tables[key]
+
+
+def _overlapping(db: Session, start_date: Optional[date], end_date: Optional[date]) -> List[models.ArchivedFiscalYear]:
+    query = db.query(models.ArchivedFiscalYear)
+    if start_date:
+        query = query.filter(models.ArchivedFiscalYear.end_date >= start_date)
+    if end_date:
+        query = query.filter(models.ArchivedFiscalYear.start_date <= end_date)
+    return query.order_by(models.ArchivedFiscalYear.fiscal_year).all()
+
+
+def _uses_archive_files(db: Session) -> bool:
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def archive_boundary(db: Session) -> Optional[date]:
+    """Last day covered by an archive file (None if nothing is archived)."""
+    if not _uses_archive_files(db):
+        return None
+    return db.query(func.max(models.ArchivedFiscalYear.end_date)).scalar()
+
+
+def invoice_source(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """
+    Invoice entity to query for a date range.
+
+    Returns models.Invoice itself when no archive file overlaps the range
+    (always, on Postgres); otherwise an alias of the live table UNION ALL the
+    overlapping archive tables, usable anywhere models.Invoice is.
+    """
+    if not _uses_archive_files(db):
+        return models.Invoice
+    years = _overlapping(db, start_date, end_date)
+    if not years:
+        return models.Invoice
+
+    table = models.Invoice.__table__
+    names = [c.name for c in table.columns]
+    conn = db.connection()
+    selects = [select(*[table.c[n] for n in names])]
+    for year in years:
+        archive = _archive_table(table, _attach(conn, year.fiscal_year, year.location))
+        selects.append(select(*[archive.c[n] for n in names]))
+    return aliased(models.Invoice, union_all(*selects).subquery("invoices"), adapt_on_names=True)
+
+
+def find_archived_invoice(db: Session, shop_id: int, invoice_id: int) -> Optional[models.Invoice]:
+    """
+    Load an archived invoice (with items and customer) as a detached, read-only
+    object for the view/print pages.
+
+    The invoice's year isn't known up front, so each archive file is probed in
+    turn and detached again afterwards (SQLite allows only 10 attached
+    databases per connection).
+    """
+    if not _uses_archive_files(db):
+        return None
+    conn = db.connection()
+    invoice_table = models.Invoice.__table__
+    item_table = models.InvoiceItem.__table__
+    for year in archived_years(db):
+        was_attached = _schema(year.fiscal_year) in _attached(conn)
+        schema = _attach(conn, year.fiscal_year, year.location)
+        try:
+            archived = _archive_table(invoice_table, schema)
+            row = conn.execute(select(archived).where(
+                archived.c.id == invoice_id, archived.c.shop_id == shop_id
+            )).mappings().first()
+            if row is None:
+                continue
+
+            items = _archive_table(item_table, schema)
+            invoice = models.Invoice(**row)
+            set_committed_value(invoice, "items", [
+                models.InvoiceItem(**item)
+                for item in conn.execute(
+                    select(items).where(items.c.invoice_id == invoice_id).order_by(items.c.id)
+                ).mappings()
+            ])
+        finally:
+            if not was_attached:
+                conn.exec_driver_sql(f"DETACH DATABASE {schema}")
+        set_committed_value(invoice, "customer", db.get(models.Customer, invoice.customer_id) if invoice.customer_id else None)
+        return invoice
+    return None
+
+
+def archived_totals(db: Session, shop_id: int) -> dict:
+    """Lifetime totals of a shop's invoices that were moved to archive files."""
+    t = models.ArchivedInvoiceTotal
+    row = db.query(
+        func.coalesce(func.sum(t.invoice_count), 0),
+        func.coalesce(func.sum(t.grand_total), 0.0),
+        func.coalesce(func.sum(t.cgst_amount), 0.0),
+        func.coalesce(func.sum(t.sgst_amount), 0.0),
+        func.coalesce(func.sum(t.igst_amount), 0.0),
+    ).filter(t.shop_id == shop_id).one()
+    return {
+        "invoice_count": int(row[0]),
+        "grand_total": row[1],
+        "cgst_amount": row[2],
+        "sgst_amount": row[3],
+        "igst_amount": row[4],
+    }
+
+
+def _archive_sqlite(engine: Engine, fiscal_year: int, dry_run: bool) -> dict:
+    start, end = fiscal_year_bounds(fiscal_year)
+    path = _archive_file(fiscal_year)
+    invoice_table = models.Invoice.__table__
+    item_table = models.InvoiceItem.__table__
+    allocation_table = models.PaymentAllocation.__table__
+    invoice_cols = ", ".join(c.name for c in invoice_table.columns)
+    item_cols = ", ".join(c.name for c in item_table.columns)
+    allocation_cols = ", ".join(c.name for c in allocation_table.columns)
+    statuses = ", ".join(f"'{s}'" for s in OPEN_STATUSES)
+
+    # Closed invoices of the year. The rows holding the highest invoice / item
+    # / allocation ids stay behind so SQLite never hands those ids out again.
+    candidates = (
+        f"SELECT id FROM main.invoices WHERE date BETWEEN :start AND :end "
+        f"AND status NOT IN ({statuses}) "
+        f"AND id <> (SELECT MAX(id) FROM main.invoices) "
+        f"AND id NOT IN (SELECT invoice_id FROM main.invoice_items "
+        f"WHERE id = (SELECT MAX(id) FROM main.invoice_items)) "
+        f"AND id NOT IN (SELECT invoice_id FROM main.payment_allocations "
+        f"WHERE id = (SELECT MAX(id) FROM main.payment_allocations))"
+    )
+    params = {"start": start, "end": end}
+
+    with engine.connect() as conn:
+        invoice_count = conn.execute(text(f"SELECT COUNT(*) FROM ({candidates})"), params).scalar()
+        item_count = conn.execute(text(
+            f"SELECT COUNT(*) FROM main.invoice_items WHERE invoice_id IN ({candidates})"
+        ), params).scalar()
+        result = {"fiscal_year": fiscal_year, "location": path, "invoices": invoice_count, "items": item_count}
+        if dry_run or not invoice_count:
+            return result
+
+    # Create the archive file with the live schema (indexes included)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    archive_engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(archive_engine, tables=[invoice_table, item_table, allocation_table])
+    archive_engine.dispose()
+
+    with engine.connect() as conn:
+        schema = _attach(conn, fiscal_year, path)
+        # One write transaction across main and the archive file
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        conn.execute(text(f"CREATE TEMP TABLE archive_ids AS {candidates}"), params)
+        conn.execute(text(
+            f"INSERT INTO {schema}.invoices ({invoice_cols}) "
+            f"SELECT {invoice_cols} FROM main.invoices WHERE id IN (SELECT id FROM archive_ids)"
+        ))
+        conn.execute(text(
+            f"INSERT INTO {schema}.invoice_items ({item_cols}) "
+            f"SELECT {item_cols} FROM main.invoice_items WHERE invoice_id IN (SELECT id FROM archive_ids)"
+        ))
+        # Allocations against every archived invoice of the year, including
+        # ones swept by an earlier run that left their allocations behind
+        archived_allocations = (
+            f"invoice_id IN (SELECT id FROM {schema}.invoices) "
+            f"AND id <> (SELECT MAX(id) FROM main.payment_allocations)"
+        )
+        conn.execute(text(
+            f"INSERT INTO {schema}.payment_allocations ({allocation_cols}) "
+            f"SELECT {allocation_cols} FROM main.payment_allocations WHERE {archived_allocations}"
+        ))
+        conn.execute(text(
+            "INSERT INTO archived_invoice_totals (fiscal_year, shop_id, invoice_count, taxable_amount, "
+            "cgst_amount, sgst_amount, igst_amount, grand_total) "
+            "SELECT :fy, shop_id, COUNT(*), COALESCE(SUM(taxable_amount), 0), COALESCE(SUM(cgst_amount), 0), "
+            "COALESCE(SUM(sgst_amount), 0), COALESCE(SUM(igst_amount), 0), COALESCE(SUM(grand_total), 0) "
+            "FROM main.invoices WHERE id IN (SELECT id FROM archive_ids) GROUP BY shop_id"
+        ), {"fy": fiscal_year})
+        conn.execute(text(f"DELETE FROM main.payment_allocations WHERE {archived_allocations}"))
+        conn.execute(text("DELETE FROM main.invoice_items WHERE invoice_id IN (SELECT id FROM archive_ids)"))
+        conn.execute(text("DELETE FROM main.invoices WHERE id IN (SELECT id FROM archive_ids)"))
+        conn.execute(text("DROP TABLE archive_ids"))
+        _record(conn, fiscal_year, path, invoice_count, item_count)
+        conn.commit()
+    return result
+
+
+# ========== POSTGRES PARTITIONS ==========
+def partition_name(fiscal_year: int) -> str:
+    return f"invoices_fy{fiscal_year}"
+
+
+def is_partitioned(conn: Connection) -> bool:
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'invoices' AND c.relnamespace = 'public'::regnamespace"
+    )).scalar())
+
+
+def create_partition(conn: Connection, fiscal_year: int) -> None:
+    start, end = fiscal_year_bounds(fiscal_year)
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(fiscal_year)} PARTITION OF invoices "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{(end + timedelta(days=1)).isoformat()}')"
+    ))
+
+
+def ensure_partitions(engine: Engine, today: Optional[date] = None) -> None:
+    """Make sure the current and next fiscal year have partitions (Postgres only)."""
+    if engine.dialect.name != "postgresql":
+        return
+    current = fiscal_year_of(today or date.today())
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return
+        for fiscal_year in (current, current + 1):
+            create_partition(conn, fiscal_year)
+
+
+def _archive_postgres(engine: Engine, fiscal_year: int, dry_run: bool) -> dict:
+    start, end = fiscal_year_bounds(fiscal_year)
+    name = partition_name(fiscal_year)
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            raise RuntimeError("invoices is not partitioned; run scripts/partition_invoices.py first")
+        invoice_count = conn.execute(text(
+            "SELECT COUNT(*) FROM invoices WHERE date BETWEEN :start AND :end"
+        ), {"start": start, "end": end}).scalar()
+        item_count = conn.execute(text(
+            "SELECT COUNT(*) FROM invoice_items WHERE invoice_id IN "
+            "(SELECT id FROM invoices WHERE date BETWEEN :start AND :end)"
+        ), {"start": start, "end": end}).scalar()
+        result = {"fiscal_year": fiscal_year, "location": name, "invoices": invoice_count, "items": item_count}
+        if dry_run:
+            return result
+
+        create_partition(conn, fiscal_year)
+        if settings.ARCHIVE_TABLESPACE:
+            conn.execute(text(f'ALTER TABLE {name} SET TABLESPACE "{settings.ARCHIVE_TABLESPACE}"'))
+        _record(conn, fiscal_year, name, invoice_count, item_count)
+        conn.commit()
+    return result
+
+
+def _record(conn: Connection, fiscal_year: int, location: str, invoice_count: int, item_count: int) -> None:
+    start, end = fiscal_year_bounds(fiscal_year)
+    t = models.ArchivedFiscalYear.__table__
+    existing = conn.execute(select(t.c.invoice_count, t.c.item_count).where(t.c.fiscal_year == fiscal_year)).first()
+    if existing is None:
+        conn.execute(t.insert().values(
+            fiscal_year=fiscal_year, start_date=start, end_date=end, location=location,
+            invoice_count=invoice_count, item_count=item_count,
+        ))
+    elif location.endswith(".db"):
+        # Re-running a SQLite archive sweeps invoices that have since been settled
+        conn.execute(t.update().where(t.c.fiscal_year == fiscal_year).values(
+            invoice_count=(existing.invoice_count or 0) + invoice_count,
+            item_count=(existing.item_count or 0) + item_count,
+        ))
+
+
+# ========== ENTRY POINT ==========
+def archive_fiscal_year(engine: Engine, fiscal_year: int, dry_run: bool = False, force: bool = False) -> dict:
+    """
+    Move a closed fiscal year to cold storage.
+
+    Args:
+        force: Allow years newer than latest_archivable_year().
+
+    Returns:
+        {"fiscal_year", "location", "invoices", "items"} (counts moved, or to be moved on a dry run)
+
+    Raises:
+        ValueError: If the year is not closed yet.
+    """
+    if not force and fiscal_year > latest_archivable_year():
+        raise ValueError(
+            f"FY {fiscal_year_label(fiscal_year)} is not closed yet "
+            f"(latest archivable year is {fiscal_year_label(latest_archivable_year())})"
+        )
+    if engine.dialect.name == "sqlite":
+        result = _archive_sqlite(engine, fiscal_year, dry_run)
+        if not dry_run:
+            # Pooled connections re-ATTACH on demand
+            engine.dispose()
+        return result
+    return _archive_postgres(engine, fiscal_year, dry_run)
@@ -1,5 +1,7 @@
 # app/services/auth_service.py
 import bcrypt
+import time
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import jwt
@@ -32,7 +34,7 @@ def get_password_hash(password: str) -> str:
     """
     safe_bytes = _truncate_password_to_72_bytes(password)
     try:
-        hashed = bcrypt.hashpw(safe_bytes, bcrypt.gensalt())
+        hashed = bcrypt.hashpw(safe_bytes, bcrypt.gensalt(settings.BCRYPT_ROUNDS))
         return hashed.decode("utf-8")
     except Exception as e:
         # log or re-raise as needed
@@ -57,6 +59,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    # jti identifies this token for revocation; iat (sub-second) orders it
+    # against "log out everywhere" cut-offs
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
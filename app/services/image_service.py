@@ -0,0 +1,164 @@
+"""
+Image Service for WinderInvoice
+Upload-time optimisation of logos, signatures, QR codes and avatars.
+
+Each raster upload is decoded once, rotated upright from its EXIF
+orientation and re-encoded without metadata into small variants:
+
+- "print":  PNG, capped for ~300 DPI at the size the invoice templates use.
+            xhtml2pdf (reportlab) can't read WebP, so PDFs get this one.
+- "screen": WebP, capped for on-screen previews.
+
+The original stays in storage untouched. Variants are recorded in
+image_variants against the original's path; variant_url() falls back to the
+original when there is no variant (SVGs, files uploaded before this existed).
+"""
+import io
+import logging
+from pathlib import PurePosixPath
+from typing import BinaryIO, Dict, Iterable, List, Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+VARIANT_PRINT = "print"
+VARIANT_SCREEN = "screen"
+
+# Longest-edge caps per upload folder: (print px, screen px)
+PROFILES = {
+    "logos": (600, 320),        # printed 60px tall; 600px keeps wide logos sharp
+    "signatures": (600, 320),
+    "qr_codes": (480, 320),     # printed 100px wide; QR modules need crisp edges
+    "avatars": (256, 128),
+}
+DEFAULT_PROFILE = (600, 320)
+
+# Decompression-bomb guard: refuse anything with more pixels than this
+MAX_SOURCE_PIXELS = 40_000_000
+
+
+def _variant_path(path: str, variant: str, ext: str) -> str:
+    p = PurePosixPath(path)
+    return str(p.with_name(f"{p.stem}.{variant}{ext}"))
+
+
+def _prepare(img: Image.Image) -> Image.Image:
+    img = ImageOps.exif_transpose(img)
+    if img.mode in ("RGB", "RGBA"):
+        return img
+    if img.mode in ("P", "PA", "LA") or "transparency" in img.info:
+        return img.convert("RGBA")
+    return img.convert("RGB")
+
+
+def _encode(img: Image.Image, fmt: str) -> bytes:
+    out = io.BytesIO()
+    if fmt == "PNG":
+        # A 256-colour palette keeps flat-colour logos/QRs/signatures tiny.
+        # Octree copes with alpha and with JPEG noise (median cut doesn't).
+        img = img.quantize(colors=256, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+        img.save(out, "PNG", optimize=True)
+    else:
+        img.save(out, "WEBP", quality=82, method=6)
+    return out.getvalue()
+
+
+def render_variants(source: BinaryIO, subdirectory: str) -> Dict[str, dict]:
+    """
+    Decode `source` once and encode the size-capped variants in memory.
+
+    Returns:
+        {variant: {"data", "ext", "content_type", "width", "height"}}; empty if
+        the file isn't a raster image Pillow can read.
+    """
+    print_cap, screen_cap = PROFILES.get(subdirectory, DEFAULT_PROFILE)
+    try:
+        with Image.open(source) as img:
+            if img.width * img.height > MAX_SOURCE_PIXELS:
+                logger.warning(f"Skipping variants for oversized image ({img.width}x{img.height})")
+                return {}
+            img.load()
+            base = _prepare(img)
+    except (UnidentifiedImageError, OSError) as e:
+        logger.info(f"No variants (not a readable raster image): {e}")
+        return {}
+
+    variants = {}
+    for variant, cap, fmt, ext, content_type in (
+        (VARIANT_PRINT, print_cap, "PNG", ".png", "image/png"),
+        (VARIANT_SCREEN, screen_cap, "WEBP", ".webp", "image/webp"),
+    ):
+        img = base.copy()
+        img.thumbnail((cap, cap), Image.Resampling.LANCZOS)
+        variants[variant] = {
+            "data": _encode(img, fmt),
+            "ext": ext,
+            "content_type": content_type,
+            "width": img.width,
+            "height": img.height,
+        }
+    return variants
+
+
+def store_variants(source: BinaryIO, path: str, subdirectory: str, save) -> List[dict]:
+    """
+    Render and store the variants of the original stored at `path`.
+
+    Args:
+        save: callable(chunks, path, content_type) -> url, i.e. a storage
+            provider's save_stream
+
+    Returns:
+        Variant records for record_variants(); empty if none were made.
+    """
+    records = []
+    for variant, rendered in render_variants(source, subdirectory).items():
+        variant_path = _variant_path(path, variant, rendered["ext"])
+        url = save([rendered["data"]], variant_path, rendered["content_type"])
+        records.append({
+            "variant": variant,
+            "path": url,
+            "content_type": rendered["content_type"],
+            "width": rendered["width"],
+            "height": rendered["height"],
+            "size": len(rendered["data"]),
+        })
+    return records
+
+
+# ========== RECORDS ==========
+def record_variants(db: Session, source_path: str, records: Optional[Iterable[dict]]) -> None:
+    """
+    Remember the variants of `source_path`. None leaves any existing records
+    alone (a deduplicated upload). The caller commits.
+    """
+    if records is None:
+        return
+    db.query(models.ImageVariant).filter(
+        models.ImageVariant.source_path == source_path
+    ).delete(synchronize_session=False)
+    for record in records:
+        db.add(models.ImageVariant(source_path=source_path, **record))
+
+
+def variant_urls(db: Session, source_paths: Iterable[Optional[str]], variant: str) -> Dict[str, str]:
+    """{source path: variant path} for the given originals, in one query."""
+    paths = [p for p in set(source_paths) if p]
+    if not paths:
+        return {}
+    rows = db.query(models.ImageVariant.source_path, models.ImageVariant.path).filter(
+        models.ImageVariant.source_path.in_(paths),
+        models.ImageVariant.variant == variant,
+    )
+    return {source: path for source, path in rows}
+
+
+def variant_url(db: Session, source_path: Optional[str], variant: str) -> Optional[str]:
+    """The variant of `source_path`, or `source_path` itself if it has none."""
+    if not source_path:
+        return source_path
+    return variant_urls(db, [source_path], variant).get(source_path, source_path)
@@ -0,0 +1,439 @@
+"""
+Import Service for WinderInvoice
+Bulk CSV import for the customer and product masters.
+
+The file is read as a stream and processed in IMPORT_BATCH_SIZE chunks: each
+chunk is validated, matched against existing rows with one query, then written
+with one bulk INSERT and one bulk UPDATE and committed. Rejected rows go
+straight to an error report CSV on disk, so memory use does not grow with the
+size of the upload (apart from the set of keys used to catch duplicates
+within the file).
+"""
+import csv
+import io
+import os
+import re
+import tempfile
+import time
+import uuid
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, insert, or_, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services import search_service, typeahead_service, validation_service
+
+KIND_CUSTOMER = "customers"
+KIND_PRODUCT = "products"
+
+IMPORT_BATCH_SIZE = 500
+
+# Error reports are kept for a day, then swept on the next import
+REPORT_DIR = os.path.join(tempfile.gettempdir(), "winderinvoice-imports")
+REPORT_MAX_AGE_SECONDS = 24 * 60 * 60
+_REPORT_ID = re.compile(r"^[0-9]+-(customers|products)-[0-9a-f]{32}$")
+
+CUSTOMER_COLUMNS = [
+    "name", "contact_person", "billing_address", "city", "pincode", "shipping_address",
+    "gstin", "pan", "state", "state_code", "place_of_supply", "party_code",
+    "price_category", "phone", "email", "opening_balance",
+]
+PRODUCT_COLUMNS = ["name", "hsn_code", "unit", "rate", "gst_rate", "description"]
+
+# Common header spellings from Tally/Excel exports
+_HEADER_ALIASES = {
+    "party_name": "name",
+    "customer_name": "name",
+    "product_name": "name",
+    "item_name": "name",
+    "address": "billing_address",
+    "gst_no": "gstin",
+    "gst_number": "gstin",
+    "pan_no": "pan",
+    "mobile": "phone",
+    "phone_no": "phone",
+    "pin": "pincode",
+    "hsn": "hsn_code",
+    "price": "rate",
+    "gst": "gst_rate",
+    "gst_%": "gst_rate",
+    "tax_rate": "gst_rate",
+}
+
+
+def _normalize_header(header: Optional[str]) -> str:
+    key = re.sub(r"\s+", "_", (header or "").strip().lower())
+    return _HEADER_ALIASES.get(key, key)
+
+
+def _normalize_phone(phone: str) -> str:
+    digits = re.sub(r"\D", "", phone)
+    return digits[-10:] if len(digits) > 10 else digits
+
+
+def _parse_float(value: str, column: str, errors: List[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return float(value.replace(",", ""))
+    except ValueError:
+        errors.append(f"{column}: not a number")
+        return None
+
+
+# ========== ROW CLEANING ==========
+def _clean_customer(raw: Dict[str, str]) -> Tuple[dict, List[str]]:
+    row = {c: raw.get(c, "") for c in CUSTOMER_COLUMNS}
+    errors: List[str] = []
+
+    if not row["name"]:
+        errors.append("name: required")
+
+    if row["gstin"]:
+        row["gstin"] = row["gstin"].replace(" ", "").upper()
+        if not validation_service.validate_gstin(row["gstin"]):
+            errors.append("gstin: invalid format")
+        else:
+            # State code and PAN are embedded in the GSTIN
+            row["state_code"] = row["state_code"] or row["gstin"][:2]
+            row["pan"] = row["pan"] or row["gstin"][2:12]
+    if row["pan"]:
+        row["pan"] = row["pan"].replace(" ", "").upper()
+        if not validation_service.validate_pan(row["pan"]):
+            errors.append("pan: invalid format")
+    if row["pincode"] and not validation_service.validate_pincode(row["pincode"]):
+        errors.append("pincode: must be 6 digits")
+    if row["phone"]:
+        if not validation_service.validate_phone(row["phone"]):
+            errors.append("phone: invalid mobile number")
+        else:
+            row["phone"] = _normalize_phone(row["phone"])
+    if not row["state"] and not row["state_code"]:
+        errors.append("state: state or state_code required")
+
+    row["opening_balance"] = _parse_float(row["opening_balance"], "opening_balance", errors)
+    row["shipping_address"] = row["shipping_address"] or row["billing_address"]
+    row["place_of_supply"] = row["place_of_supply"] or row["state"]
+    return row, errors
+
+
+def _clean_product(raw: Dict[str, str]) -> Tuple[dict, List[str]]:
+    row = {c: raw.get(c, "") for c in PRODUCT_COLUMNS}
+    errors: List[str] = []
+
+    if not row["name"]:
+        errors.append("name: required")
+    if not row["hsn_code"]:
+        errors.append("hsn_code: required")
+    elif not row["hsn_code"].isdigit():
+        errors.append("hsn_code: digits only")
+
+    row["rate"] = _parse_float(row["rate"], "rate", errors)
+    if row["rate"] is not None and row["rate"] < 0:
+        errors.append("rate: must not be negative")
+    row["gst_rate"] = _parse_float(row["gst_rate"], "gst_rate", errors)
+    if row["gst_rate"] is not None and not 0 <= row["gst_rate"] <= 100:
+        errors.append("gst_rate: must be between 0 and 100")
+    return row, errors
+
+
+def _customer_keys(row: dict) -> List[Tuple[str, str]]:
+    """Identities used for matching and dedupe, strongest first: GSTIN, phone, name."""
+    keys = []
+    if row["gstin"]:
+        keys.append(("gstin", row["gstin"]))
+    if row["phone"]:
+        keys.append(("phone", row["phone"]))
+    keys.append(("name", row["name"].lower()))
+    return keys
+
+
+def _product_keys(row: dict) -> List[Tuple[str, str]]:
+    return [("name", row["name"].lower())]
+
+
+def _gstins_differ(row: dict, gstin: Optional[str]) -> bool:
+    """An existing customer with another GSTIN is another party, whatever its phone or name."""
+    return bool(row.get("gstin") and gstin and row["gstin"] != gstin.upper())
+
+
+# ========== BATCH WRITERS ==========
+def _provided(row: dict, columns: List[str]) -> dict:
+    """Only non-blank cells overwrite existing values."""
+    return {c: row[c] for c in columns if row[c] not in ("", None)}
+
+
+def _write_customers(db: Session, shop_id: int, batch: List[dict]) -> Tuple[int, int]:
+    Customer = models.Customer
+    keys = [_customer_keys(r) for r in batch]
+    gstins = [v for row_keys in keys for k, v in row_keys if k == "gstin"]
+    phones = [v for row_keys in keys for k, v in row_keys if k == "phone"]
+    names = [v for row_keys in keys for k, v in row_keys if k == "name"]
+
+    conditions = []
+    if gstins:
+        conditions.append(Customer.gstin.in_(gstins))
+    if phones:
+        conditions.append(Customer.phone.in_(phones))
+    if names:
+        conditions.append(func.lower(Customer.name).in_(names))
+
+    existing: Dict[Tuple[str, str], List[tuple]] = {}
+    for c in db.query(
+        Customer.id, Customer.gstin, Customer.phone, Customer.name,
+    ).filter(Customer.shop_id == shop_id, or_(*conditions)).order_by(Customer.id):
+        if c.gstin:
+            existing.setdefault(("gstin", c.gstin.upper()), []).append(c)
+        if c.phone:
+            existing.setdefault(("phone", c.phone), []).append(c)
+        existing.setdefault(("name", c.name.lower()), []).append(c)
+
+    inserts, updates, rebalances = [], [], []
+    for row, row_keys in zip(batch, keys):
+        # The first key with a compatible existing customer wins
+        match = next((c for key in row_keys for c in existing.get(key, ())
+                      if not _gstins_differ(row, c.gstin)), None)
+        if match is None:
+            values = {c: (row[c] or None) for c in CUSTOMER_COLUMNS}
+            values["opening_balance"] = row["opening_balance"] or 0.0
+            values["balance"] = values["opening_balance"]
+            values["shop_id"] = shop_id
+            inserts.append(values)
+            continue
+
+        values = _provided(row, CUSTOMER_COLUMNS)
+        if values.pop("opening_balance", None) is not None:
+            rebalances.append({"b_id": match.id, "b_opening_balance": row["opening_balance"]})
+        values["id"] = match.id
+        updates.append(values)
+
+    if inserts:
+        ids = db.scalars(
+            insert(Customer).returning(Customer.id, sort_by_parameter_order=True), inserts
+        ).all()
+        for values, new_id in zip(inserts, ids):
+            values["id"] = new_id
+    documents = [search_service.customer_document(_Row(v)) for v in inserts]
+    if rebalances:
+        # Shift the running balance in SQL, so invoices and payments
+        # committed since the rows above were read are not overwritten
+        db.execute(
+            update(Customer.__table__).where(Customer.id == bindparam("b_id")).values(
+                balance=func.coalesce(Customer.balance, 0.0)
+                + bindparam("b_opening_balance") - func.coalesce(Customer.opening_balance, 0.0),
+                opening_balance=bindparam("b_opening_balance"),
+            ),
+            rebalances,
+        )
+    if updates:
+        changed_columns = [u for u in updates if len(u) > 1]
+        if changed_columns:
+            db.execute(update(Customer), changed_columns)
+        # Search documents need the merged row, not just the changed cells
+        changed = db.query(
+            Customer.id, Customer.shop_id, Customer.name, Customer.phone,
+            Customer.gstin, Customer.party_code, Customer.city,
+        ).filter(Customer.id.in_([u["id"] for u in updates]))
+        documents += [search_service.customer_document(c) for c in changed]
+
+    search_service.index_many(db, search_service.KIND_CUSTOMER, documents)
+    return len(inserts), len(updates)
+
+
+def _write_products(db: Session, shop_id: int, batch: List[dict]) -> Tuple[int, int]:
+    Product = models.Product
+    names = [r["name"].lower() for r in batch]
+    existing = {
+        p.name.lower(): p.id
+        for p in db.query(Product.id, Product.name).filter(
+            Product.shop_id == shop_id, func.lower(Product.name).in_(names)
+        )
+    }
+
+    inserts, updates = [], []
+    for row, name in zip(batch, names):
+        if name in existing:
+            values = _provided(row, PRODUCT_COLUMNS)
+            values["id"] = existing[name]
+            updates.append(values)
+        else:
+            values = {c: (row[c] or None) for c in PRODUCT_COLUMNS}
+            values["rate"] = row["rate"] or 0.0
+            values["gst_rate"] = row["gst_rate"] or 0.0
+            values["shop_id"] = shop_id
+            inserts.append(values)
+
+    if inserts:
+        ids = db.scalars(
+            insert(Product).returning(Product.id, sort_by_parameter_order=True), inserts
+        ).all()
+        for values, new_id in zip(inserts, ids):
+            values["id"] = new_id
+    documents = [search_service.product_document(_Row(v)) for v in inserts]
+    if updates:
+        db.execute(update(Product), updates)
+        changed = db.query(
+            Product.id, Product.shop_id, Product.name, Product.hsn_code, Product.description,
+        ).filter(Product.id.in_([u["id"] for u in updates]))
+        documents += [search_service.product_document(p) for p in changed]
+
+    search_service.index_many(db, search_service.KIND_PRODUCT, documents)
+    return len(inserts), len(updates)
+
+
+class _Row:
+    """Attribute access over a values dict (for the search document builders)."""
+
+    def __init__(self, values: dict):
+        self.__dict__.update(values)
+
+    def __getattr__(self, name):
+        return None
+
+
+# ========== ERROR REPORT ==========
+class _ErrorReport:
+    """Rejected rows, written to disk as they are found."""
+
+    def __init__(self, shop_id: int, kind: str, columns: List[str]):
+        self.report_id = f"{shop_id}-{kind}-{uuid.uuid4().hex}"
+        self.columns = columns
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def add(self, line_no: int, errors: List[str], raw: Dict[str, str]) -> None:
+        if self._writer is None:
+            _sweep_reports()
+            os.makedirs(REPORT_DIR, exist_ok=True)
+            self._file = open(report_path(self.report_id), "w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(["row", "errors"] + self.columns)
+        self._writer.writerow([line_no, "; ".join(errors)] + [raw.get(c, "") for c in self.columns])
+        self.count += 1
+
+    def close(self) -> Optional[str]:
+        if self._file is None:
+            return None
+        self._file.close()
+        return self.report_id
+
+
+def report_path(report_id: str) -> str:
+    if not _REPORT_ID.match(report_id):
+        raise ValueError("Invalid report id")
+    return os.path.join(REPORT_DIR, f"{report_id}.csv")
+
+
+def report_belongs_to(report_id: str, shop_id: int) -> bool:
+    return bool(_REPORT_ID.match(report_id)) and report_id.split("-", 1)[0] == str(shop_id)
+
+
+def _sweep_reports() -> None:
+    if not os.path.isdir(REPORT_DIR):
+        return
+    cutoff = time.time() - REPORT_MAX_AGE_SECONDS
+    for entry in os.scandir(REPORT_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+# ========== DRIVER ==========
+def _run_import(
+    db: Session,
+    shop_id: int,
+    stream: BinaryIO,
+    kind: str,
+    columns: List[str],
+    clean: Callable[[Dict[str, str]], Tuple[dict, List[str]]],
+    keys: Callable[[dict], List[Tuple[str, str]]],
+    write: Callable[[Session, int, List[dict]], Tuple[int, int]],
+) -> dict:
+    report = _ErrorReport(shop_id, kind, columns)
+    result = {"total": 0, "created": 0, "updated": 0, "failed": 0, "report_id": None}
+    seen: Dict[Tuple[str, str], int] = {}
+    batch: List[dict] = []
+
+    def flush():
+        created, updated = write(db, shop_id, batch)
+        db.commit()
+        result["created"] += created
+        result["updated"] += updated
+        batch.clear()
+
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.DictReader(text_stream)
+        if not reader.fieldnames or "name" not in [_normalize_header(h) for h in reader.fieldnames]:
+            raise ValueError("CSV must have a header row with at least a 'name' column")
+
+        for raw in reader:
+            # csv line of the record (header is line 1)
+            line_no = reader.line_num
+            raw = {_normalize_header(h): (v or "").strip() for h, v in raw.items() if h}
+            if not any(raw.values()):
+                continue
+            result["total"] += 1
+
+            row, errors = clean(raw)
+            if not errors:
+                row_keys = keys(row)
+                duplicate = next((k for k in row_keys if k in seen), None)
+                if duplicate:
+                    errors.append(f"duplicate {duplicate[0]} of row {seen[duplicate]}")
+                else:
+                    for k in row_keys:
+                        seen[k] = line_no
+
+            if errors:
+                report.add(line_no, errors, raw)
+                continue
+
+            batch.append(row)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                flush()
+
+        if batch:
+            flush()
+    except UnicodeDecodeError:
+        db.rollback()
+        raise ValueError("File is not UTF-8 encoded CSV")
+    except csv.Error as e:
+        db.rollback()
+        raise ValueError(f"Malformed CSV near line {reader.line_num}: {e}")
+    finally:
+        text_stream.detach()
+        result["report_id"] = report.close()
+        result["failed"] = report.count
+        typeahead_service.invalidate(shop_id)
+
+    return result
+
+
+def import_customers(db: Session, shop_id: int, stream: BinaryIO) -> dict:
+    """
+    Create or update customers from a CSV stream.
+
+    Existing customers are matched by GSTIN, else phone, else name
+    (case-insensitive), skipping any with a different GSTIN; blank cells
+    leave existing values untouched. A row sharing its GSTIN, phone or name
+    with an earlier row of the file is rejected as a duplicate.
+
+    Returns:
+        {"total", "created", "updated", "failed", "report_id"}
+
+    Raises:
+        ValueError: If the file is not a well-formed UTF-8 CSV with a name column.
+    """
+    return _run_import(db, shop_id, stream, KIND_CUSTOMER, CUSTOMER_COLUMNS,
+                       _clean_customer, _customer_keys, _write_customers)
+
+
+def import_products(db: Session, shop_id: int, stream: BinaryIO) -> dict:
+    """Create or update products from a CSV stream, matched by name. See import_customers."""
+    return _run_import(db, shop_id, stream, KIND_PRODUCT, PRODUCT_COLUMNS,
+                       _clean_product, _product_keys, _write_products)
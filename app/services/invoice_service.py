@@ -1,7 +1,14 @@
 from app import models
+from app.services import archive_service
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
+from datetime import date
+from typing import Optional, Tuple, List
 import math
 
+# Invoices per page on the list view / JSON feed
+INVOICE_PAGE_SIZE = 50
+
 def num_to_words(num):
     if num == 0:
         return "Zero"
@@ -67,4 +74,91 @@ def generate_invoice_number(shop_id: int, db: Session):
     # Simple auto-increment logic for now. 
     # In real app, might want to check last invoice number pattern.
     count = db.query(models.Invoice).filter(models.Invoice.shop_id == shop_id).count()
+    count += archive_service.archived_totals(db, shop_id)["invoice_count"]
     return f"INV-{count + 1:04d}"
+
+def encode_cursor(invoice_date: date, invoice_id: int) -> str:
+    """Keyset cursor for the (date, id) position of the last row on a page."""
+    return f"{invoice_date.isoformat() if invoice_date else ''}_{invoice_id}"
+
+def decode_cursor(cursor: str) -> Tuple[Optional[date], int]:
+    """Inverse of encode_cursor. Raises ValueError on malformed input."""
+    date_part, _, id_part = cursor.partition("_")
+    return (date.fromisoformat(date_part) if date_part else None), int(id_part)
+
+def _invoice_page_rows(db: Session, Invoice, shop_id, cursor, status, customer_id, start_date, end_date, limit):
+    """Up to limit + 1 list rows from `Invoice` (the live table or an archive union)."""
+    query = db.query(
+        Invoice.id,
+        Invoice.invoice_no,
+        Invoice.date,
+        Invoice.grand_total,
+        Invoice.status,
+        models.Customer.name.label("customer_name"),
+    ).outerjoin(
+        models.Customer, models.Customer.id == Invoice.customer_id
+    ).filter(Invoice.shop_id == shop_id)
+
+    if status:
+        query = query.filter(Invoice.status == status)
+    if customer_id:
+        query = query.filter(Invoice.customer_id == customer_id)
+    if start_date:
+        query = query.filter(Invoice.date >= start_date)
+    if end_date:
+        query = query.filter(Invoice.date <= end_date)
+
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        if after_date is None:
+            # Undated invoices sort last; only continue within them
+            query = query.filter(Invoice.date.is_(None), Invoice.id < after_id)
+        else:
+            query = query.filter(or_(
+                Invoice.date < after_date,
+                and_(Invoice.date == after_date, Invoice.id < after_id),
+                Invoice.date.is_(None),
+            ))
+
+    return query.order_by(
+        Invoice.date.desc().nulls_last(), Invoice.id.desc()
+    ).limit(limit + 1).all()
+
+
+def list_invoices_page(
+    db: Session,
+    shop_id: int,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    customer_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: int = INVOICE_PAGE_SIZE,
+) -> Tuple[List, Optional[str]]:
+    """
+    One page of invoices, newest first, using keyset pagination on (date, id).
+
+    Only the columns the list needs are selected and the customer name comes
+    from a join, so a page costs one indexed range scan regardless of how many
+    invoices the shop has (no OFFSET, no per-row customer lookups).
+
+    Returns:
+        (rows, next_cursor) - next_cursor is None on the last page
+    """
+    if start_date is not None:
+        invoices = archive_service.invoice_source(db, start_date, end_date)
+        rows = _invoice_page_rows(db, invoices, shop_id, cursor, status, customer_id, start_date, end_date, limit)
+    else:
+        # Archived years are older than archive_boundary(); if a full page of
+        # live invoices is newer than that, no archive row can sort into it.
+        rows = _invoice_page_rows(db, models.Invoice, shop_id, cursor, status, customer_id, start_date, end_date, limit)
+        boundary = archive_service.archive_boundary(db)
+        if boundary and not (len(rows) > limit and rows[-1].date and rows[-1].date > boundary):
+            invoices = archive_service.invoice_source(db, None, end_date)
+            rows = _invoice_page_rows(db, invoices, shop_id, cursor, status, customer_id, start_date, end_date, limit)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].date, rows[-1].id)
+    return rows, next_cursor
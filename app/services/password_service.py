@@ -0,0 +1,186 @@
+"""
+Password Service for WinderInvoice
+bcrypt hashing off the request path, plus login throttling.
+
+bcrypt is deliberately slow (~250ms at cost 12), so hashes run in a small
+process pool instead of on the event loop or the request threadpool. At most
+PASSWORD_HASH_MAX_PENDING jobs may be queued; beyond that callers get a 503
+straight away rather than piling up behind a credential-stuffing burst.
+
+Attempts are limited per client IP and failures per email address over a
+sliding window, checked before any hashing work is queued.
+
+The work factor is BCRYPT_ROUNDS. Hashes made at a different cost are
+re-hashed on the next successful login (see needs_rehash).
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Deque, Dict, Optional
+
+import bcrypt
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.auth_service import _truncate_password_to_72_bytes
+
+
+# ========== WORKERS (run in the pool) ==========
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(_truncate_password_to_72_bytes(password), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _check(password: str, hashed_password: str) -> bool:
+    try:
+        return bcrypt.checkpw(_truncate_password_to_72_bytes(password), hashed_password.encode("utf-8"))
+    except Exception:
+        return False
+
+
+# ========== POOL ==========
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """The shared pool, or None to use the default thread executor (PASSWORD_HASH_WORKERS=0)."""
+    global _pool
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a process that has server threads running is unsafe
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+async def _run(fn, *args):
+    global _pending
+    with _pending_lock:
+        if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+            raise HTTPException(status_code=503, detail="Too many sign-in requests, please try again shortly",
+                                headers={"Retry-After": "5"})
+        _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_pool(), fn, *args)
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run(_hash, password, settings.BCRYPT_ROUNDS)
+
+
+async def verify_password(password: str, hashed_password: Optional[str]) -> bool:
+    if not hashed_password:
+        return False
+    return await _run(_check, password, hashed_password)
+
+
+def needs_rehash(hashed_password: Optional[str]) -> bool:
+    """True if the hash was made with a cost other than BCRYPT_ROUNDS ("$2b$12$...")."""
+    try:
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (AttributeError, IndexError, ValueError):
+        return False
+
+
+# ========== THROTTLING ==========
+class SlidingWindowLimiter:
+    """Counts events per key over the last `window` seconds."""
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self._events: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def _prune(self, key: str, now: float) -> Optional[Deque[float]]:
+        events = self._events.get(key)
+        if events is None:
+            return None
+        while events and events[0] <= now - self.window:
+            events.popleft()
+        if not events:
+            del self._events[key]
+            return None
+        return events
+
+    def _sweep(self, now: float) -> None:
+        if now - self._last_sweep < self.window:
+            return
+        self._last_sweep = now
+        for key in list(self._events):
+            self._prune(key, now)
+
+    def retry_after(self, key: str) -> float:
+        """Seconds until `key` may try again; 0 if it is under the limit."""
+        now = time.monotonic()
+        with self._lock:
+            events = self._prune(key, now)
+            if events is None or len(events) < self.limit:
+                return 0
+            return max(events[0] + self.window - now, 1)
+
+    def hit(self, key: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            self._events.setdefault(key, deque()).append(now)
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._events.pop(key, None)
+
+
+_ip_attempts = SlidingWindowLimiter(settings.LOGIN_MAX_ATTEMPTS_PER_IP, settings.LOGIN_THROTTLE_WINDOW_SECONDS)
+_email_failures = SlidingWindowLimiter(settings.LOGIN_MAX_FAILURES_PER_EMAIL, settings.LOGIN_THROTTLE_WINDOW_SECONDS)
+
+
+def check_login_allowed(ip: Optional[str], email: Optional[str]) -> None:
+    """
+    Record a login attempt from `ip` and refuse it if the IP or the email is
+    over its limit.
+
+    Raises:
+        HTTPException(429): With a Retry-After header.
+    """
+    email_key = (email or "").strip().lower()
+    wait = max(
+        _ip_attempts.retry_after(ip) if ip else 0,
+        _email_failures.retry_after(email_key) if email_key else 0,
+    )
+    if wait:
+        raise HTTPException(status_code=429, detail="Too many sign-in attempts, please try again later",
+                            headers={"Retry-After": str(int(wait))})
+    if ip:
+        _ip_attempts.hit(ip)
+
+
+def record_login_result(email: Optional[str], success: bool) -> None:
+    email_key = (email or "").strip().lower()
+    if not email_key:
+        return
+    if success:
+        _email_failures.reset(email_key)
+    else:
+        _email_failures.hit(email_key)
@@ -0,0 +1,267 @@
+"""
+Payment Service for WinderInvoice
+Records customer receipts, allocates them against open invoices and keeps the
+pre-aggregated figures (Invoice.amount_paid, Invoice.status, Customer.balance)
+up to date at write time so reports never have to replay payment history.
+
+Running totals are changed with `SET x = x + delta` in the database rather
+than read, changed and written back from Python, so two invoices or
+payments for the same customer committing at once both count. Invoices a
+payment touches are read FOR UPDATE (Postgres); on SQLite the balance
+UPDATE runs first, so the writer lock is held before any invoice is read.
+"""
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func, update
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app import models
+
+# Invoices in these states still carry an outstanding amount
+OPEN_STATUSES = ("Generated", "Partially Paid")
+
+# Anything below half a paisa counts as settled (Float columns)
+PAID_TOLERANCE = 0.005
+
+PAYMENT_MODES = ["Cash", "UPI", "Bank Transfer", "Cheque", "Card"]
+
+AGING_BUCKETS = ["0-30", "31-60", "61-90", "90+"]
+
+
+def outstanding_amount(invoice: models.Invoice) -> float:
+    """Amount still due on an invoice."""
+    return round((invoice.grand_total or 0.0) - (invoice.amount_paid or 0.0), 2)
+
+
+def refresh_invoice_status(invoice: models.Invoice) -> str:
+    """Derive Generated / Partially Paid / Paid from amount_paid."""
+    if invoice.status == "Cancelled":
+        return invoice.status
+
+    if outstanding_amount(invoice) <= PAID_TOLERANCE:
+        invoice.status = "Paid"
+    elif (invoice.amount_paid or 0.0) > PAID_TOLERANCE:
+        invoice.status = "Partially Paid"
+    else:
+        invoice.status = "Generated"
+    return invoice.status
+
+
+def _update_balance(db: Session, customer: models.Customer, **values) -> None:
+    db.execute(
+        update(models.Customer).where(models.Customer.id == customer.id).values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.expire(customer, list(values))  # re-read on next access
+
+
+def _add_to_balance(db: Session, customer: models.Customer, delta: float) -> None:
+    """customer.balance += delta, atomically."""
+    _update_balance(db, customer, balance=func.coalesce(models.Customer.balance, 0.0) + round(delta, 2))
+
+
+def _add_to_amount_paid(db: Session, invoice: models.Invoice, delta: float) -> None:
+    """invoice.amount_paid += delta, atomically, then re-derive its status."""
+    amount_paid = db.execute(
+        update(models.Invoice).where(models.Invoice.id == invoice.id)
+        .values(amount_paid=func.coalesce(models.Invoice.amount_paid, 0.0) + round(delta, 2))
+        .returning(models.Invoice.amount_paid)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+    set_committed_value(invoice, "amount_paid", round(amount_paid, 2))
+    refresh_invoice_status(invoice)
+
+
+def post_invoice(customer: models.Customer, invoice: models.Invoice) -> None:
+    """Add a newly created invoice to the customer's running balance."""
+    _add_to_balance(object_session(customer), customer, invoice.grand_total or 0.0)
+
+
+def adjust_opening_balance(customer: models.Customer, new_opening_balance: float) -> None:
+    """Shift the running balance by the change in opening balance."""
+    new_opening_balance = new_opening_balance or 0.0
+    # Both right-hand sides see the row's current opening_balance
+    _update_balance(
+        object_session(customer), customer,
+        balance=func.coalesce(models.Customer.balance, 0.0)
+        + new_opening_balance - func.coalesce(models.Customer.opening_balance, 0.0),
+        opening_balance=new_opening_balance,
+    )
+
+
+def _allocate(db: Session, payment: models.Payment, invoice: models.Invoice, amount: float) -> float:
+    """Apply up to `amount` of the payment to one (locked) invoice. Returns amount applied."""
+    applied = round(min(amount, outstanding_amount(invoice)), 2)
+    if applied <= PAID_TOLERANCE:
+        return 0.0
+
+    db.add(models.PaymentAllocation(payment=payment, invoice=invoice, amount=applied))
+    _add_to_amount_paid(db, invoice, applied)
+    return applied
+
+
+def record_payment(
+    db: Session,
+    shop_id: int,
+    customer: models.Customer,
+    amount: float,
+    payment_date: date,
+    mode: str = "Cash",
+    reference: Optional[str] = None,
+    notes: Optional[str] = None,
+    allocations: Optional[Dict[int, float]] = None,
+) -> models.Payment:
+    """
+    Record a receipt from a customer.
+
+    Args:
+        allocations: Optional {invoice_id: amount} map. When omitted the
+            payment is applied to the oldest open invoices first (FIFO).
+            Whatever is left over stays on account as unallocated_amount.
+
+    Raises:
+        ValueError: On a non-positive amount or over-allocation.
+
+    The caller is responsible for committing the session.
+    """
+    if amount is None or amount <= 0:
+        raise ValueError("Payment amount must be greater than zero")
+
+    payment = models.Payment(
+        shop_id=shop_id,
+        customer_id=customer.id,
+        date=payment_date,
+        amount=round(amount, 2),
+        mode=mode,
+        reference=reference,
+        notes=notes,
+    )
+    db.add(payment)
+    # First write of the transaction: on SQLite this takes the writer lock
+    # before the open invoices are read
+    _add_to_balance(db, customer, -payment.amount)
+
+    remaining = payment.amount
+    # Locked until commit, so two payments can't both settle the same amount
+    open_invoices = db.query(models.Invoice).filter(
+        models.Invoice.shop_id == shop_id,
+        models.Invoice.customer_id == customer.id,
+        models.Invoice.status.in_(OPEN_STATUSES),
+    ).with_for_update().populate_existing()
+
+    if allocations:
+        requested = {int(k): round(float(v), 2) for k, v in allocations.items() if float(v or 0) > 0}
+        if round(sum(requested.values()), 2) > payment.amount + PAID_TOLERANCE:
+            raise ValueError("Allocated amount exceeds payment amount")
+
+        invoices = open_invoices.filter(models.Invoice.id.in_(requested.keys())).all()
+        if len(invoices) != len(requested):
+            raise ValueError("One or more invoices are not open for this customer")
+
+        for invoice in invoices:
+            remaining -= _allocate(db, payment, invoice, requested[invoice.id])
+    else:
+        for invoice in open_invoices.order_by(models.Invoice.date, models.Invoice.id):
+            if remaining <= PAID_TOLERANCE:
+                break
+            remaining -= _allocate(db, payment, invoice, remaining)
+
+    payment.unallocated_amount = round(max(remaining, 0.0), 2)
+    db.flush()
+    return payment
+
+
+def delete_payment(db: Session, payment: models.Payment) -> None:
+    """
+    Reverse a payment's allocations and balance effect, then delete it.
+
+    Raises:
+        ValueError: If the payment settled invoices that have since been
+            moved to a fiscal-year archive.
+    """
+    # Allocations against archived invoices move to the archive file with
+    # them, so they show up here as allocated money with no live allocation
+    allocated = sum(allocation.amount for allocation in payment.allocations)
+    if (payment.amount or 0.0) - (payment.unallocated_amount or 0.0) - allocated > PAID_TOLERANCE:
+        raise ValueError("Payment settled invoices in an archived fiscal year and cannot be deleted")
+
+    _add_to_balance(db, payment.customer, payment.amount)
+
+    invoice_ids = [allocation.invoice_id for allocation in payment.allocations]
+    invoices = {invoice.id: invoice for invoice in db.query(models.Invoice).filter(
+        models.Invoice.id.in_(invoice_ids)
+    ).with_for_update().populate_existing()}
+    for allocation in payment.allocations:
+        invoice = invoices.get(allocation.invoice_id)
+        if invoice is None:  # archived before allocations moved with their invoices
+            raise ValueError("Payment settled invoices in an archived fiscal year and cannot be deleted")
+        _add_to_amount_paid(db, invoice, -allocation.amount)
+
+    db.delete(payment)
+
+
+def open_invoices_for(db: Session, shop_id: int, customer_id: int) -> List[models.Invoice]:
+    """Open invoices for a customer, oldest first (allocation order)."""
+    return db.query(models.Invoice).filter(
+        models.Invoice.shop_id == shop_id,
+        models.Invoice.customer_id == customer_id,
+        models.Invoice.status.in_(OPEN_STATUSES),
+    ).order_by(models.Invoice.date, models.Invoice.id).all()
+
+
+def total_outstanding(db: Session, shop_id: int) -> float:
+    """Shop-wide receivable, summed from the per-customer running balances."""
+    return db.query(func.sum(models.Customer.balance)).filter(
+        models.Customer.shop_id == shop_id
+    ).scalar() or 0.0
+
+
+def aging_summary(db: Session, shop_id: int, as_of: Optional[date] = None) -> List[dict]:
+    """
+    Outstanding amounts per customer split into 0-30 / 31-60 / 61-90 / 90+ day
+    buckets, computed in a single grouped query over open invoices.
+
+    Bucket cut-offs are computed here as dates so the CASE expression is
+    portable between SQLite and Postgres (no date arithmetic in SQL).
+    """
+    as_of = as_of or date.today()
+    d30 = as_of - timedelta(days=30)
+    d60 = as_of - timedelta(days=60)
+    d90 = as_of - timedelta(days=90)
+
+    bucket = case(
+        (models.Invoice.date >= d30, "0-30"),
+        (models.Invoice.date >= d60, "31-60"),
+        (models.Invoice.date >= d90, "61-90"),
+        else_="90+",
+    ).label("bucket")
+    due = func.sum(
+        func.coalesce(models.Invoice.grand_total, 0) - func.coalesce(models.Invoice.amount_paid, 0)
+    ).label("due")
+
+    rows = db.query(
+        models.Invoice.customer_id, models.Customer.name, bucket, due
+    ).join(
+        models.Customer, models.Customer.id == models.Invoice.customer_id
+    ).filter(
+        models.Invoice.shop_id == shop_id,
+        models.Invoice.status.in_(OPEN_STATUSES),
+        models.Invoice.date <= as_of,
+    ).group_by(
+        models.Invoice.customer_id, models.Customer.name, bucket
+    ).all()
+
+    by_customer: Dict[int, dict] = {}
+    for customer_id, name, bucket_name, amount in rows:
+        entry = by_customer.setdefault(customer_id, {
+            "customer_id": customer_id,
+            "name": name,
+            **{b: 0.0 for b in AGING_BUCKETS},
+            "total": 0.0,
+        })
+        entry[bucket_name] += amount or 0.0
+        entry["total"] += amount or 0.0
+
+    return sorted(by_customer.values(), key=lambda e: e["total"], reverse=True)
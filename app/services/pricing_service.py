@@ -0,0 +1,210 @@
+"""
+Pricing Service for WinderInvoice
+Bulk price revisions for products: percentage or absolute change applied to
+every product matching an HSN / GST rate / name filter.
+
+A revision is one set-based UPDATE. Before it runs, the old and new rates are
+copied into price_revision_items with INSERT ... SELECT so the revision can be
+undone later, and an AuditLog row records who changed what.
+"""
+from typing import List, Optional
+
+from sqlalchemy import Numeric, case, cast, exists, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from app import models
+
+MODE_PERCENT = "percent"
+MODE_ABSOLUTE = "absolute"
+MODES = (MODE_PERCENT, MODE_ABSOLUTE)
+
+AUDIT_ACTION = "price_revision"
+AUDIT_UNDO_ACTION = "price_revision_undo"
+
+PREVIEW_LIMIT = 50
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _filters(shop_id: int, hsn_code: Optional[str], gst_rate: Optional[float], name_pattern: Optional[str]) -> list:
+    Product = models.Product
+    conditions = [Product.shop_id == shop_id]
+    if hsn_code:
+        # HSN codes are hierarchical, so "5205" also matches "520512"
+        conditions.append(Product.hsn_code.like(_escape_like(hsn_code.strip()) + "%", escape="\\"))
+    if gst_rate is not None:
+        conditions.append(Product.gst_rate == gst_rate)
+    if name_pattern:
+        # '*' is a wildcard; without one the pattern matches anywhere in the name
+        pattern = _escape_like(name_pattern.strip()).replace("*", "%")
+        if "%" not in pattern:
+            pattern = f"%{pattern}%"
+        conditions.append(Product.name.ilike(pattern, escape="\\"))
+    return conditions
+
+
+def _new_rate(mode: str, value: float):
+    """SQL expression for the revised rate, rounded to paise and floored at zero."""
+    rate = func.coalesce(models.Product.rate, 0.0)
+    if mode == MODE_PERCENT:
+        revised = rate * (1 + literal(value) / 100.0)
+    elif mode == MODE_ABSOLUTE:
+        revised = rate + literal(value)
+    else:
+        raise ValueError(f"Unknown revision mode: {mode}")
+    # Postgres only rounds NUMERIC to a given scale
+    rounded = func.round(cast(revised, Numeric(14, 4)), 2)
+    return case((revised < 0, 0.0), else_=rounded)
+
+
+def preview(
+    db: Session,
+    shop_id: int,
+    mode: str,
+    value: float,
+    hsn_code: Optional[str] = None,
+    gst_rate: Optional[float] = None,
+    name_pattern: Optional[str] = None,
+    limit: int = PREVIEW_LIMIT,
+) -> dict:
+    """
+    Show what a revision would do without changing anything.
+
+    Returns:
+        {"count": products matched, "rows": first `limit` as {id, name, hsn_code, old_rate, new_rate}}
+    """
+    Product = models.Product
+    conditions = _filters(shop_id, hsn_code, gst_rate, name_pattern)
+    count = db.query(func.count(Product.id)).filter(*conditions).scalar() or 0
+    rows = db.query(
+        Product.id, Product.name, Product.hsn_code, Product.rate, _new_rate(mode, value)
+    ).filter(*conditions).order_by(Product.name).limit(limit).all()
+    return {
+        "count": count,
+        "rows": [{
+            "id": r[0],
+            "name": r[1],
+            "hsn_code": r[2],
+            "old_rate": r[3] or 0.0,
+            "new_rate": float(r[4] or 0.0),
+        } for r in rows],
+    }
+
+
+def apply_revision(
+    db: Session,
+    shop_id: int,
+    user_id: Optional[int],
+    mode: str,
+    value: float,
+    hsn_code: Optional[str] = None,
+    gst_rate: Optional[float] = None,
+    name_pattern: Optional[str] = None,
+    ip_address: Optional[str] = None,
+) -> models.AuditLog:
+    """
+    Snapshot the matching rates, then revise them with one UPDATE.
+
+    Raises:
+        ValueError: On an unknown mode or a zero change.
+
+    The caller is responsible for committing the session.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown revision mode: {mode}")
+    if not value:
+        raise ValueError("Change must not be zero")
+
+    Product, Item = models.Product, models.PriceRevisionItem
+    conditions = _filters(shop_id, hsn_code, gst_rate, name_pattern)
+    new_rate = _new_rate(mode, value)
+
+    audit = models.AuditLog(
+        user_id=user_id,
+        action=AUDIT_ACTION,
+        object_type="shop",
+        object_id=shop_id,
+        ip_address=ip_address,
+        details={
+            "mode": mode,
+            "value": value,
+            "hsn_code": hsn_code or None,
+            "gst_rate": gst_rate,
+            "name_pattern": name_pattern or None,
+        },
+    )
+    db.add(audit)
+    db.flush()
+
+    db.execute(insert(Item).from_select(
+        ["audit_log_id", "product_id", "old_rate", "new_rate"],
+        select(literal(audit.id), Product.id, Product.rate, new_rate).where(*conditions),
+    ))
+    result = db.execute(
+        update(Product).where(*conditions).values(rate=new_rate)
+        .execution_options(synchronize_session=False)
+    )
+    audit.details = {**audit.details, "count": result.rowcount}
+    return audit
+
+
+def undo_revision(db: Session, shop_id: int, user_id: Optional[int], audit_id: int,
+                  ip_address: Optional[str] = None) -> int:
+    """
+    Restore the rates saved by a revision, again as one UPDATE.
+
+    Products whose rate has changed since the revision (edited by hand or by a
+    later revision) are left alone. Returns the number of products restored.
+
+    Raises:
+        LookupError: If the revision doesn't exist for this shop.
+        ValueError: If it has already been undone.
+
+    The caller is responsible for committing the session.
+    """
+    Product, Item = models.Product, models.PriceRevisionItem
+    audit = db.query(models.AuditLog).filter(
+        models.AuditLog.id == audit_id,
+        models.AuditLog.action == AUDIT_ACTION,
+        models.AuditLog.object_type == "shop",
+        models.AuditLog.object_id == shop_id,
+    ).first()
+    if not audit:
+        raise LookupError("Price revision not found")
+    if (audit.details or {}).get("undone"):
+        raise ValueError("Price revision has already been undone")
+
+    old_rate = select(Item.old_rate).where(
+        Item.audit_log_id == audit.id, Item.product_id == Product.id
+    ).scalar_subquery()
+    unchanged = exists().where(
+        Item.audit_log_id == audit.id, Item.product_id == Product.id, Item.new_rate == Product.rate
+    )
+    result = db.execute(
+        update(Product).where(Product.shop_id == shop_id, unchanged)
+        .values(rate=old_rate)
+        .execution_options(synchronize_session=False)
+    )
+    restored = result.rowcount
+
+    db.query(Item).filter(Item.audit_log_id == audit.id).delete(synchronize_session=False)
+    audit.details = {**(audit.details or {}), "undone": True, "restored": restored}
+    db.add(models.AuditLog(
+        user_id=user_id,
+        action=AUDIT_UNDO_ACTION,
+        object_type="shop",
+        object_id=shop_id,
+        ip_address=ip_address,
+        details={"revision_id": audit.id, "restored": restored},
+    ))
+    return restored
+
+
+def recent_revisions(db: Session, shop_id: int, limit: int = 10) -> List[models.AuditLog]:
+    return db.query(models.AuditLog).filter(
+        models.AuditLog.action == AUDIT_ACTION,
+        models.AuditLog.object_type == "shop",
+        models.AuditLog.object_id == shop_id,
+    ).order_by(models.AuditLog.id.desc()).limit(limit).all()
@@ -0,0 +1,162 @@
+"""
+Principal Service for WinderInvoice
+TTL cache of the authenticated user and shop, keyed by access token, so
+resolving "who is calling" doesn't cost a JWT decode plus two SELECTs on
+every request.
+
+Entries hold plain column snapshots, never ORM instances. On a hit the
+snapshot is turned back into persistent User / Shop objects attached to the
+request's session without touching the database, so routes can still read
+relationships and modify the objects as before.
+
+Entries expire after AUTH_CACHE_TTL_SECONDS (or when the token does, if
+sooner). Committed changes to a User or Shop in this process evict matching
+entries straight away; other worker processes see them once the TTL runs out.
+Entries also keep the token's jti / sub / iat claims, so a cache hit is still
+checked against revocation_service's Bloom filter and a token revoked by
+another worker stops working at its next filter refresh.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from app import models
+from app.config import settings
+
+
+# Claims revocation_service.is_revoked() reads
+REVOCATION_CLAIMS = ("jti", "sub", "iat")
+
+
+class _Entry:
+    __slots__ = ("expires_at", "user", "shop", "claims")
+
+    def __init__(self, expires_at: float, user: dict, shop: Optional[dict], claims: dict):
+        self.expires_at = expires_at
+        self.user = user
+        self.shop = shop
+        self.claims = claims
+
+
+_entries: "OrderedDict[str, _Entry]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _snapshot(obj) -> dict:
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(type(obj)).column_attrs}
+
+
+# ========== CACHE ==========
+def get(token: str) -> Optional[_Entry]:
+    now = time.time()
+    with _lock:
+        entry = _entries.get(token)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            del _entries[token]
+            return None
+        _entries.move_to_end(token)
+        return entry
+
+
+def put(token: str, user: models.User, shop: Optional[models.Shop], claims: dict) -> None:
+    """Cache a snapshot of an authenticated user (and their shop) for this decoded token."""
+    if settings.AUTH_CACHE_TTL_SECONDS <= 0:
+        return
+    expires_at = time.time() + settings.AUTH_CACHE_TTL_SECONDS
+    if claims.get("exp") is not None:
+        expires_at = min(expires_at, claims["exp"])
+    entry = _Entry(expires_at, _snapshot(user), _snapshot(shop) if shop is not None else None,
+                   {key: claims[key] for key in REVOCATION_CLAIMS if key in claims})
+    with _lock:
+        _entries[token] = entry
+        _entries.move_to_end(token)
+        while len(_entries) > settings.AUTH_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def invalidate_token(token: Optional[str]) -> None:
+    if token:
+        with _lock:
+            _entries.pop(token, None)
+
+
+def invalidate_users(user_ids: Set[int]) -> None:
+    with _lock:
+        for token in [t for t, e in _entries.items() if e.user["id"] in user_ids]:
+            del _entries[token]
+
+
+def invalidate_shops(shop_ids: Set[int]) -> None:
+    with _lock:
+        for token in [t for t, e in _entries.items() if e.shop and e.shop["id"] in shop_ids]:
+            del _entries[token]
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
+
+
+# ========== REHYDRATION ==========
+def _attach(db: Session, model, values: dict):
+    """A persistent instance built from a snapshot; no SQL is emitted."""
+    existing = db.identity_map.get(identity_key(model, values["id"]))
+    if existing is not None:
+        return existing
+    obj = model()
+    for key, value in values.items():
+        set_committed_value(obj, key, value)
+    make_transient_to_detached(obj)
+    db.add(obj)
+    return obj
+
+
+def attach(db: Session, entry: _Entry) -> Tuple[models.User, Optional[models.Shop]]:
+    user = _attach(db, models.User, entry.user)
+    shop = _attach(db, models.Shop, entry.shop) if entry.shop else None
+    if "shop" not in inspect(user).dict:
+        set_committed_value(user, "shop", shop)
+    return user, shop
+
+
+# ========== INVALIDATION ==========
+# Any flush that changes or deletes a User / Shop records its id; the matching
+# entries are evicted once the transaction commits (is_active, profile, shop
+# settings, password, uploads, ...).
+_PENDING_KEY = "principal_cache_dirty"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session: Session, flush_context) -> None:
+    changed = [o for o in list(session.dirty) + list(session.deleted)
+               if isinstance(o, (models.User, models.Shop))]
+    if not changed:
+        return
+    pending: Dict[type, Set[int]] = session.info.setdefault(_PENDING_KEY, {})
+    for obj in changed:
+        if obj.id is not None:
+            pending.setdefault(type(obj), set()).add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_committed(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    if pending.get(models.User):
+        invalidate_users(pending[models.User])
+    if pending.get(models.Shop):
+        invalidate_shops(pending[models.Shop])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
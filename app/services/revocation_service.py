@@ -0,0 +1,192 @@
+"""
+Revocation Service for WinderInvoice
+Revoking access-token JWTs before they expire (logout, logout everywhere).
+
+Revocations live in token_revocations, keyed either by a token's jti or by
+its subject with a revoked_before cut-off. Each process keeps a Bloom filter
+of those keys, so checking a token costs a couple of hashes; only filter hits
+(real revocations plus ~REVOCATION_BLOOM_ERROR_RATE false positives) are
+confirmed against the table.
+
+The filter is refreshed incrementally - rows with an id above the last one
+seen - at most every REVOCATION_REFRESH_SECONDS, and rebuilt from unexpired
+rows every REVOCATION_REBUILD_SECONDS, which is also when expired rows are
+purged.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, exists, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on one blake2b digest)."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+def _jti_key(jti: str) -> str:
+    return f"jti:{jti}"
+
+
+def _subject_key(subject: str) -> str:
+    return f"sub:{subject}"
+
+
+# ========== FILTER STATE ==========
+_filter: Optional[BloomFilter] = None
+_last_id = 0
+_refreshed_at = 0.0
+_rebuilt_at = 0.0
+_state_lock = threading.Lock()
+
+
+def _add_rows(bloom: BloomFilter, rows: Iterable) -> int:
+    last_id = 0
+    for row_id, jti, subject in rows:
+        if jti:
+            bloom.add(_jti_key(jti))
+        if subject:
+            bloom.add(_subject_key(subject))
+        last_id = max(last_id, row_id)
+    return last_id
+
+
+def _rebuild(db: Session) -> None:
+    global _filter, _last_id, _rebuilt_at, _refreshed_at
+    R = models.TokenRevocation
+    now = datetime.utcnow()
+    # Own transaction: this runs inside request dependencies, whose session must not be committed here
+    try:
+        with db.get_bind().begin() as conn:
+            conn.execute(delete(R).where(R.expires_at < now))
+    except OperationalError as e:
+        # e.g. SQLite busy; expired rows are harmless and go next time
+        logger.warning(f"Could not purge expired token revocations: {e}")
+
+    live = db.query(func.count(R.id)).filter(R.expires_at >= now).scalar() or 0
+    # Headroom so incremental adds don't push past the target error rate before the next rebuild
+    bloom = BloomFilter(max(settings.REVOCATION_BLOOM_CAPACITY, live * 2), settings.REVOCATION_BLOOM_ERROR_RATE)
+    last_id = _add_rows(bloom, db.query(R.id, R.jti, R.subject).filter(R.expires_at >= now).yield_per(5000))
+    _filter = bloom
+    _last_id = max(last_id, db.query(func.max(R.id)).scalar() or 0)
+    _rebuilt_at = _refreshed_at = time.monotonic()
+
+
+def _refresh(db: Session) -> None:
+    global _last_id, _refreshed_at
+    R = models.TokenRevocation
+    rows = db.query(R.id, R.jti, R.subject).filter(R.id > _last_id).order_by(R.id).all()
+    _last_id = max(_last_id, _add_rows(_filter, rows))
+    _refreshed_at = time.monotonic()
+    if _filter.count > _filter.capacity:
+        _rebuild(db)
+
+
+def _sync(db: Session) -> BloomFilter:
+    now = time.monotonic()
+    if (_filter is not None and now - _refreshed_at < settings.REVOCATION_REFRESH_SECONDS
+            and now - _rebuilt_at < settings.REVOCATION_REBUILD_SECONDS):
+        return _filter
+    with _state_lock:
+        now = time.monotonic()
+        if _filter is None or now - _rebuilt_at >= settings.REVOCATION_REBUILD_SECONDS:
+            _rebuild(db)
+        elif now - _refreshed_at >= settings.REVOCATION_REFRESH_SECONDS:
+            _refresh(db)
+    return _filter
+
+
+def reset() -> None:
+    """Forget the in-process filter; the next check rebuilds it."""
+    global _filter
+    with _state_lock:
+        _filter = None
+
+
+# ========== CHECK ==========
+def is_revoked(db: Session, claims: dict) -> bool:
+    """True if this decoded access token has been revoked."""
+    jti, subject = claims.get("jti"), claims.get("sub")
+    bloom = _sync(db)
+    R = models.TokenRevocation
+
+    if jti and _jti_key(jti) in bloom:
+        if db.query(exists().where(R.jti == jti)).scalar():
+            return True
+
+    if subject and _subject_key(subject) in bloom:
+        cutoff = db.query(func.max(R.revoked_before)).filter(
+            R.subject == subject, R.expires_at >= datetime.utcnow()
+        ).scalar()
+        if cutoff is not None:
+            issued_at = claims.get("iat")
+            # Tokens from before iat was issued can't be ordered; treat them as older
+            if issued_at is None or datetime.utcfromtimestamp(float(issued_at)) < cutoff:
+                return True
+    return False
+
+
+# ========== REVOKE ==========
+def _remember(key_row: models.TokenRevocation) -> None:
+    # Make this process see its own revocation straight away
+    with _state_lock:
+        if _filter is not None:
+            _add_rows(_filter, [(0, key_row.jti, key_row.subject)])
+
+
+def revoke_token(db: Session, claims: dict) -> None:
+    """Revoke one decoded token (by jti). The caller commits."""
+    jti = claims.get("jti")
+    if not jti:
+        return
+    exp = claims.get("exp")
+    expires_at = datetime.utcfromtimestamp(exp) if exp else datetime.utcnow() + timedelta(
+        minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    row = models.TokenRevocation(jti=jti, expires_at=expires_at)
+    db.add(row)
+    _remember(row)
+
+
+def revoke_subject(db: Session, subject: str) -> None:
+    """Revoke every token issued to `subject` until now. The caller commits."""
+    now = datetime.utcnow()
+    row = models.TokenRevocation(
+        subject=subject,
+        revoked_before=now,
+        expires_at=now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+    db.add(row)
+    _remember(row)
@@ -0,0 +1,339 @@
+"""
+Search Service for WinderInvoice
+Full-text search across customers, products and invoices.
+
+Backends:
+- SQLite: FTS5 virtual table (trigram tokenizer where available, so partial
+  phone numbers / GSTINs match), ranked with bm25().
+- Postgres: regular table with a tsvector column and a pg_trgm GIN index,
+  ranked with ts_rank() + similarity().
+
+Both live in a table called `search_documents`, one row per indexed object.
+FTS5 can only look rows up by rowid, so on SQLite each document's rowid is
+derived from (kind, ref_id) by document_rowid() and updates and deletes go
+through it; Postgres has a (kind, ref_id) primary key. Writers call
+index_customer / index_product / index_invoice / remove_document inside their
+own transaction so the index commits (or rolls back) with the data.
+"""
+import logging
+from typing import List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+KIND_CUSTOMER = "customer"
+KIND_PRODUCT = "product"
+KIND_INVOICE = "invoice"
+KINDS = (KIND_CUSTOMER, KIND_PRODUCT, KIND_INVOICE)
+
+SEARCH_PAGE_SIZE = 20
+
+# Trigram FTS needs at least 3 characters per term
+MIN_TRIGRAM_LENGTH = 3
+
+# document_rowid(): ref_id * ROWID_STRIDE + KIND_CODES[kind]. Migration 0003
+# re-keys older tables with the same formula.
+KIND_CODES = {KIND_CUSTOMER: 1, KIND_PRODUCT: 2, KIND_INVOICE: 3}
+ROWID_STRIDE = 4
+
+# Set by ensure_search_schema(): "trigram" / "unicode61" on SQLite, None on Postgres
+_fts_tokenizer: Optional[str] = None
+
+
+def _dialect(db_or_engine) -> str:
+    bind = db_or_engine.get_bind() if isinstance(db_or_engine, Session) else db_or_engine
+    return bind.dialect.name
+
+
+def document_rowid(kind: str, ref_id: int) -> int:
+    """The FTS5 rowid of one document; unique per (kind, ref_id)."""
+    return int(ref_id) * ROWID_STRIDE + KIND_CODES[kind]
+
+
+# ========== SCHEMA ==========
+def ensure_search_schema(engine: Engine) -> None:
+    """Create the search table/indexes for the current backend if missing."""
+    global _fts_tokenizer
+
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            existing = conn.execute(text(
+                "SELECT sql FROM sqlite_master WHERE name = 'search_documents'"
+            )).scalar()
+            if existing:
+                _fts_tokenizer = "trigram" if "trigram" in existing else "unicode61"
+                if not _keyed_by_document(conn):
+                    _rekey(conn, existing)
+                return
+
+            for tokenizer in ("trigram", "unicode61"):
+                try:
+                    conn.execute(text(
+                        "CREATE VIRTUAL TABLE search_documents USING fts5("
+                        "kind UNINDEXED, ref_id UNINDEXED, shop_id UNINDEXED, title, body, "
+                        f"tokenize='{tokenizer}')"
+                    ))
+                    _fts_tokenizer = tokenizer
+                    return
+                except Exception as e:
+                    logger.warning(f"FTS5 tokenizer {tokenizer} unavailable: {e}")
+            return
+
+        # Postgres
+        try:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        except Exception as e:
+            logger.warning(f"Could not enable pg_trgm (substring search will be slower): {e}")
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS search_documents (
+                kind VARCHAR(16) NOT NULL,
+                ref_id INTEGER NOT NULL,
+                shop_id INTEGER NOT NULL,
+                title TEXT NOT NULL DEFAULT '',
+                body TEXT NOT NULL DEFAULT '',
+                document tsvector GENERATED ALWAYS AS (
+                    to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(body, ''))
+                ) STORED,
+                PRIMARY KEY (kind, ref_id)
+            )
+        """))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_search_documents_shop ON search_documents (shop_id)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_search_documents_tsv ON search_documents USING GIN (document)"
+        ))
+        try:
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_search_documents_trgm ON search_documents "
+                "USING GIN ((title || ' ' || body) gin_trgm_ops)"
+            ))
+        except Exception as e:
+            logger.warning(f"Could not create trigram index: {e}")
+
+
+_ROWID_SQL = (
+    f"CAST(ref_id AS INTEGER) * {ROWID_STRIDE} + CASE kind "
+    + " ".join(f"WHEN '{kind}' THEN {code}" for kind, code in KIND_CODES.items())
+    + " END"
+)
+
+
+def _keyed_by_document(conn) -> bool:
+    """Whether the first and last rows sit at document_rowid() (tables indexed before it did not)."""
+    for order in ("ASC", "DESC"):
+        row = conn.execute(text(
+            f"SELECT rowid, {_ROWID_SQL} FROM search_documents ORDER BY rowid {order} LIMIT 1"
+        )).first()
+        if row is not None and row[0] != row[1]:
+            return False
+    return True
+
+
+def _rekey(conn, create_sql: str) -> None:
+    """Copy an SQLite index into a table keyed by document_rowid() (tenant databases)."""
+    logger.info("Re-keying search_documents by (kind, ref_id)")
+    conn.execute(text(create_sql.replace("search_documents", "search_documents_rekeyed", 1)))
+    # In rowid order, so the newest of any duplicate documents wins
+    conn.execute(text(
+        "INSERT OR REPLACE INTO search_documents_rekeyed (rowid, kind, ref_id, shop_id, title, body) "
+        f"SELECT {_ROWID_SQL}, kind, ref_id, shop_id, title, body FROM search_documents "
+        f"WHERE kind IN ({', '.join(repr(kind) for kind in KIND_CODES)}) ORDER BY rowid"
+    ))
+    conn.execute(text("DROP TABLE search_documents"))
+    conn.execute(text("ALTER TABLE search_documents_rekeyed RENAME TO search_documents"))
+
+
+# ========== INDEX MAINTENANCE ==========
+def _join(*parts) -> str:
+    return " ".join(str(p) for p in parts if p)
+
+
+def _upsert_sql(db: Session):
+    if _dialect(db) == "sqlite":
+        return text(
+            "INSERT OR REPLACE INTO search_documents (rowid, kind, ref_id, shop_id, title, body) "
+            "VALUES (:rowid, :kind, :ref_id, :shop_id, :title, :body)"
+        )
+    return text(
+        "INSERT INTO search_documents (kind, ref_id, shop_id, title, body) "
+        "VALUES (:kind, :ref_id, :shop_id, :title, :body) "
+        "ON CONFLICT (kind, ref_id) DO UPDATE SET "
+        "shop_id = EXCLUDED.shop_id, title = EXCLUDED.title, body = EXCLUDED.body"
+    )
+
+
+def _params(kind: str, ref_id: int, shop_id: int, title: str, body: str) -> dict:
+    return {"rowid": document_rowid(kind, ref_id), "kind": kind, "ref_id": ref_id, "shop_id": shop_id,
+            "title": title or "", "body": body or ""}
+
+
+def _upsert(db: Session, kind: str, ref_id: int, shop_id: int, title: str, body: str) -> None:
+    db.execute(_upsert_sql(db), _params(kind, ref_id, shop_id, title, body))
+
+
+def customer_document(customer) -> dict:
+    return {"ref_id": customer.id, "shop_id": customer.shop_id, "title": customer.name,
+            "body": _join(customer.phone, customer.gstin, customer.party_code, customer.city)}
+
+
+def product_document(product) -> dict:
+    return {"ref_id": product.id, "shop_id": product.shop_id, "title": product.name,
+            "body": _join(product.hsn_code, product.description)}
+
+
+def index_customer(db: Session, customer: models.Customer) -> None:
+    _upsert(db, KIND_CUSTOMER, **customer_document(customer))
+
+
+def index_product(db: Session, product: models.Product) -> None:
+    _upsert(db, KIND_PRODUCT, **product_document(product))
+
+
+def index_invoice(db: Session, invoice: models.Invoice, customer_name: Optional[str] = None,
+                  descriptions: Sequence[str] = ()) -> None:
+    _upsert(db, KIND_INVOICE, invoice.id, invoice.shop_id, invoice.invoice_no,
+            _join(customer_name, *descriptions))
+
+
+def index_many(db: Session, kind: str, docs: Sequence[dict]) -> None:
+    """
+    Upsert a batch of documents with one executemany.
+
+    Args:
+        docs: Dicts with ref_id, shop_id, title, body
+    """
+    if not docs:
+        return
+    db.execute(_upsert_sql(db), [
+        _params(kind, d["ref_id"], d["shop_id"], d.get("title"), d.get("body")) for d in docs
+    ])
+
+
+def _delete(db: Session, params) -> None:
+    if _dialect(db) == "sqlite":
+        # By rowid: the other columns are UNINDEXED, so filtering on them scans the table
+        db.execute(text("DELETE FROM search_documents WHERE rowid = :rowid"), params)
+    else:
+        db.execute(text("DELETE FROM search_documents WHERE kind = :kind AND ref_id = :ref_id"), params)
+
+
+def remove_document(db: Session, kind: str, ref_id: int) -> None:
+    _delete(db, {"kind": kind, "ref_id": ref_id, "rowid": document_rowid(kind, ref_id)})
+
+
+def rebuild_index(db: Session, shop_id: Optional[int] = None) -> int:
+    """Re-index everything (or one shop). Returns number of documents written."""
+    count = 0
+
+    customers = db.query(models.Customer)
+    products = db.query(models.Product)
+    invoices = db.query(models.Invoice.id, models.Invoice.shop_id, models.Invoice.invoice_no, models.Customer.name).outerjoin(
+        models.Customer, models.Customer.id == models.Invoice.customer_id
+    )
+    if shop_id is not None:
+        customers = customers.filter(models.Customer.shop_id == shop_id)
+        products = products.filter(models.Product.shop_id == shop_id)
+        invoices = invoices.filter(models.Invoice.shop_id == shop_id)
+
+    for customer in customers.yield_per(500):
+        index_customer(db, customer)
+        count += 1
+    for product in products.yield_per(500):
+        index_product(db, product)
+        count += 1
+    for invoice in invoices.yield_per(500):
+        descriptions = [d for (d,) in db.query(models.InvoiceItem.description).filter(
+            models.InvoiceItem.invoice_id == invoice.id
+        )]
+        index_invoice(db, invoice, invoice.name, descriptions)
+        count += 1
+    return count
+
+
+# ========== QUERY ==========
+def _like_pattern(q: str) -> str:
+    """Substring pattern for LIKE ... ESCAPE '\\': the user's % and _ match literally."""
+    return "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _fts5_query(q: str) -> str:
+    """Quote each term so user input can't inject FTS5 syntax; terms are ANDed."""
+    terms = [t.replace('"', '""') for t in q.split()]
+    if _fts_tokenizer == "trigram":
+        return " ".join(f'"{t}"' for t in terms)
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def search(
+    db: Session,
+    shop_id: int,
+    q: str,
+    kinds: Optional[Sequence[str]] = None,
+    limit: int = SEARCH_PAGE_SIZE,
+    offset: int = 0,
+) -> List[dict]:
+    """
+    Ranked search within one shop.
+
+    Returns:
+        List of {"kind", "ref_id", "title", "body"} dicts, best match first.
+    """
+    q = (q or "").strip()
+    if not q:
+        return []
+
+    if _dialect(db) == "sqlite" and _fts_tokenizer is None:
+        ensure_search_schema(db.get_bind())
+
+    kinds = [k for k in (kinds or KINDS) if k in KINDS]
+    if not kinds:
+        return []
+    kind_params = {f"k{i}": k for i, k in enumerate(kinds)}
+    kind_filter = "kind IN (" + ", ".join(f":{k}" for k in kind_params) + ")"
+    params = {"shop_id": shop_id, "limit": limit, "offset": offset, **kind_params}
+
+    if _dialect(db) == "sqlite":
+        short_terms = _fts_tokenizer == "trigram" and any(len(t) < MIN_TRIGRAM_LENGTH for t in q.split())
+        if short_terms:
+            # Too short for the trigram index; fall back to a substring scan of this shop's rows
+            sql = (
+                "SELECT kind, ref_id, title, body FROM search_documents "
+                f"WHERE shop_id = :shop_id AND {kind_filter} AND (title || ' ' || body) LIKE :like ESCAPE '\\' "
+                "ORDER BY title LIMIT :limit OFFSET :offset"
+            )
+            params["like"] = _like_pattern(q)
+        else:
+            sql = (
+                "SELECT kind, ref_id, title, body FROM search_documents "
+                f"WHERE search_documents MATCH :match AND shop_id = :shop_id AND {kind_filter} "
+                "ORDER BY bm25(search_documents, 0, 0, 0, 10.0, 1.0) LIMIT :limit OFFSET :offset"
+            )
+            params["match"] = _fts5_query(q)
+    else:
+        sql = (
+            "SELECT kind, ref_id, title, body FROM search_documents "
+            f"WHERE shop_id = :shop_id AND {kind_filter} AND ("
+            "document @@ plainto_tsquery('simple', :q) OR (title || ' ' || body) ILIKE :like ESCAPE '\\') "
+            "ORDER BY ts_rank(document, plainto_tsquery('simple', :q)) + similarity(title, :q) DESC "
+            "LIMIT :limit OFFSET :offset"
+        )
+        params["q"] = q
+        params["like"] = _like_pattern(q)
+
+    rows = db.execute(text(sql), params).all()
+    return [{"kind": r.kind, "ref_id": int(r.ref_id), "title": r.title, "body": r.body} for r in rows]
+
+
+def result_url(result: dict) -> str:
+    """Where a search hit should link to."""
+    if result["kind"] == KIND_CUSTOMER:
+        return f"/customers/{result['ref_id']}/edit"
+    if result["kind"] == KIND_PRODUCT:
+        return f"/products/{result['ref_id']}/edit"
+    return f"/invoices/{result['ref_id']}"
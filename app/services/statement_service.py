@@ -0,0 +1,241 @@
+"""
+Statement Service for WinderInvoice
+Builds month-end customer statements for a whole shop in one windowed SQL pass
+and streams them out as a combined HTML document or a ZIP of per-customer PDFs.
+"""
+import logging
+import re
+import zipfile
+from datetime import date
+from io import BytesIO
+from itertools import groupby
+from typing import Iterator
+
+from sqlalchemy import and_, func, literal, or_, select, union_all, Date, Float, Integer, String
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services import archive_service
+
+logger = logging.getLogger(__name__)
+
+# Synthetic date for the per-customer opening-balance row so it always sorts
+# before any real transaction.
+EPOCH = date(1900, 1, 1)
+
+# Rows fetched per round-trip while streaming
+FETCH_SIZE = 500
+
+
+def _statement_query(shop_id: int, start_date: date, end_date: date, Invoice=models.Invoice):
+    """
+    One statement row per ledger entry in [start_date, end_date] plus one
+    brought-forward row per customer, each carrying its running balance.
+
+    The running balance is SUM(debit - credit) OVER (PARTITION BY customer_id
+    ORDER BY date) across the customer's whole history up to end_date, so the
+    opening balance is simply the running balance of the last row dated before
+    start_date (found with LEAD()).
+
+    `Invoice` may be an archive union from archive_service.invoice_source().
+    """
+    Customer, Payment = models.Customer, models.Payment
+
+    openings = select(
+        Customer.id.label("customer_id"),
+        literal(EPOCH, Date).label("date"),
+        literal(0, Integer).label("kind"),
+        literal(0, Integer).label("ref_id"),
+        literal("Opening Balance", String).label("particulars"),
+        func.coalesce(Customer.opening_balance, 0.0).label("debit"),
+        literal(0.0, Float).label("credit"),
+    ).where(Customer.shop_id == shop_id)
+
+    invoices = select(
+        Invoice.customer_id,
+        Invoice.date,
+        literal(1, Integer),
+        Invoice.id,
+        literal("Invoice #", String) + Invoice.invoice_no,
+        func.coalesce(Invoice.grand_total, 0.0),
+        literal(0.0, Float),
+    ).where(
+        Invoice.shop_id == shop_id,
+        Invoice.customer_id.isnot(None),
+        Invoice.date <= end_date,
+    )
+
+    payments = select(
+        Payment.customer_id,
+        Payment.date,
+        literal(2, Integer),
+        Payment.id,
+        literal("Receipt - ", String) + func.coalesce(Payment.mode, ""),
+        literal(0.0, Float),
+        Payment.amount,
+    ).where(
+        Payment.shop_id == shop_id,
+        Payment.date <= end_date,
+    )
+
+    entries = union_all(openings, invoices, payments).subquery("entries")
+    order = (entries.c.date, entries.c.kind, entries.c.ref_id)
+
+    windowed = select(
+        entries,
+        func.sum(entries.c.debit - entries.c.credit).over(
+            partition_by=entries.c.customer_id, order_by=order, rows=(None, 0)
+        ).label("balance"),
+        func.lead(entries.c.date).over(
+            partition_by=entries.c.customer_id, order_by=order
+        ).label("next_date"),
+    ).subquery("windowed")
+
+    return select(
+        windowed.c.customer_id,
+        windowed.c.date,
+        windowed.c.particulars,
+        windowed.c.debit,
+        windowed.c.credit,
+        windowed.c.balance,
+        Customer.name,
+        Customer.billing_address,
+        Customer.gstin,
+        Customer.phone,
+    ).join(
+        Customer, Customer.id == windowed.c.customer_id
+    ).where(
+        or_(
+            windowed.c.date >= start_date,
+            # last row before the period = brought-forward balance
+            and_(
+                windowed.c.date < start_date,
+                or_(windowed.c.next_date.is_(None), windowed.c.next_date >= start_date),
+            ),
+        )
+    ).order_by(
+        Customer.name, windowed.c.customer_id, windowed.c.date, windowed.c.kind, windowed.c.ref_id
+    )
+
+
+def iter_statements(
+    db: Session,
+    shop_id: int,
+    start_date: date,
+    end_date: date,
+    skip_empty: bool = True,
+) -> Iterator[dict]:
+    """
+    Yield one statement dict per customer, in customer-name order.
+
+    Rows are streamed from the database in FETCH_SIZE batches, so memory stays
+    bounded by the largest single statement rather than the whole shop.
+
+    Args:
+        skip_empty: Omit customers with no activity in the period and a zero balance.
+    """
+    # Running balances need every invoice up to end_date, archived years included
+    invoices = archive_service.invoice_source(db, None, end_date)
+    result = db.execute(
+        _statement_query(shop_id, start_date, end_date, invoices).execution_options(yield_per=FETCH_SIZE)
+    )
+
+    for customer_id, rows in groupby(result, key=lambda r: r.customer_id):
+        rows = list(rows)
+        head = rows[0]
+        if head.date < start_date:
+            opening_balance = head.balance or 0.0
+            period_rows = rows[1:]
+        else:
+            opening_balance = 0.0
+            period_rows = rows
+
+        entries = [{
+            "date": r.date,
+            "particulars": r.particulars,
+            "debit": r.debit or 0.0,
+            "credit": r.credit or 0.0,
+            "balance": r.balance or 0.0,
+        } for r in period_rows]
+        closing_balance = entries[-1]["balance"] if entries else opening_balance
+
+        if skip_empty and not entries and abs(closing_balance) < 0.005:
+            continue
+
+        yield {
+            "customer": {
+                "id": customer_id,
+                "name": head.name,
+                "billing_address": head.billing_address,
+                "gstin": head.gstin,
+                "phone": head.phone,
+            },
+            "opening_balance": opening_balance,
+            "entries": entries,
+            "closing_balance": closing_balance,
+            "total_debit": sum(e["debit"] for e in entries),
+            "total_credit": sum(e["credit"] for e in entries),
+        }
+
+
+def statement_filename(statement: dict, end_date: date, extension: str = "pdf") -> str:
+    """
+    Safe per-customer filename: Statement-<Customer>-<id>-<YYYY-MM-DD>.pdf
+
+    The customer id keeps two customers with the same name from writing
+    the same ZIP entry.
+    """
+    customer = statement["customer"]
+    raw_name = f"Statement-{customer['name']}-{customer['id']}-{end_date.isoformat()}"
+    return re.sub(r'[^A-Za-z0-9._-]+', '-', raw_name) + f".{extension}"
+
+
+class _ChunkBuffer:
+    """Write-only file object that hands out whatever has been written so far."""
+
+    def __init__(self):
+        self._buffer = BytesIO()
+
+    def write(self, data: bytes) -> int:
+        return self._buffer.write(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+def stream_pdf_zip(statements: Iterator[dict], render_html, end_date: date) -> Iterator[bytes]:
+    """
+    Render each statement to PDF and stream them as a ZIP archive.
+
+    A statement that fails to render gets a .error.txt entry in its place,
+    so a missing customer is visible in the download itself.
+
+    Args:
+        statements: Output of iter_statements()
+        render_html: Callable(statement) -> HTML string for one customer
+    """
+    from xhtml2pdf import pisa
+
+    sink = _ChunkBuffer()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for statement in statements:
+            pdf_buffer = BytesIO()
+            pisa_status = pisa.CreatePDF(render_html(statement), dest=pdf_buffer)
+            if pisa_status.err:
+                customer = statement["customer"]
+                logger.error("Statement PDF failed for customer %s (%s)", customer["id"], customer["name"])
+                archive.writestr(
+                    statement_filename(statement, end_date, extension="error.txt"),
+                    f"The statement for {customer['name']} (customer {customer['id']}) could not be "
+                    f"rendered to PDF ({pisa_status.err} error(s)).\n",
+                )
+            else:
+                archive.writestr(statement_filename(statement, end_date), pdf_buffer.getvalue())
+            yield sink.drain()
+    yield sink.drain()
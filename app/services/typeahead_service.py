@@ -0,0 +1,235 @@
+"""
+Typeahead Service for WinderInvoice
+In-memory, per-shop lookup indexes for products and customers so the invoice
+form can search as you type instead of embedding the whole catalogue.
+
+Each index is a sorted array of (token, id) pairs; a prefix lookup is a
+bisect plus a short forward scan. Queries that find too few word-prefix hits
+fall back to a substring scan of the shop's entries. Writers update the index
+in place after commit (write-through); indexes are also rebuilt after
+TYPEAHEAD_TTL_SECONDS so other worker processes pick up changes.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+
+KIND_PRODUCT = "product"
+KIND_CUSTOMER = "customer"
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+_TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+
+
+def _normalize(value: Optional[str]) -> str:
+    return " ".join(_TOKEN_SPLIT.split(str(value or "").lower())).strip()
+
+
+class TypeaheadIndex:
+    """Sorted prefix array over the tokens of one shop's products or customers."""
+
+    def __init__(self):
+        self._keys: List[Tuple[str, int]] = []
+        self._items: Dict[int, dict] = {}
+        self._tokens: Dict[int, List[str]] = {}
+        self._search_text: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self.built_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _remove_unlocked(self, item_id: int) -> None:
+        for token in self._tokens.pop(item_id, []):
+            pos = bisect_left(self._keys, (token, item_id))
+            if pos < len(self._keys) and self._keys[pos] == (token, item_id):
+                del self._keys[pos]
+        self._items.pop(item_id, None)
+        self._search_text.pop(item_id, None)
+
+    def add(self, item_id: int, payload: dict, terms: Iterable[Optional[str]]) -> None:
+        text = " ".join(_normalize(t) for t in terms if t)
+        tokens = sorted(set(text.split()))
+        with self._lock:
+            self._remove_unlocked(item_id)
+            for token in tokens:
+                insort(self._keys, (token, item_id))
+            self._items[item_id] = payload
+            self._tokens[item_id] = tokens
+            self._search_text[item_id] = text
+
+    def load(self, entries: Iterable[Tuple[int, dict, Iterable[Optional[str]]]]) -> None:
+        """Bulk build: one sort instead of an insort per token."""
+        keys = []
+        for item_id, payload, terms in entries:
+            text = " ".join(_normalize(t) for t in terms if t)
+            tokens = sorted(set(text.split()))
+            keys.extend((token, item_id) for token in tokens)
+            self._items[item_id] = payload
+            self._tokens[item_id] = tokens
+            self._search_text[item_id] = text
+        keys.sort()
+        self._keys = keys
+
+    def remove(self, item_id: int) -> None:
+        with self._lock:
+            self._remove_unlocked(item_id)
+
+    def _prefix_ids(self, prefix: str, cap: int) -> List[int]:
+        ids: List[int] = []
+        seen = set()
+        pos = bisect_left(self._keys, (prefix, -1))
+        while pos < len(self._keys) and len(ids) < cap:
+            token, item_id = self._keys[pos]
+            if not token.startswith(prefix):
+                break
+            if item_id not in seen:
+                seen.add(item_id)
+                ids.append(item_id)
+            pos += 1
+        return ids
+
+    def lookup(self, q: str, limit: int = DEFAULT_LIMIT) -> List[dict]:
+        words = _normalize(q).split()
+        if not words:
+            return []
+
+        with self._lock:
+            # Every query word must prefix-match one of the entry's tokens
+            candidates = self._prefix_ids(words[0], cap=limit * 20)
+            matches = [
+                i for i in candidates
+                if all(any(t.startswith(w) for t in self._tokens[i]) for w in words[1:])
+            ]
+
+            if len(matches) < limit:
+                # Substring fallback, e.g. middle digits of a phone or GSTIN
+                needle = " ".join(words)
+                found = set(matches)
+                for item_id, text in self._search_text.items():
+                    if len(matches) >= limit * 2:
+                        break
+                    if item_id not in found and needle in text:
+                        matches.append(item_id)
+
+            phrase = " ".join(words)
+            matches.sort(key=lambda i: (
+                not self._search_text[i].startswith(phrase),
+                self._items[i].get("name", "").lower(),
+            ))
+            return [self._items[i] for i in matches[:limit]]
+
+
+# ========== PER-SHOP REGISTRY ==========
+_indexes: Dict[Tuple[int, str], TypeaheadIndex] = {}
+_registry_lock = threading.Lock()
+
+
+def _product_entry(p) -> Tuple[int, dict, list]:
+    payload = {
+        "id": p.id,
+        "name": p.name,
+        "hsn_code": p.hsn_code,
+        "unit": p.unit,
+        "rate": p.rate or 0.0,
+        "gst_rate": p.gst_rate or 0.0,
+    }
+    return p.id, payload, [p.name, p.hsn_code]
+
+
+def _customer_entry(c) -> Tuple[int, dict, list]:
+    payload = {
+        "id": c.id,
+        "name": c.name,
+        "state": c.state,
+        "state_code": c.state_code,
+        "gstin": c.gstin,
+        "phone": c.phone,
+        "place_of_supply": c.place_of_supply,
+    }
+    return c.id, payload, [c.name, c.party_code, c.phone, c.gstin, c.city]
+
+
+def _load_products(db: Session, shop_id: int):
+    rows = db.query(
+        models.Product.id, models.Product.name, models.Product.hsn_code,
+        models.Product.unit, models.Product.rate, models.Product.gst_rate,
+    ).filter(models.Product.shop_id == shop_id)
+    return (_product_entry(r) for r in rows)
+
+
+def _load_customers(db: Session, shop_id: int):
+    rows = db.query(
+        models.Customer.id, models.Customer.name, models.Customer.state, models.Customer.state_code,
+        models.Customer.gstin, models.Customer.phone, models.Customer.place_of_supply,
+        models.Customer.party_code, models.Customer.city,
+    ).filter(models.Customer.shop_id == shop_id)
+    return (_customer_entry(r) for r in rows)
+
+
+_LOADERS: Dict[str, Callable] = {
+    KIND_PRODUCT: _load_products,
+    KIND_CUSTOMER: _load_customers,
+}
+
+
+def get_index(db: Session, shop_id: int, kind: str) -> TypeaheadIndex:
+    """Return the shop's index, building it (column projection only) if missing or expired."""
+    key = (shop_id, kind)
+    index = _indexes.get(key)
+    if index is not None and time.monotonic() - index.built_at < settings.TYPEAHEAD_TTL_SECONDS:
+        return index
+
+    with _registry_lock:
+        index = _indexes.get(key)
+        if index is None or time.monotonic() - index.built_at >= settings.TYPEAHEAD_TTL_SECONDS:
+            index = TypeaheadIndex()
+            index.load(_LOADERS[kind](db, shop_id))
+            _indexes[key] = index
+    return index
+
+
+def lookup(db: Session, shop_id: int, kind: str, q: str, limit: int = DEFAULT_LIMIT) -> List[dict]:
+    limit = max(1, min(limit, MAX_LIMIT))
+    return get_index(db, shop_id, kind).lookup(q, limit)
+
+
+# ========== WRITE-THROUGH ==========
+# Call after the write has committed. Shops whose index hasn't been built yet
+# are skipped; it will be loaded fresh on first lookup.
+def product_saved(product: models.Product) -> None:
+    index = _indexes.get((product.shop_id, KIND_PRODUCT))
+    if index is not None:
+        index.add(*_product_entry(product))
+
+
+def customer_saved(customer: models.Customer) -> None:
+    index = _indexes.get((customer.shop_id, KIND_CUSTOMER))
+    if index is not None:
+        index.add(*_customer_entry(customer))
+
+
+def product_deleted(shop_id: int, product_id: int) -> None:
+    index = _indexes.get((shop_id, KIND_PRODUCT))
+    if index is not None:
+        index.remove(product_id)
+
+
+def customer_deleted(shop_id: int, customer_id: int) -> None:
+    index = _indexes.get((shop_id, KIND_CUSTOMER))
+    if index is not None:
+        index.remove(customer_id)
+
+
+def invalidate(shop_id: int, kind: Optional[str] = None) -> None:
+    """Drop a shop's index(es); the next lookup rebuilds from the database."""
+    for k in ([kind] if kind else list(_LOADERS)):
+        _indexes.pop((shop_id, k), None)
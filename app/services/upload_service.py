@@ -0,0 +1,172 @@
+"""
+Upload Service for WinderInvoice
+Which stored uploads are still in use.
+
+Uploads are content-addressed (storage.save_upload_addressed): identical
+bytes uploaded by two shops are one object. So an object can only go when no
+row anywhere points at it. The owning columns are listed in REFERENCE_COLUMNS;
+image variants (image_variants) live and die with their original.
+
+sweep_orphans() is the garbage collector: it lists the upload directories in
+storage and deletes files nothing references, once they are older than
+UPLOAD_GC_GRACE_HOURS (an upload is written before its row is committed, and
+a deduplicated re-upload refreshes the file's timestamp).
+
+With a database per tenant (app/tenancy.py) the same object can be
+referenced from several shops' databases, so columns of tenant tables are
+checked in every shop's database, not just the caller's.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models, tenancy
+from app.config import settings
+from app.storage import StorageProvider, StoredObject, get_default_storage
+
+logger = logging.getLogger(__name__)
+
+# Folders save_upload_file writes to
+UPLOAD_DIRECTORIES = ("logos", "signatures", "qr_codes", "avatars")
+
+# Every column that stores an upload URL
+REFERENCE_COLUMNS = (
+    models.Shop.logo_path,
+    models.Shop.signature_path,
+    models.User.avatar_path,
+    models.BankDetail.qr_code_path,
+)
+
+
+def _sessions_for(db: Session, column) -> Iterator[Session]:
+    """Sessions holding column's rows: db, or every shop's database for tenant tables."""
+    if tenancy.enabled() and column.table.name in tenancy.TENANT_TABLES:
+        yield from tenancy.tenant_sessions()
+    else:
+        yield db
+
+
+def reference_counts(db: Session, urls: Iterable[Optional[str]]) -> Dict[str, int]:
+    """{url: number of rows referencing it} for the given URLs (0 if unused)."""
+    urls = [u for u in set(urls) if u]
+    counts = dict.fromkeys(urls, 0)
+    if not urls:
+        return counts
+    for column in REFERENCE_COLUMNS:
+        for session in _sessions_for(db, column):
+            rows = session.query(column, func.count()).filter(column.in_(urls)).group_by(column)
+            for url, count in rows:
+                counts[url] += count
+    return counts
+
+
+def is_referenced(db: Session, url: Optional[str]) -> bool:
+    return bool(url) and reference_counts(db, [url])[url] > 0
+
+
+def unreferenced(db: Session, urls: Iterable[Optional[str]]) -> Set[str]:
+    """The subset of `urls` no Shop, User or BankDetail uses any more."""
+    return {url for url, count in reference_counts(db, urls).items() if count == 0}
+
+
+def referenced_urls(db: Session) -> Set[str]:
+    """Every upload URL in use, plus the variants recorded for them."""
+    urls: Set[str] = set()
+    for column in REFERENCE_COLUMNS:
+        for session in _sessions_for(db, column):
+            urls.update(url for (url,) in session.query(column).filter(column.isnot(None)).distinct())
+    V = models.ImageVariant
+    urls.update([path for source, path in db.query(V.source_path, V.path) if source in urls])
+    return urls
+
+
+# ========== GARBAGE COLLECTION ==========
+def _referenced_keys(db: Session, storage: StorageProvider) -> Set[str]:
+    return {storage.key(url) for url in referenced_urls(db)}
+
+
+def find_orphans(db: Session, storage: StorageProvider, cutoff: datetime) -> Dict[str, object]:
+    """
+    Diff storage listings against the referenced uploads.
+
+    Returns:
+        {"scanned", "orphans": [StoredObject older than cutoff], "recent": count of
+        unreferenced files still inside the grace period}
+    """
+    referenced = _referenced_keys(db, storage)
+    scanned = recent = 0
+    orphans: List[StoredObject] = []
+    for directory in UPLOAD_DIRECTORIES:
+        for obj in storage.list_objects(directory):
+            scanned += 1
+            if obj.path in referenced:
+                continue
+            if obj.modified >= cutoff:
+                recent += 1
+            else:
+                orphans.append(obj)
+    return {"scanned": scanned, "orphans": orphans, "recent": recent}
+
+
+def _forget_variants(db: Session, storage: StorageProvider, keys: Set[str]) -> int:
+    """Drop image_variants rows for deleted originals or variant files."""
+    V = models.ImageVariant
+    ids = [
+        row_id for row_id, source, path in db.query(V.id, V.source_path, V.path)
+        if storage.key(source) in keys or storage.key(path) in keys
+    ]
+    if ids:
+        db.query(V).filter(V.id.in_(ids)).delete(synchronize_session=False)
+    return len(ids)
+
+
+def sweep_orphans(
+    db: Session,
+    grace_hours: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    dry_run: bool = False,
+    storage: Optional[StorageProvider] = None,
+) -> Dict[str, object]:
+    """
+    Delete uploaded files that no Shop, User or BankDetail references.
+
+    Deletes in batches of `batch_size`. Before each batch the references are
+    read again, so a file that was re-used (deduplicated upload) since the
+    listing survives. Commits after each batch (image_variants rows of
+    deleted files are removed with it).
+
+    Returns:
+        Report: {"scanned", "recent", "orphans" (list of StoredObject),
+        "orphan_bytes", "deleted", "variant_rows", "dry_run"}
+    """
+    storage = storage or get_default_storage()
+    grace = timedelta(hours=settings.UPLOAD_GC_GRACE_HOURS if grace_hours is None else grace_hours)
+    batch_size = max(batch_size or settings.UPLOAD_GC_BATCH_SIZE, 1)
+
+    report = find_orphans(db, storage, datetime.utcnow() - grace)
+    orphans = report["orphans"]
+    report.update(
+        orphan_bytes=sum(o.size for o in orphans),
+        deleted=0,
+        variant_rows=0,
+        dry_run=dry_run,
+    )
+    if dry_run:
+        return report
+
+    for start in range(0, len(orphans), batch_size):
+        batch = orphans[start:start + batch_size]
+        referenced = _referenced_keys(db, storage)
+        batch = [o for o in batch if o.path not in referenced]
+        if not batch:
+            continue
+        keys = {o.path for o in batch}
+        deleted = storage.delete_many(sorted(keys))
+        report["deleted"] += deleted
+        report["variant_rows"] += _forget_variants(db, storage, keys)
+        db.commit()
+        logger.info(f"Upload GC: deleted {deleted} of {len(batch)} orphaned files")
+    return report
@@ -3,22 +3,118 @@ Storage abstraction layer for handling file uploads.
 Supports both local filesystem (development) and S3-compatible storage (production).
 """
 import os
-import boto3
+import shutil
+import hashlib
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import BinaryIO, Optional
+from typing import BinaryIO, Iterable, Iterator, NamedTuple, Optional, Tuple
 from app.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Read size for streaming uploads
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+# Content-addressed objects are spooled in memory up to this size before hashing decides their key
+ADDRESSED_SPOOL_BYTES = 1024 * 1024
+
+# A content-addressed key names exactly one content, so it can be cached forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class UploadRejected(ValueError):
+    """Raised mid-stream when an upload breaks a size or type limit."""
+
+
+class StoredUpload(NamedTuple):
+    url: str
+    sha256: str
+    size: int
+    deduplicated: bool = False  # identical content was already stored under this key
+
+
+class StoredObject(NamedTuple):
+    path: str           # storage key, e.g. "logos/<sha256>.png"
+    size: int
+    modified: datetime  # UTC
+
+
+def content_addressed_path(directory: str, sha256: str, ext: str) -> str:
+    """Storage key for content with this SHA-256, e.g. "logos/9f86d0...0a08.png" """
+    return f"{directory}/{sha256}{ext.lower()}"
+
+
+def _hashed(chunks: Iterable[bytes], digest: "_Digest") -> Iterator[bytes]:
+    for chunk in chunks:
+        digest.update(chunk)
+        yield chunk
+
 
 class StorageProvider:
     """Base storage provider interface"""
     
     def save(self, file: BinaryIO, path: str) -> str:
-        """Save file and return the accessible URL/path"""
+        """Save file and return its stored reference (see reference())"""
+        raise NotImplementedError
+    
+    def save_stream(
+        self,
+        chunks: Iterable[bytes],
+        path: str,
+        content_type: Optional[str] = None,
+        cache_control: Optional[str] = None,
+    ) -> str:
+        """
+        Save an iterable of byte chunks without holding the whole file in memory.
+        If the iterable raises, nothing is left behind at `path`.
+        """
         raise NotImplementedError
     
+    def save_addressed(
+        self,
+        chunks: Iterable[bytes],
+        directory: str,
+        ext: str,
+        content_type: Optional[str] = None,
+    ) -> StoredUpload:
+        """
+        Save chunks under a key derived from their SHA-256 (content_addressed_path).
+        If that key already exists the content is identical, so nothing is written.
+        
+        This default spools the content locally (in memory up to
+        ADDRESSED_SPOOL_BYTES) until the hash is known, then uploads it once.
+        """
+        digest = _Digest()
+        with tempfile.SpooledTemporaryFile(max_size=ADDRESSED_SPOOL_BYTES) as spool:
+            for chunk in _hashed(chunks, digest):
+                spool.write(chunk)
+            path = content_addressed_path(directory, digest.hexdigest(), ext)
+            if self.touch(path, content_type):
+                return StoredUpload(self.reference(path), digest.hexdigest(), digest.size, deduplicated=True)
+            spool.seek(0)
+            url = self.save_stream(
+                iter(lambda: spool.read(UPLOAD_CHUNK_BYTES), b""), path, content_type,
+                cache_control=IMMUTABLE_CACHE_CONTROL,
+            )
+        return StoredUpload(url, digest.hexdigest(), digest.size)
+    
+    def touch(self, path: str, content_type: Optional[str] = None) -> bool:
+        """
+        Mark an existing file as just written, so a concurrent orphan sweep
+        (which spares recently modified files) leaves it alone.
+        False if there is no such file.
+        """
+        return self.exists(path)
+    
+    def reference(self, path: str) -> str:
+        """What the save methods return for `path`: store this, resolve it with get_url"""
+        return path
+    
     def get_url(self, path: str) -> str:
         """Get the URL for accessing a stored file"""
         raise NotImplementedError
@@ -30,6 +126,18 @@ class StorageProvider:
     def exists(self, path: str) -> bool:
         """Check if file exists"""
         raise NotImplementedError
+    
+    def key(self, reference: str) -> str:
+        """The storage key (as listed by list_objects) behind a stored reference"""
+        return reference
+    
+    def list_objects(self, prefix: str) -> Iterator[StoredObject]:
+        """Every file under `prefix` (a directory such as "logos"), in no particular order"""
+        raise NotImplementedError
+    
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """Delete files by storage key; returns how many were deleted"""
+        return sum(1 for key in keys if self.delete(key))
 
 
 class LocalStorage(StorageProvider):
@@ -45,12 +153,79 @@ class LocalStorage(StorageProvider):
         full_path.parent.mkdir(parents=True, exist_ok=True)
         
         with open(full_path, 'wb') as f:
-            content = file.read()
-            f.write(content)
+            shutil.copyfileobj(file, f, UPLOAD_CHUNK_BYTES)
         
         # Return web-accessible path
         return f"/static/uploads/{path}"
     
+    def save_stream(
+        self,
+        chunks: Iterable[bytes],
+        path: str,
+        content_type: Optional[str] = None,
+        cache_control: Optional[str] = None,
+    ) -> str:
+        """Write chunks to a temp file beside the target, then rename it into place"""
+        full_path = self.base_path / path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        fd, tmp_path = tempfile.mkstemp(dir=full_path.parent, prefix=".upload-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        
+        return f"/static/uploads/{path}"
+    
+    def save_addressed(
+        self,
+        chunks: Iterable[bytes],
+        directory: str,
+        ext: str,
+        content_type: Optional[str] = None,
+    ) -> StoredUpload:
+        """
+        Hash while writing a temp file in `directory`, then rename it to its
+        content-addressed name - or drop it if that file already exists.
+        Cache headers are set when serving (CachedStaticFiles).
+        """
+        target_dir = self.base_path / directory
+        target_dir.mkdir(parents=True, exist_ok=True)
+        digest = _Digest()
+        
+        fd, tmp_path = tempfile.mkstemp(dir=target_dir, prefix=".upload-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in _hashed(chunks, digest):
+                    f.write(chunk)
+            path = content_addressed_path(directory, digest.hexdigest(), ext)
+            full_path = self.base_path / path
+            try:
+                os.utime(full_path)  # see touch()
+                deduplicated = True
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                deduplicated = False
+                os.replace(tmp_path, full_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        
+        return StoredUpload(self.reference(path), digest.hexdigest(), digest.size, deduplicated)
+    
+    def reference(self, path: str) -> str:
+        return f"/static/uploads/{path}"
+    
     def get_url(self, path: str) -> str:
         """Get URL for local file"""
         # Remove /static/uploads/ prefix if present
@@ -72,18 +247,110 @@ class LocalStorage(StorageProvider):
         """Check if file exists locally"""
         full_path = self.base_path / path.replace("/static/uploads/", "")
         return full_path.exists()
+    
+    def key(self, reference: str) -> str:
+        return reference.replace("/static/uploads/", "", 1)
+    
+    def list_objects(self, prefix: str) -> Iterator[StoredObject]:
+        """Walk the directory with os.scandir (one stat per file, no sorting)"""
+        pending = [self.base_path / prefix]
+        while pending:
+            try:
+                entries = os.scandir(pending.pop())
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(Path(entry.path))
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat()
+                        yield StoredObject(
+                            path=Path(entry.path).relative_to(self.base_path).as_posix(),
+                            size=stat.st_size,
+                            modified=datetime.utcfromtimestamp(stat.st_mtime),
+                        )
+
+
+class _TTLCache:
+    """Small thread-safe LRU of values that expire after `ttl` seconds."""
+    
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max(max_entries, 1)
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str, min_remaining: float = 0):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] - time.monotonic() <= min_remaining:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+    
+    def put(self, key: str, value, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def pop(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
 
 
 class S3Storage(StorageProvider):
-    """S3-compatible storage for production"""
+    """
+    S3-compatible storage for production.
+    
+    The boto3 client is created on first use, so importing this module (or
+    starting a worker without credentials) never touches boto3. One client,
+    and so one connection pool of S3_MAX_POOL_CONNECTIONS, is shared by all
+    threads.
+    
+    Objects are private: save methods return the object key, and get_url()
+    turns a key into a presigned GET URL. Signed URLs are reused for the
+    first half of their lifetime so pages keep pointing at the same URL and
+    browsers can cache the image. S3_PRESIGNED_URL_SECONDS=0 switches back
+    to public-read objects with plain URLs.
+    """
     
     def __init__(self):
         self.bucket = settings.S3_BUCKET
         self.region = settings.S3_REGION
+        self.presign_seconds = settings.S3_PRESIGNED_URL_SECONDS
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._seen = _TTLCache(settings.S3_EXISTS_CACHE_SIZE, settings.S3_EXISTS_CACHE_SECONDS)
+        self._signed_urls = _TTLCache(settings.S3_EXISTS_CACHE_SIZE, self.presign_seconds)
+    
+    @property
+    def s3_client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._create_client()
+        return self._client
+    
+    def _create_client(self):
+        import boto3
+        from botocore.config import Config
         
-        # Initialize S3 client
         s3_config = {
             'region_name': self.region,
+            'config': Config(
+                signature_version='s3v4',
+                max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                connect_timeout=settings.S3_CONNECT_TIMEOUT_SECONDS,
+                read_timeout=settings.S3_READ_TIMEOUT_SECONDS,
+                retries={'max_attempts': settings.S3_MAX_ATTEMPTS, 'mode': 'standard'},
+                tcp_keepalive=True,
+            ),
         }
         
         # Add credentials if provided
@@ -95,52 +362,185 @@ class S3Storage(StorageProvider):
         if settings.S3_ENDPOINT_URL:
             s3_config['endpoint_url'] = settings.S3_ENDPOINT_URL
         
-        self.s3_client = boto3.client('s3', **s3_config)
+        return boto3.client('s3', **s3_config)
+    
+    def _write_args(self, content_type: Optional[str], cache_control: Optional[str]) -> dict:
+        extra = {}
+        if not self.presign_seconds:
+            extra['ACL'] = 'public-read'
+        if content_type:
+            extra['ContentType'] = content_type
+        if cache_control:
+            extra['CacheControl'] = cache_control
+        return extra
     
     def save(self, file: BinaryIO, path: str) -> str:
-        """Upload file to S3"""
+        """Upload file to S3 (multipart if large); returns the object key"""
+        return self.save_stream(iter(lambda: file.read(UPLOAD_CHUNK_BYTES), b""), path)
+    
+    def save_stream(
+        self,
+        chunks: Iterable[bytes],
+        path: str,
+        content_type: Optional[str] = None,
+        cache_control: Optional[str] = None,
+    ) -> str:
+        """
+        Upload chunks to S3 and return the object key. Anything smaller than
+        one part goes up with a single PutObject; larger streams use a
+        multipart upload, aborted on error.
+        """
+        extra = self._write_args(content_type, cache_control)
+        part_size = max(settings.S3_MULTIPART_CHUNK_BYTES, 5 * 1024 * 1024)  # S3 minimum part size
+        client = self.s3_client
+        
+        buffer = bytearray()
+        upload_id = None
+        parts = []
         try:
-            # Upload file
-            self.s3_client.upload_fileobj(
-                file,
-                self.bucket,
-                path,
-                ExtraArgs={'ACL': 'public-read'}  # Make file publicly accessible
-            )
+            for chunk in chunks:
+                buffer.extend(chunk)
+                while len(buffer) >= part_size:
+                    if upload_id is None:
+                        upload_id = client.create_multipart_upload(
+                            Bucket=self.bucket, Key=path, **extra
+                        )['UploadId']
+                    body = bytes(buffer[:part_size])
+                    del buffer[:part_size]
+                    part_number = len(parts) + 1
+                    etag = client.upload_part(
+                        Bucket=self.bucket, Key=path, UploadId=upload_id,
+                        PartNumber=part_number, Body=body,
+                    )['ETag']
+                    parts.append({'ETag': etag, 'PartNumber': part_number})
             
-            # Return URL
-            return self.get_url(path)
+            if upload_id is None:
+                client.put_object(Bucket=self.bucket, Key=path, Body=bytes(buffer), **extra)
+            else:
+                if buffer:
+                    part_number = len(parts) + 1
+                    etag = client.upload_part(
+                        Bucket=self.bucket, Key=path, UploadId=upload_id,
+                        PartNumber=part_number, Body=bytes(buffer),
+                    )['ETag']
+                    parts.append({'ETag': etag, 'PartNumber': part_number})
+                client.complete_multipart_upload(
+                    Bucket=self.bucket, Key=path, UploadId=upload_id,
+                    MultipartUpload={'Parts': parts},
+                )
+            self._seen.put(path, True)
+            return path
         
-        except Exception as e:
-            logger.error(f"Error uploading to S3: {e}")
+        except BaseException:
+            if upload_id is not None:
+                try:
+                    client.abort_multipart_upload(Bucket=self.bucket, Key=path, UploadId=upload_id)
+                except Exception as e:
+                    logger.error(f"Error aborting multipart upload {path}: {e}")
             raise
     
-    def get_url(self, path: str) -> str:
-        """Get public URL for S3 object"""
+    def touch(self, path: str, content_type: Optional[str] = None) -> bool:
+        """
+        Copy the object onto itself, which resets LastModified (the orphan GC
+        grace period counts from there). One request, like a HEAD.
+        """
+        from botocore.exceptions import ClientError
+        try:
+            self.s3_client.copy_object(
+                Bucket=self.bucket, Key=path,
+                CopySource={'Bucket': self.bucket, 'Key': path},
+                MetadataDirective='REPLACE',
+                **self._write_args(content_type, IMMUTABLE_CACHE_CONTROL),
+            )
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey'):
+                self._seen.pop(path)
+                return False
+            raise
+        self._seen.put(path, True)
+        return True
+    
+    def key(self, path: str) -> str:
+        # Rows saved before keys were stored hold full public URLs
+        public_base = self._public_url('')
+        if path.startswith(public_base):
+            return path[len(public_base):]
+        return path
+    
+    def _public_url(self, key: str) -> str:
         if settings.S3_ENDPOINT_URL:
             # Custom endpoint (R2, MinIO, etc.)
             base_url = settings.S3_ENDPOINT_URL.rstrip('/')
-            return f"{base_url}/{self.bucket}/{path}"
+            return f"{base_url}/{self.bucket}/{key}"
         else:
             # Standard AWS S3 URL
-            return f"https://{self.bucket}.s3.{self.region}.amazonaws.com/{path}"
+            return f"https://{self.bucket}.s3.{self.region}.amazonaws.com/{key}"
+    
+    def get_url(self, path: str) -> str:
+        """Presigned GET URL for an object key (a plain public URL if presigning is off)"""
+        if not self.presign_seconds:
+            return self._public_url(path)
+        url = self._signed_urls.get(path, min_remaining=self.presign_seconds / 2)
+        if url is None:
+            # Signing is local (no request), but reusing the URL keeps it browser-cacheable
+            url = self.s3_client.generate_presigned_url(
+                'get_object', Params={'Bucket': self.bucket, 'Key': path}, ExpiresIn=self.presign_seconds,
+            )
+            self._signed_urls.put(path, url)
+        return url
     
     def delete(self, path: str) -> bool:
         """Delete file from S3"""
+        key = self.key(path)
+        self._seen.pop(key)
+        self._signed_urls.pop(key)
         try:
-            self.s3_client.delete_object(Bucket=self.bucket, Key=path)
+            self.s3_client.delete_object(Bucket=self.bucket, Key=key)
             return True
         except Exception as e:
             logger.error(f"Error deleting from S3 {path}: {e}")
             return False
     
     def exists(self, path: str) -> bool:
-        """Check if file exists in S3"""
-        try:
-            self.s3_client.head_object(Bucket=self.bucket, Key=path)
+        """Check if file exists in S3 (objects seen recently are remembered)"""
+        key = self.key(path)
+        if self._seen.get(key):
             return True
-        except:
+        try:
+            self.s3_client.head_object(Bucket=self.bucket, Key=key)
+        except Exception:
             return False
+        self._seen.put(key, True)
+        return True
+    
+    def list_objects(self, prefix: str) -> Iterator[StoredObject]:
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix.rstrip('/') + '/'):
+            for obj in page.get('Contents', []):
+                yield StoredObject(
+                    path=obj['Key'],
+                    size=obj['Size'],
+                    modified=obj['LastModified'].astimezone(timezone.utc).replace(tzinfo=None),
+                )
+    
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """DeleteObjects, up to 1000 keys per request"""
+        keys = list(keys)
+        deleted = 0
+        for start in range(0, len(keys), 1000):
+            batch = keys[start:start + 1000]
+            for key in batch:
+                self._seen.pop(key)
+                self._signed_urls.pop(key)
+            response = self.s3_client.delete_objects(
+                Bucket=self.bucket,
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True},
+            )
+            errors = response.get('Errors', [])
+            for error in errors:
+                logger.error(f"Error deleting from S3 {error.get('Key')}: {error.get('Message')}")
+            deleted += len(batch) - len(errors)
+        return deleted
 
 
 # Storage factory
@@ -152,8 +552,28 @@ def get_storage() -> StorageProvider:
         return LocalStorage(settings.UPLOADS_PATH)
 
 
+_storage: Optional[StorageProvider] = None
+_storage_lock = threading.Lock()
+
+
+def get_default_storage() -> StorageProvider:
+    """The process-wide provider, created on first use rather than at import"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = get_storage()
+    return _storage
+
+
+def __getattr__(name: str):
+    # `from app.storage import storage` keeps working, lazily
+    if name == "storage":
+        return get_default_storage()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # Convenience functions
-storage = get_storage()
 
 
 def save_upload(file: BinaryIO, path: str) -> str:
@@ -167,7 +587,105 @@ def save_upload(file: BinaryIO, path: str) -> str:
     Returns:
         URL or path where file can be accessed
     """
-    return storage.save(file, path)
+    return get_default_storage().save(file, path)
+
+
+class _Digest:
+    """Running SHA-256 and byte count of a stream."""
+
+    def __init__(self):
+        self._sha = hashlib.sha256()
+        self.size = 0
+
+    def update(self, chunk: bytes) -> None:
+        self._sha.update(chunk)
+        self.size += len(chunk)
+
+    def hexdigest(self) -> str:
+        return self._sha.hexdigest()
+
+
+def _checked_chunks(file: BinaryIO, max_bytes: int, sniff=None) -> Iterator[bytes]:
+    """Yield `file` in chunks, stopping once it exceeds max_bytes."""
+    size = 0
+    while True:
+        chunk = file.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        if sniff is not None and size == 0:
+            sniff(chunk)
+        if size + len(chunk) > max_bytes:
+            raise UploadRejected(f"File too large (max {max_bytes // (1024 * 1024)} MB)")
+        size += len(chunk)
+        yield chunk
+
+
+def save_upload_stream(
+    file: BinaryIO,
+    path: str,
+    max_bytes: int,
+    content_type: Optional[str] = None,
+    sniff=None,
+) -> StoredUpload:
+    """
+    Stream an upload into storage in one pass, enforcing max_bytes and
+    hashing (SHA-256) as chunks go by. Blocking: call from a worker thread.
+    
+    Args:
+        sniff: Optional callable given the first chunk; raise UploadRejected to refuse the file
+    
+    Raises:
+        UploadRejected: If the file breaks a limit (nothing is stored)
+    """
+    digest = _Digest()
+    url = get_default_storage().save_stream(_hashed(_checked_chunks(file, max_bytes, sniff), digest), path, content_type)
+    return StoredUpload(url=url, sha256=digest.hexdigest(), size=digest.size)
+
+
+def save_upload_addressed(
+    file: BinaryIO,
+    directory: str,
+    ext: str,
+    max_bytes: int,
+    content_type: Optional[str] = None,
+    sniff=None,
+) -> StoredUpload:
+    """
+    Like save_upload_stream, but the key is the content's SHA-256
+    ("{directory}/{sha256}{ext}"). Re-uploading identical bytes - from any
+    shop or user - reuses the stored object (StoredUpload.deduplicated).
+    Blocking: call from a worker thread.
+    
+    Because objects are shared, never delete one just because one owner
+    stopped using it; see upload_service for reference checks.
+    
+    Raises:
+        UploadRejected: If the file breaks a limit (nothing is stored)
+    """
+    return get_default_storage().save_addressed(_checked_chunks(file, max_bytes, sniff), directory, ext, content_type)
+
+
+def save_stream(
+    chunks: Iterable[bytes],
+    path: str,
+    content_type: Optional[str] = None,
+    cache_control: Optional[str] = None,
+) -> str:
+    """
+    Save already-validated content given as byte chunks (e.g. generated image variants).
+    
+    Returns:
+        URL or path where file can be accessed
+    """
+    return get_default_storage().save_stream(chunks, path, content_type, cache_control)
+
+
+def save_derived(chunks: Iterable[bytes], path: str, content_type: Optional[str] = None) -> str:
+    """
+    save_stream for content fully determined by a content-addressed original
+    (e.g. "{sha256}.print.png"), so it is cached as immutable too.
+    """
+    return get_default_storage().save_stream(chunks, path, content_type, IMMUTABLE_CACHE_CONTROL)
 
 
 def get_file_url(path: str) -> str:
@@ -184,7 +702,7 @@ def get_file_url(path: str) -> str:
     if path.startswith(('http://', 'https://', '/static/')):
         return path
     
-    return storage.get_url(path)
+    return get_default_storage().get_url(path)
 
 
 def delete_file(path: str) -> bool:
@@ -197,7 +715,7 @@ def delete_file(path: str) -> bool:
     Returns:
         True if deleted successfully
     """
-    return storage.delete(path)
+    return get_default_storage().delete(path)
 
 
 def file_exists(path: str) -> bool:
@@ -210,4 +728,4 @@ def file_exists(path: str) -> bool:
     Returns:
         True if file exists
     """
-    return storage.exists(path)
+    return get_default_storage().exists(path)
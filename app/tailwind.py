@@ -0,0 +1,145 @@
+"""
+Self-hosted Tailwind stylesheet: build, template switch and class check.
+
+scripts/build_css.py runs the Tailwind CLI over app/templates
+(tailwind.config.js) and writes a minified app/static/css/app.css holding
+only the classes the templates use. app/assets.py then fingerprints and
+precompresses it like any other static file.
+
+TAILWIND_MODE picks what templates load ({% include "partials/tailwind.html" %}):
+- "build": the compiled stylesheet; startup fails if it has not been built
+- "cdn":   the in-browser compiler from cdn.tailwindcss.com (template work
+           without a build step; never in production)
+- "auto":  the compiled stylesheet when there is one, the CDN otherwise
+
+missing_classes() compares the classes the templates use with the classes
+the stylesheets define, so a class that Tailwind could not see (built from
+a variable, misspelt, or not a Tailwind utility) fails the build instead of
+silently rendering unstyled.
+"""
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from app import assets
+from app.config import settings
+
+TEMPLATES_DIR = Path("app/templates")
+SOURCE_CSS = Path("app/styles/tailwind.css")
+OUTPUT_NAME = "css/app.css"
+OUTPUT_CSS = assets.STATIC_DIR / OUTPUT_NAME
+# Every class the templates use, one per line; tailwind.config.js scans it
+# as well because Tailwind cannot split classes glued to Jinja tags
+# ("{% if active %}text-white{% endif %}")
+INVENTORY = Path("app/styles/template-classes.txt")
+
+# Classes that are only JavaScript hooks (querySelector targets) and have no styles
+UNSTYLED_CLASSES = {
+    "item-row", "product-id", "product-search", "description-input", "hsn-input",
+    "qty-input", "pkts-input", "unit-input", "rate-input", "tax-input", "total-span",
+    "revoke-token-btn",
+}
+
+_JINJA_TAG = re.compile(r"\{%.*?%\}|\{\{.*?\}\}|\{#.*?#\}", re.S)
+_JINJA_OUTPUT = re.compile(r"\{\{(.*?)\}\}", re.S)
+# A literal that is compared against ("== 'banking'", "'/customers' in ...") is not output
+_COMPARED_LITERAL = re.compile(r"""(?:==|!=)\s*(?:'[^']*'|"[^"]*")|(?:'[^']*'|"[^"]*")\s*(?:==|!=|\bin\b|\bnot\b)""")
+_STRING_LITERAL = re.compile(r"'([^'\\]*)'|\"([^\"\\]*)\"")
+_CLASS_ATTR = re.compile(r"""\bclass\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.S)
+_CLASS_LIST_CALL = re.compile(r"""classList\.(?:add|remove|toggle|contains|replace)\(([^)]*)\)""")
+_CLASS_NAME_ASSIGN = re.compile(r"""\.className\s*[+]?=\s*(?:'([^']*)'|"([^"]*)")""")
+_STYLE_BLOCK = re.compile(r"<style[^>]*>(.*?)</style>", re.S | re.I)
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_CSS_CLASS = re.compile(r"\.((?:\\.|[\w-])+)")
+_CSS_ESCAPE = re.compile(r"\\(.)")
+
+
+def _tokens(text: str) -> Iterable[str]:
+    for token in text.split():
+        # Template-literal and Jinja fragments are not classes we can check
+        if any(c in token for c in "{}$<>`'\"%"):
+            continue
+        yield token
+
+
+def _attribute_classes(value: str) -> Iterable[str]:
+    """Classes in a class attribute, including string literals printed by {{ ... }}."""
+    for expression in _JINJA_OUTPUT.findall(value):
+        for single, double in _STRING_LITERAL.findall(_COMPARED_LITERAL.sub(" ", expression)):
+            yield from _tokens(single or double)
+    yield from _tokens(_JINJA_TAG.sub(" ", value))
+
+
+def classes_in_template(text: str) -> Set[str]:
+    found = set()
+    for double, single in _CLASS_ATTR.findall(text):
+        found.update(_attribute_classes(double or single))
+    for args in _CLASS_LIST_CALL.findall(text):
+        for single, double in _STRING_LITERAL.findall(args):
+            found.update(_tokens(single or double))
+    for single, double in _CLASS_NAME_ASSIGN.findall(text):
+        found.update(_tokens(single or double))
+    return found
+
+
+def template_classes(templates_dir: Path = TEMPLATES_DIR) -> Dict[str, Set[str]]:
+    """{class: template paths using it} for every template under templates_dir."""
+    usage: Dict[str, Set[str]] = {}
+    for path in sorted(templates_dir.rglob("*.html")):
+        for name in classes_in_template(path.read_text("utf-8")):
+            usage.setdefault(name, set()).add(path.relative_to(templates_dir).as_posix())
+    return usage
+
+
+def write_inventory(usage: Dict[str, Set[str]], path: Path = INVENTORY) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(sorted(usage)) + "\n", "utf-8")
+
+
+def stylesheet_classes(css: str) -> Set[str]:
+    """Class names a stylesheet has selectors for (escapes like hover\\:bg-x undone)."""
+    css = _CSS_COMMENT.sub("", css)
+    # Keep selectors only: drop declaration blocks so "0.5rem" is not read as ".5rem"
+    selectors = re.sub(r"\{[^{}]*\}", "{}", css)
+    return {_CSS_ESCAPE.sub(r"\1", name) for name in _CSS_CLASS.findall(selectors)}
+
+
+def defined_classes(compiled_css: Path = OUTPUT_CSS, templates_dir: Path = TEMPLATES_DIR) -> Set[str]:
+    """Classes styled by the compiled stylesheet, the other static CSS and the templates' <style> blocks."""
+    defined = set(UNSTYLED_CLASSES)
+    defined |= stylesheet_classes(compiled_css.read_text("utf-8"))
+    for path in (assets.STATIC_DIR / "css").glob("*.css"):
+        if path != compiled_css:
+            defined |= stylesheet_classes(path.read_text("utf-8"))
+    for path in templates_dir.rglob("*.html"):
+        for block in _STYLE_BLOCK.findall(path.read_text("utf-8")):
+            defined |= stylesheet_classes(block)
+    return defined
+
+
+def missing_classes(compiled_css: Path = OUTPUT_CSS, templates_dir: Path = TEMPLATES_DIR) -> Dict[str, List[str]]:
+    """{class: templates} for classes the templates use that no stylesheet defines."""
+    defined = defined_classes(compiled_css, templates_dir)
+    return {
+        name: sorted(paths)
+        for name, paths in sorted(template_classes(templates_dir).items())
+        if name not in defined
+    }
+
+
+def is_built() -> bool:
+    """Whether the static build (assets manifest) includes the compiled stylesheet."""
+    return assets.in_manifest(OUTPUT_NAME)
+
+
+def stylesheet_url() -> Optional[str]:
+    """
+    {{ tailwind_stylesheet() }}: URL of the compiled stylesheet, or None when
+    templates should load the in-browser compiler instead.
+    """
+    mode = settings.TAILWIND_MODE.lower()
+    if mode == "cdn":
+        return None
+    if mode == "build" or is_built():
+        return assets.static_url(OUTPUT_NAME)
+    return None
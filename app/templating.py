@@ -0,0 +1,23 @@
+"""
+Jinja2 templates shared by the routers, with the app's template filters
+and globals.
+"""
+from typing import Optional
+
+from fastapi.templating import Jinja2Templates
+
+from app.assets import static_url
+from app.storage import get_file_url
+from app.tailwind import stylesheet_url
+
+templates = Jinja2Templates(directory="app/templates")
+
+
+def upload_url(path: Optional[str]) -> Optional[str]:
+    """{{ shop.logo_path | upload_url }}: a stored upload's reference as a URL the browser can load."""
+    return get_file_url(path) if path else path
+
+
+templates.env.filters["upload_url"] = upload_url
+templates.env.globals["static_url"] = static_url
+templates.env.globals["tailwind_stylesheet"] = stylesheet_url
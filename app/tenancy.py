@@ -0,0 +1,211 @@
+"""
+Database per tenant (TENANCY_MODE=database): each shop's data in its own
+SQLite file or Postgres schema.
+
+Users, shops, API tokens and the other shared tables stay in DATABASE_URL
+(the directory). The tables in TENANT_TABLES, plus search_documents, live
+in the shop's database:
+
+- SQLite:   TENANT_DB_DIR/shop_<id>.db
+- Postgres: schema shop_<id> on the DATABASE_URL server (search_path
+            "shop_<id>, public", so foreign keys to shops/users resolve)
+
+get_current_user binds the request's session to the user's shop
+(bind_tenant), after which TenantSession routes shop-data queries there.
+Engines are created on first use, with their tables, and kept in an LRU
+cache of TENANT_ENGINE_CACHE_SIZE; evicted engines are disposed.
+
+Code that runs outside a request uses session_for(shop_id), or
+tenant_sessions() to visit every shop. scripts/split_tenants.py moves an
+existing shared database into per-shop databases.
+
+Not per tenant yet: fiscal-year archives (archive_service), the read
+replica (get_read_db uses the tenant session) and migrations (tenant
+tables are created from the models; Alembic migrates DATABASE_URL only).
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import Base, SessionLocal, TenantSession, create_db_engine, engine, is_sqlite
+
+logger = logging.getLogger(__name__)
+
+# Tables holding one shop's data (everything keyed by shop_id, and their children)
+TENANT_TABLES = frozenset({
+    "customers",
+    "products",
+    "invoices",
+    "invoice_items",
+    "payments",
+    "payment_allocations",
+    "bank_details",
+    "branches",
+    "archived_invoice_totals",
+    "audit_logs",
+    "price_revision_items",
+})
+
+
+def enabled() -> bool:
+    return settings.TENANCY_MODE.lower() == "database"
+
+
+def setup() -> None:
+    """Route shop-data tables per tenant in every SessionLocal session (startup)."""
+    if enabled():
+        SessionLocal.configure(tenant_tables=TENANT_TABLES)
+
+
+def tenant_name(shop_id: int) -> str:
+    return f"shop_{int(shop_id)}"
+
+
+def tenant_path(shop_id: int) -> str:
+    """SQLite file of a shop's database."""
+    return os.path.join(settings.TENANT_DB_DIR, f"{tenant_name(shop_id)}.db")
+
+
+def tenant_tables() -> List:
+    return [table for table in Base.metadata.sorted_tables if table.name in TENANT_TABLES]
+
+
+# ========== ENGINES ==========
+
+def _create_tenant_engine(shop_id: int) -> Engine:
+    from app import write_queue
+    from app.services.search_service import ensure_search_schema
+
+    directory_url = engine.url
+    if is_sqlite(str(directory_url)):
+        os.makedirs(settings.TENANT_DB_DIR, exist_ok=True)
+        tenant_engine = create_db_engine(
+            f"sqlite:///{tenant_path(shop_id)}",
+            pool_size=settings.TENANT_POOL_SIZE, max_overflow=settings.TENANT_MAX_OVERFLOW,
+        )
+        if settings.DB_SQLITE_WRITE_QUEUE:
+            write_queue.install(tenant_engine, write_queue.WriterLock(write_queue.lock_path(tenant_engine)))
+    else:
+        schema = tenant_name(shop_id)
+        with engine.begin() as conn:
+            conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+        tenant_engine = create_db_engine(
+            directory_url.render_as_string(hide_password=False),
+            pool_size=settings.TENANT_POOL_SIZE, max_overflow=settings.TENANT_MAX_OVERFLOW,
+            connect_args={"options": f"-csearch_path={schema},public"},
+        )
+
+    Base.metadata.create_all(bind=tenant_engine, tables=tenant_tables())
+    ensure_search_schema(tenant_engine)
+    return tenant_engine
+
+
+class TenantEngines:
+    """LRU cache of per-shop engines; the least recently used is disposed past `capacity`."""
+
+    def __init__(self, capacity: int):
+        self.capacity = max(capacity, 1)
+        self._engines: "OrderedDict[int, Engine]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._creating = {}
+
+    def get(self, shop_id: int) -> Engine:
+        with self._lock:
+            tenant_engine = self._engines.get(shop_id)
+            if tenant_engine is not None:
+                self._engines.move_to_end(shop_id)
+                return tenant_engine
+            creating = self._creating.setdefault(shop_id, threading.Lock())
+        # One thread creates (and migrates) a tenant; others for the same shop wait
+        with creating:
+            with self._lock:
+                tenant_engine = self._engines.get(shop_id)
+            if tenant_engine is None:
+                tenant_engine = _create_tenant_engine(shop_id)
+                self._add(shop_id, tenant_engine)
+        return tenant_engine
+
+    def _add(self, shop_id: int, tenant_engine: Engine) -> None:
+        evicted = []
+        with self._lock:
+            self._engines[shop_id] = tenant_engine
+            self._creating.pop(shop_id, None)
+            while len(self._engines) > self.capacity:
+                evicted.append(self._engines.popitem(last=False))
+        for old_shop_id, old_engine in evicted:
+            # Checked-out connections finish their request and are closed on return
+            old_engine.dispose()
+            logger.info(f"Closed database of shop {old_shop_id} (tenant engine cache full)")
+
+    def clear(self) -> None:
+        with self._lock:
+            engines, self._engines = list(self._engines.values()), OrderedDict()
+        for tenant_engine in engines:
+            tenant_engine.dispose()
+
+    def __len__(self) -> int:
+        return len(self._engines)
+
+
+engines = TenantEngines(settings.TENANT_ENGINE_CACHE_SIZE)
+
+
+def get_engine(shop_id: int) -> Engine:
+    return engines.get(shop_id)
+
+
+# ========== SESSIONS ==========
+
+def bind_tenant(db: Session, shop_id: Optional[int]) -> None:
+    """Point db's shop-data queries at shop_id's database (no-op in shared mode)."""
+    if enabled() and shop_id is not None and isinstance(db, TenantSession):
+        db.bind_tenant(get_engine(shop_id))
+
+
+def session_for(shop_id: int) -> Session:
+    """A new session for one shop's data (the shared database in shared mode)."""
+    # Explicit tenant_tables: scripts use this without the app's setup()
+    db = SessionLocal(tenant_tables=TENANT_TABLES) if enabled() else SessionLocal()
+    bind_tenant(db, shop_id)
+    return db
+
+
+@contextmanager
+def tenant_session(shop_id: int) -> Iterator[Session]:
+    db = session_for(shop_id)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def shop_ids() -> List[int]:
+    from app import models
+
+    db = SessionLocal()
+    try:
+        return [shop_id for (shop_id,) in db.query(models.Shop.id).order_by(models.Shop.id)]
+    finally:
+        db.close()
+
+
+def tenant_sessions() -> Iterator[Session]:
+    """
+    One session per shop in database mode, one shared session otherwise.
+    Each is closed when the iteration moves on.
+    """
+    if not enabled():
+        with tenant_session(None) as db:
+            yield db
+        return
+    for shop_id in shop_ids():
+        with tenant_session(shop_id) as db:
+            yield db
@@ -0,0 +1,334 @@
+"""
+Single-writer coordination for SQLite deployments.
+
+SQLite allows one writer at a time per database file. With several uvicorn
+workers, concurrent writes used to race for that lock and fail with
+"database is locked" once busy_timeout ran out. With WAL (app/database.py)
+readers never wait, so only writers need to take turns, and here they
+queue for the turn instead of erroring:
+
+- WriterLock: an in-process FIFO queue plus an exclusive lock on
+  "<database>-writer.lock" shared by every worker process.
+- install(): any request session that issues a write statement takes the
+  writer lock first and hands it back when its connection returns to the
+  pool, i.e. right after commit or rollback.
+- WriteQueue: hot write paths (creating invoices) submit a function and
+  a dedicated writer thread runs queued functions back to back, each in a
+  SAVEPOINT, with one COMMIT for the batch (group commit). A function that
+  raises only rolls back its own savepoint.
+
+run_write() / run_write_async() take `fn(db) -> result` and return the
+result once it is committed. On Postgres, or with DB_SQLITE_WRITE_QUEUE
+off, they just run fn in a fresh session and commit. With a database per
+tenant they run fn in a session for `shop_id` (app/tenancy.py); writers
+still take turns through the tenant database's own writer lock, but
+without group commit.
+
+Lock waits block the calling thread, like SQLite's own busy wait did, and
+give up after DB_WRITE_QUEUE_TIMEOUT_SECONDS with WriteQueueTimeout.
+"""
+import asyncio
+import collections
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+import anyio
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import settings
+from app.database import SessionLocal, create_db_engine, engine, is_sqlite, mark_written
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# Statements that need SQLite's write lock
+WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER",
+                  "BEGIN IMMEDIATE", "BEGIN EXCLUSIVE")
+_HOLDS_LOCK = "write_queue.holds_lock"
+
+
+class WriteQueueTimeout(Exception):
+    """Waited longer than DB_WRITE_QUEUE_TIMEOUT_SECONDS for the writer lock."""
+
+
+# ========== WRITER LOCK ==========
+
+class WriterLock:
+    """
+    Exclusive writer turn across threads (FIFO) and processes (file lock).
+
+    Not tied to a thread: a session may take the turn in one threadpool
+    thread and give it back from another when the request finishes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._guard = threading.Lock()
+        self._held = False
+        self._waiters = collections.deque()
+        self._fd = None
+
+    def _acquire_local(self, deadline: float) -> None:
+        with self._guard:
+            if not self._held and not self._waiters:
+                self._held = True
+                return
+            turn = threading.Event()
+            self._waiters.append(turn)
+        if turn.wait(max(0.0, deadline - time.monotonic())):
+            return
+        with self._guard:
+            if turn in self._waiters:
+                self._waiters.remove(turn)
+                raise WriteQueueTimeout(f"Timed out waiting for the database writer lock ({self.path})")
+        # Handed over between the timeout and taking the guard: the turn is ours
+
+    def _release_local(self) -> None:
+        with self._guard:
+            if self._waiters:
+                self._waiters.popleft().set()  # hand over; _held stays True
+            else:
+                self._held = False
+
+    def _try_lock_file(self) -> bool:
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock_file(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+
+    def acquire(self, timeout: float = None) -> None:
+        timeout = settings.DB_WRITE_QUEUE_TIMEOUT_SECONDS if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        self._acquire_local(deadline)
+        try:
+            delay = 0.001
+            while not self._try_lock_file():
+                if time.monotonic() >= deadline:
+                    raise WriteQueueTimeout(f"Timed out waiting for another process's write ({self.path})")
+                time.sleep(delay)
+                delay = min(delay * 2, 0.02)
+        except BaseException:
+            self._release_local()
+            raise
+
+    def release(self) -> None:
+        try:
+            self._unlock_file()
+        finally:
+            self._release_local()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def lock_path(db_engine: Engine) -> str:
+    return f"{os.path.abspath(db_engine.url.database)}-writer.lock"
+
+
+def is_write(statement: str) -> bool:
+    return statement.lstrip().upper().startswith(WRITE_PREFIXES)
+
+
+def install(db_engine: Engine, lock: WriterLock) -> None:
+    """Make every write transaction on db_engine wait for the writer lock."""
+
+    @event.listens_for(db_engine, "before_cursor_execute")
+    def take_writer_turn(conn, cursor, statement, parameters, context, executemany):
+        if not conn.info.get(_HOLDS_LOCK) and is_write(statement):
+            lock.acquire()
+            conn.info[_HOLDS_LOCK] = True
+
+    @event.listens_for(db_engine, "checkin")
+    def end_writer_turn(dbapi_connection, connection_record):
+        # The pool has rolled back anything uncommitted by now
+        if connection_record.info.pop(_HOLDS_LOCK, False):
+            lock.release()
+
+    @event.listens_for(db_engine, "invalidate")
+    def drop_writer_turn(dbapi_connection, connection_record, exception):
+        if connection_record.info.pop(_HOLDS_LOCK, False):
+            lock.release()
+
+
+# ========== GROUP COMMIT QUEUE ==========
+
+class _Job:
+    __slots__ = ("fn", "future")
+
+    def __init__(self, fn: Callable[[Session], Any]):
+        self.fn = fn
+        self.future = Future()
+
+
+class WriteQueue:
+    """One writer thread committing queued write functions in batches."""
+
+    def __init__(self, url: str, lock: WriterLock, max_batch: int = None, window_ms: int = None):
+        self.lock = lock
+        self.max_batch = max_batch or settings.DB_WRITE_QUEUE_MAX_BATCH
+        self.window = (settings.DB_WRITE_QUEUE_WINDOW_MS if window_ms is None else window_ms) / 1000
+        self.engine = create_db_engine(url)
+        self._manage_transactions(self.engine)
+        # Results stay readable after commit (the caller gets detached objects)
+        self.Session = sessionmaker(bind=self.engine, autoflush=False, expire_on_commit=False)
+        self._jobs = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _manage_transactions(db_engine: Engine) -> None:
+        # pysqlite's own BEGIN handling breaks SAVEPOINT; issue BEGIN IMMEDIATE ourselves
+        @event.listens_for(db_engine, "connect")
+        def disable_pysqlite_transactions(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(db_engine, "begin")
+        def begin_immediate(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    def submit(self, fn: Callable[[Session], Any]) -> Future:
+        job = _Job(fn)
+        self._jobs.put(job)
+        return job.future
+
+    def _next_batch(self) -> list:
+        batch = [self._jobs.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                batch.append(self._jobs.get(timeout=remaining) if remaining > 0 else self._jobs.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            try:
+                self._commit_batch(batch)
+            except Exception as e:
+                logger.exception("Write batch failed")
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+
+    def _commit_batch(self, batch: list) -> None:
+        results = []
+        with self.lock:
+            db = self.Session()
+            try:
+                for job in batch:
+                    try:
+                        with db.begin_nested():
+                            results.append((job, job.fn(db), None))
+                    except Exception as e:
+                        results.append((job, None, e))
+                db.commit()
+            finally:
+                db.close()
+        for job, result, error in results:
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(result)
+
+
+# ========== ENTRY POINTS ==========
+
+_lock: Optional[WriterLock] = None
+_queue: Optional[WriteQueue] = None
+_queue_guard = threading.Lock()
+
+
+def enabled() -> bool:
+    """SQLite file database with DB_SQLITE_WRITE_QUEUE on."""
+    database = engine.url.database
+    return settings.DB_SQLITE_WRITE_QUEUE and is_sqlite(str(engine.url)) and bool(database) and database != ":memory:"
+
+
+def setup() -> None:
+    """Serialize the app engine's writers (called once at startup)."""
+    global _lock
+    if _lock is None and enabled():
+        _lock = WriterLock(lock_path(engine))
+        install(engine, _lock)
+
+
+def get_queue() -> WriteQueue:
+    global _queue
+    with _queue_guard:
+        if _queue is None:
+            setup()
+            _queue = WriteQueue(engine.url.render_as_string(hide_password=False), _lock)
+        return _queue
+
+
+def _run_direct(fn: Callable[[Session], Any], shop_id: Optional[int] = None):
+    from app import tenancy
+
+    db = tenancy.session_for(shop_id) if tenancy.enabled() else SessionLocal()
+    try:
+        result = fn(db)
+        db.commit()
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _queued() -> bool:
+    from app import tenancy
+
+    # The queue's writer thread is bound to the shared database
+    return enabled() and not tenancy.enabled()
+
+
+def run_write(fn: Callable[[Session], Any], shop_id: Optional[int] = None):
+    """Run fn(db) through the writer queue and return its result once committed."""
+    if not _queued():
+        return _run_direct(fn, shop_id)
+    result = get_queue().submit(fn).result()
+    mark_written()
+    return result
+
+
+async def run_write_async(fn: Callable[[Session], Any], shop_id: Optional[int] = None):
+    """run_write() for async routes: waits without blocking the event loop."""
+    if not _queued():
+        return await anyio.to_thread.run_sync(_run_direct, fn, shop_id)
+    result = await asyncio.wrap_future(get_queue().submit(fn))
+    mark_written()
+    return result
@@ -30,15 +30,9 @@ for i in range(max_retries):
         time.sleep(retry_interval)
 "
 
-# Run database migrations / create tables
+# Migrate the schema once, before any worker starts (workers only verify it)
 echo "Running database migrations..."
-python -c "
-from app.database import engine, Base
-from app import models  # Import models to register them
-print('Creating database tables...')
-Base.metadata.create_all(bind=engine)
-print('Database tables created successfully!')
-"
+alembic upgrade head
 
 # Start the application
 echo "Starting Gunicorn server..."
@@ -0,0 +1,528 @@
+"""Baseline: the schema create_all used to build on startup
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 06:21:40.117402
+
+Also creates search_documents, which the models do not describe: an FTS5
+virtual table on SQLite (trigram tokenizer where available), a tsvector
+table with GIN indexes on Postgres.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_search_documents() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        if context.is_offline_mode():
+            op.execute(
+                "CREATE VIRTUAL TABLE search_documents USING fts5("
+                "kind UNINDEXED, ref_id UNINDEXED, shop_id UNINDEXED, title, body, tokenize='trigram')"
+            )
+            return
+        for tokenizer in ("trigram", "unicode61"):
+            try:
+                with bind.begin_nested():
+                    op.execute(
+                        "CREATE VIRTUAL TABLE search_documents USING fts5("
+                        "kind UNINDEXED, ref_id UNINDEXED, shop_id UNINDEXED, title, body, "
+                        f"tokenize='{tokenizer}')"
+                    )
+                return
+            except sa.exc.OperationalError:
+                continue  # SQLite older than 3.34 has no trigram tokenizer
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("""
+        CREATE TABLE search_documents (
+            kind VARCHAR(16) NOT NULL,
+            ref_id INTEGER NOT NULL,
+            shop_id INTEGER NOT NULL,
+            title TEXT NOT NULL DEFAULT '',
+            body TEXT NOT NULL DEFAULT '',
+            document tsvector GENERATED ALWAYS AS (
+                to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(body, ''))
+            ) STORED,
+            PRIMARY KEY (kind, ref_id)
+        )
+    """)
+    op.execute("CREATE INDEX ix_search_documents_shop ON search_documents (shop_id)")
+    op.execute("CREATE INDEX ix_search_documents_tsv ON search_documents USING GIN (document)")
+    op.execute(
+        "CREATE INDEX ix_search_documents_trgm ON search_documents "
+        "USING GIN ((title || ' ' || body) gin_trgm_ops)"
+    )
+
+
+def upgrade() -> None:
+    # Databases created by create_all before Alembic already have some or all
+    # of these tables: keep them (0002 brings their columns up to date).
+    # Offline (--sql) output is for empty databases.
+    existing = set() if context.is_offline_mode() else set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'archived_fiscal_years' not in existing:
+        op.create_table('archived_fiscal_years',
+        sa.Column('fiscal_year', sa.Integer(), nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('end_date', sa.Date(), nullable=False),
+        sa.Column('location', sa.String(), nullable=False),
+        sa.Column('invoice_count', sa.Integer(), nullable=True),
+        sa.Column('item_count', sa.Integer(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('fiscal_year')
+        )
+
+    if 'image_variants' not in existing:
+        op.create_table('image_variants',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('source_path', sa.String(), nullable=False),
+        sa.Column('variant', sa.String(length=16), nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('content_type', sa.String(), nullable=True),
+        sa.Column('width', sa.Integer(), nullable=True),
+        sa.Column('height', sa.Integer(), nullable=True),
+        sa.Column('size', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('image_variants', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_image_variants_id'), ['id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_image_variants_source_path'), ['source_path'], unique=False)
+
+    if 'shops' not in existing:
+        op.create_table('shops',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('logo_path', sa.String(), nullable=True),
+        sa.Column('signature_path', sa.String(), nullable=True),
+        sa.Column('gstin', sa.String(length=15), nullable=True),
+        sa.Column('pan', sa.String(length=10), nullable=True),
+        sa.Column('business_email', sa.String(), nullable=True),
+        sa.Column('business_phone', sa.String(), nullable=True),
+        sa.Column('category', sa.String(), nullable=True),
+        sa.Column('address_line1', sa.String(), nullable=True),
+        sa.Column('address_line2', sa.String(), nullable=True),
+        sa.Column('city', sa.String(), nullable=True),
+        sa.Column('state', sa.String(), nullable=True),
+        sa.Column('pincode', sa.String(length=10), nullable=True),
+        sa.Column('place_of_supply', sa.String(), nullable=True),
+        sa.Column('website', sa.String(), nullable=True),
+        sa.Column('invoice_prefix', sa.String(), nullable=True),
+        sa.Column('next_invoice_number', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('shops', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_shops_gstin'), ['gstin'], unique=False)
+            batch_op.create_index(batch_op.f('ix_shops_id'), ['id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_shops_name'), ['name'], unique=False)
+            batch_op.create_index(batch_op.f('ix_shops_pan'), ['pan'], unique=False)
+
+    if 'token_revocations' not in existing:
+        op.create_table('token_revocations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('jti', sa.String(length=64), nullable=True),
+        sa.Column('subject', sa.String(), nullable=True),
+        sa.Column('revoked_before', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('token_revocations', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_token_revocations_expires_at'), ['expires_at'], unique=False)
+            batch_op.create_index(batch_op.f('ix_token_revocations_id'), ['id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_token_revocations_jti'), ['jti'], unique=False)
+            batch_op.create_index(batch_op.f('ix_token_revocations_subject'), ['subject'], unique=False)
+
+    if 'archived_invoice_totals' not in existing:
+        op.create_table('archived_invoice_totals',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('fiscal_year', sa.Integer(), nullable=False),
+        sa.Column('shop_id', sa.Integer(), nullable=False),
+        sa.Column('invoice_count', sa.Integer(), nullable=True),
+        sa.Column('taxable_amount', sa.Float(), nullable=True),
+        sa.Column('cgst_amount', sa.Float(), nullable=True),
+        sa.Column('sgst_amount', sa.Float(), nullable=True),
+        sa.Column('igst_amount', sa.Float(), nullable=True),
+        sa.Column('grand_total', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['shop_id'], ['shops.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('archived_invoice_totals', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_archived_invoice_totals_fiscal_year'), ['fiscal_year'], unique=False)
+            batch_op.create_index(batch_op.f('ix_archived_invoice_totals_id'), ['id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_archived_invoice_totals_shop_id'), ['shop_id'], unique=False)
+
+    if 'bank_details' not in existing:
+        op.create_table('bank_details',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('shop_id', sa.Integer(), nullable=True),
+        sa.Column('account_holder', sa.String(), nullable=False),
+        sa.Column('bank_name', sa.String(), nullable=False),
+        sa.Column('account_number_encrypted', sa.String(), nullable=False),
+        sa.Column('ifsc', sa.String(), nullable=True),
+        sa.Column('branch_name', sa.String(), nullable=True),
+        sa.Column('upi_id', sa.String(), nullable=True),
+        sa.Column('qr_code_path', sa.String(), nullable=True),
+        sa.Column('payment_note', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['shop_id'], ['shops.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('bank_details', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_bank_details_id'), ['id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_bank_details_ifsc'), ['ifsc'], unique=False)
+
+    if 'branches' not in existing:
+        op.create_table('branches',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('shop_id', sa.Integer(), nullable=True),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('address', sa.Text(), nullable=True),
+        sa.Column('city', sa.String(), nullable=True),
+        sa.Column('state', sa.String(), nullable=True),
+        sa.Column('pincode', sa.String(), nullable=True),
+        sa.Column('gstin', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['shop_id'], ['shops.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('branches', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_branches_id'), ['id'], unique=False)
+
+    if 'customers' not in existing:
+        op.create_table('customers',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('shop_id', sa.Integer(), nullable=True),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('contact_person', sa.String(), nullable=True),
+        sa.Column('billing_address', sa.Text(), nullable=True),
+        sa.Column('city', sa.String(), nullable=True),
+        sa.Column('pincode', sa.String(), nullable=True),
+        sa.Column('shipping_address', sa.Text(), nullable=True),
+        sa.Column('gstin', sa.String(), nullable=True),
+        sa.Column('pan', sa.String(), nullable=True),
+        sa.Column('state', sa.String(), nullable=True),
+        sa.Column('state_code', sa.String(), nullable=True),
+        sa.Column('place_of_supply', sa.String(), nullable=True),
+        sa.Column('party_code', sa.String(), nullable=True),
+        sa.Column('price_category', sa.String(), nullable=True),
+        sa.Column('phone', sa.String(), nullable=True),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('opening_balance', sa.Float(), nullable=True),
+        sa.Column('balance', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['shop_id'], ['shops.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('customers', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_customers_id'), ['id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_customers_name'), ['name'], unique=False)
+
+    if 'products' not in existing:
+        op.create_table('products',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('shop_id', sa.Integer(), nullable=True),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('hsn_code', sa.String(), nullable=True),
+        sa.Column('unit', sa.String(), nullable=True),
+        sa.Column('rate', sa.Float(), nullable=True),
+        sa.Column('gst_rate', sa.Float(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['shop_id'], ['shops.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('products', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_products_id'), ['id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_products_name'), ['name'], unique=False)
+
+    if 'users' not in existing:
+        op.create_table('users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('full_name', sa.String(), nullable=True),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('phone', sa.String(), nullable=True),
+        sa.Column('phone_verified', sa.Boolean(), nullable=True),
+        sa.Column('hashed_password', sa.String(), nullable=True),
+        sa.Column('role', sa.Enum('ADMIN', 'STAFF', name='userroleenum'), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('avatar_path', sa.String(), nullable=True),
+        sa.Column('language', sa.String(), nullable=True),
+        sa.Column('timezone', sa.String(), nullable=True),
+        sa.Column('shop_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['shop_id'], ['shops.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('phone')
+        )
+        with op.batch_alter_table('users', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_users_email'), ['email'], unique=True)
+            batch_op.create_index(batch_op.f('ix_users_id'), ['id'], unique=False)
+
+    if 'api_tokens' not in existing:
+        op.create_table('api_tokens',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('token_hash', sa.String(), nullable=False),
+        sa.Column('scopes', sa.JSON(), nullable=True),
+        sa.Column('revoked', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('api_tokens', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_api_tokens_id'), ['id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_api_tokens_token_hash'), ['token_hash'], unique=True)
+
+    if 'audit_logs' not in existing:
+        op.create_table('audit_logs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('action', sa.String(), nullable=False),
+        sa.Column('object_type', sa.String(), nullable=True),
+        sa.Column('object_id', sa.Integer(), nullable=True),
+        sa.Column('details', sa.JSON(), nullable=True),
+        sa.Column('ip_address', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('audit_logs', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_audit_logs_id'), ['id'], unique=False)
+
+    if 'invoices' not in existing:
+        op.create_table('invoices',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('shop_id', sa.Integer(), nullable=True),
+        sa.Column('customer_id', sa.Integer(), nullable=True),
+        sa.Column('invoice_no', sa.String(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=True),
+        sa.Column('place_of_supply', sa.String(), nullable=True),
+        sa.Column('vehicle_no', sa.String(), nullable=True),
+        sa.Column('eway_bill_no', sa.String(), nullable=True),
+        sa.Column('taxable_amount', sa.Float(), nullable=True),
+        sa.Column('cgst_amount', sa.Float(), nullable=True),
+        sa.Column('sgst_amount', sa.Float(), nullable=True),
+        sa.Column('igst_amount', sa.Float(), nullable=True),
+        sa.Column('total_amount', sa.Float(), nullable=True),
+        sa.Column('round_off', sa.Float(), nullable=True),
+        sa.Column('grand_total', sa.Float(), nullable=True),
+        sa.Column('amount_in_words', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('amount_paid', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ),
+        sa.ForeignKeyConstraint(['shop_id'], ['shops.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('invoices', schema=None) as batch_op:
+            batch_op.create_index('ix_invoices_customer_date', ['customer_id', 'date'], unique=False)
+            batch_op.create_index(batch_op.f('ix_invoices_id'), ['id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_invoices_invoice_no'), ['invoice_no'], unique=False)
+            batch_op.create_index('ix_invoices_shop_date_id', ['shop_id', 'date', 'id'], unique=False)
+            batch_op.create_index('ix_invoices_shop_status_date', ['shop_id', 'status', 'date'], unique=False)
+
+    if 'notification_preferences' not in existing:
+        op.create_table('notification_preferences',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('invoice_email', sa.Boolean(), nullable=True),
+        sa.Column('invoice_whatsapp', sa.Boolean(), nullable=True),
+        sa.Column('monthly_gst_summary', sa.Boolean(), nullable=True),
+        sa.Column('payment_alerts', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id')
+        )
+        with op.batch_alter_table('notification_preferences', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_notification_preferences_id'), ['id'], unique=False)
+
+    if 'payments' not in existing:
+        op.create_table('payments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('shop_id', sa.Integer(), nullable=True),
+        sa.Column('customer_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('mode', sa.String(), nullable=True),
+        sa.Column('reference', sa.String(), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('unallocated_amount', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ),
+        sa.ForeignKeyConstraint(['shop_id'], ['shops.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('payments', schema=None) as batch_op:
+            batch_op.create_index('ix_payments_customer_date', ['customer_id', 'date'], unique=False)
+            batch_op.create_index(batch_op.f('ix_payments_id'), ['id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_payments_shop_id'), ['shop_id'], unique=False)
+
+    if 'invoice_items' not in existing:
+        op.create_table('invoice_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('invoice_id', sa.Integer(), nullable=True),
+        sa.Column('product_id', sa.Integer(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('hsn_code', sa.String(), nullable=True),
+        sa.Column('no_of_pkts', sa.Integer(), nullable=True),
+        sa.Column('qty', sa.Float(), nullable=True),
+        sa.Column('unit', sa.String(), nullable=True),
+        sa.Column('rate', sa.Float(), nullable=True),
+        sa.Column('discount_amount', sa.Float(), nullable=True),
+        sa.Column('taxable_value', sa.Float(), nullable=True),
+        sa.Column('tax_rate', sa.Float(), nullable=True),
+        sa.Column('cgst_amount', sa.Float(), nullable=True),
+        sa.Column('sgst_amount', sa.Float(), nullable=True),
+        sa.Column('igst_amount', sa.Float(), nullable=True),
+        sa.Column('total_amount', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['invoice_id'], ['invoices.id'], ),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('invoice_items', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_invoice_items_id'), ['id'], unique=False)
+
+    if 'payment_allocations' not in existing:
+        op.create_table('payment_allocations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('payment_id', sa.Integer(), nullable=False),
+        sa.Column('invoice_id', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['invoice_id'], ['invoices.id'], ),
+        sa.ForeignKeyConstraint(['payment_id'], ['payments.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('payment_allocations', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_payment_allocations_id'), ['id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_payment_allocations_invoice_id'), ['invoice_id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_payment_allocations_payment_id'), ['payment_id'], unique=False)
+
+    if 'price_revision_items' not in existing:
+        op.create_table('price_revision_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('audit_log_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('old_rate', sa.Float(), nullable=True),
+        sa.Column('new_rate', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['audit_log_id'], ['audit_logs.id'], ),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('price_revision_items', schema=None) as batch_op:
+            batch_op.create_index('ix_price_revision_items_audit_product', ['audit_log_id', 'product_id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_price_revision_items_id'), ['id'], unique=False)
+
+    if 'search_documents' not in existing:
+        _create_search_documents()
+
+
+def downgrade() -> None:
+    op.execute('DROP TABLE IF EXISTS search_documents')
+    with op.batch_alter_table('price_revision_items', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_price_revision_items_id'))
+        batch_op.drop_index('ix_price_revision_items_audit_product')
+
+    op.drop_table('price_revision_items')
+    with op.batch_alter_table('payment_allocations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_payment_allocations_payment_id'))
+        batch_op.drop_index(batch_op.f('ix_payment_allocations_invoice_id'))
+        batch_op.drop_index(batch_op.f('ix_payment_allocations_id'))
+
+    op.drop_table('payment_allocations')
+    with op.batch_alter_table('invoice_items', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_invoice_items_id'))
+
+    op.drop_table('invoice_items')
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_payments_shop_id'))
+        batch_op.drop_index(batch_op.f('ix_payments_id'))
+        batch_op.drop_index('ix_payments_customer_date')
+
+    op.drop_table('payments')
+    with op.batch_alter_table('notification_preferences', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_notification_preferences_id'))
+
+    op.drop_table('notification_preferences')
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.drop_index('ix_invoices_shop_status_date')
+        batch_op.drop_index('ix_invoices_shop_date_id')
+        batch_op.drop_index(batch_op.f('ix_invoices_invoice_no'))
+        batch_op.drop_index(batch_op.f('ix_invoices_id'))
+        batch_op.drop_index('ix_invoices_customer_date')
+
+    op.drop_table('invoices')
+    with op.batch_alter_table('audit_logs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_audit_logs_id'))
+
+    op.drop_table('audit_logs')
+    with op.batch_alter_table('api_tokens', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_api_tokens_token_hash'))
+        batch_op.drop_index(batch_op.f('ix_api_tokens_id'))
+
+    op.drop_table('api_tokens')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_id'))
+        batch_op.drop_index(batch_op.f('ix_users_email'))
+
+    op.drop_table('users')
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_products_name'))
+        batch_op.drop_index(batch_op.f('ix_products_id'))
+
+    op.drop_table('products')
+    with op.batch_alter_table('customers', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_customers_name'))
+        batch_op.drop_index(batch_op.f('ix_customers_id'))
+
+    op.drop_table('customers')
+    with op.batch_alter_table('branches', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_branches_id'))
+
+    op.drop_table('branches')
+    with op.batch_alter_table('bank_details', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_bank_details_ifsc'))
+        batch_op.drop_index(batch_op.f('ix_bank_details_id'))
+
+    op.drop_table('bank_details')
+    with op.batch_alter_table('archived_invoice_totals', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_invoice_totals_shop_id'))
+        batch_op.drop_index(batch_op.f('ix_archived_invoice_totals_id'))
+        batch_op.drop_index(batch_op.f('ix_archived_invoice_totals_fiscal_year'))
+
+    op.drop_table('archived_invoice_totals')
+    with op.batch_alter_table('token_revocations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_token_revocations_subject'))
+        batch_op.drop_index(batch_op.f('ix_token_revocations_jti'))
+        batch_op.drop_index(batch_op.f('ix_token_revocations_id'))
+        batch_op.drop_index(batch_op.f('ix_token_revocations_expires_at'))
+
+    op.drop_table('token_revocations')
+    with op.batch_alter_table('shops', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_shops_pan'))
+        batch_op.drop_index(batch_op.f('ix_shops_name'))
+        batch_op.drop_index(batch_op.f('ix_shops_id'))
+        batch_op.drop_index(batch_op.f('ix_shops_gstin'))
+
+    op.drop_table('shops')
+    with op.batch_alter_table('image_variants', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_image_variants_source_path'))
+        batch_op.drop_index(batch_op.f('ix_image_variants_id'))
+
+    op.drop_table('image_variants')
+    op.drop_table('archived_fiscal_years')
@@ -0,0 +1,114 @@
+"""Bring databases created before Alembic up to the baseline
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 06:40:12.318904
+
+create_all never adds columns or indexes to existing tables, so older
+databases were patched by hand with scripts/migrate_settings.py,
+fix_db_schema.py, add_pkts_column.py, fix_db_raw.py and
+add_payment_columns.py (all SQLite-only, all hard-coded to gst_billing.db).
+This revision does what they did, on any backend, for whatever is still
+missing. On a database created by 0001 it changes nothing.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Columns later added to tables that may predate them
+LEGACY_COLUMNS = {
+    'users': [
+        sa.Column('full_name', sa.String(), nullable=True),
+        sa.Column('phone', sa.String(), nullable=True),
+        sa.Column('phone_verified', sa.Boolean(), nullable=True, server_default=sa.false()),
+        sa.Column('avatar_path', sa.String(), nullable=True),
+        sa.Column('language', sa.String(), nullable=True, server_default='English'),
+        sa.Column('timezone', sa.String(), nullable=True, server_default='Asia/Kolkata'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    ],
+    'shops': [
+        sa.Column('pan', sa.String(length=10), nullable=True),
+        sa.Column('business_email', sa.String(), nullable=True),
+        sa.Column('business_phone', sa.String(), nullable=True),
+        sa.Column('category', sa.String(), nullable=True),
+        sa.Column('address_line1', sa.String(), nullable=True),
+        sa.Column('address_line2', sa.String(), nullable=True),
+        sa.Column('place_of_supply', sa.String(), nullable=True),
+        sa.Column('website', sa.String(), nullable=True),
+        sa.Column('invoice_prefix', sa.String(), nullable=True, server_default='WINV-'),
+        sa.Column('next_invoice_number', sa.Integer(), nullable=True, server_default='1'),
+        sa.Column('logo_path', sa.String(), nullable=True),
+        sa.Column('signature_path', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    ],
+    'customers': [
+        sa.Column('contact_person', sa.String(), nullable=True),
+        sa.Column('city', sa.String(), nullable=True),
+        sa.Column('pincode', sa.String(), nullable=True),
+        sa.Column('shipping_address', sa.Text(), nullable=True),
+        sa.Column('pan', sa.String(), nullable=True),
+        sa.Column('place_of_supply', sa.String(), nullable=True),
+        sa.Column('price_category', sa.String(), nullable=True),
+        sa.Column('balance', sa.Float(), nullable=True, server_default='0'),
+    ],
+    'invoices': [
+        sa.Column('amount_paid', sa.Float(), nullable=True, server_default='0'),
+    ],
+    'invoice_items': [
+        sa.Column('no_of_pkts', sa.Integer(), nullable=True, server_default='0'),
+    ],
+}
+
+# (name, table, columns, unique) added to tables that may predate them
+LEGACY_INDEXES = [
+    ('ix_invoices_customer_date', 'invoices', ['customer_id', 'date'], False),
+    ('ix_invoices_shop_status_date', 'invoices', ['shop_id', 'status', 'date'], False),
+    ('ix_invoices_shop_date_id', 'invoices', ['shop_id', 'date', 'id'], False),
+    ('ix_api_tokens_token_hash', 'api_tokens', ['token_hash'], True),
+]
+
+
+def upgrade() -> None:
+    if context.is_offline_mode():
+        return  # needs to inspect the database; offline SQL targets empty ones
+    inspector = sa.inspect(op.get_bind())
+
+    added = set()
+    for table, columns in LEGACY_COLUMNS.items():
+        present = {column['name'] for column in inspector.get_columns(table)}
+        missing = [column for column in columns if column.name not in present]
+        if not missing:
+            continue
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in missing:
+                batch_op.add_column(column)
+                added.add(f'{table}.{column.name}')
+
+    for name, table, columns, unique in LEGACY_INDEXES:
+        if name not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns, unique=unique)
+
+    if 'customers.balance' in added:
+        # Running receivable: opening balance + invoiced - received (payment_service)
+        op.execute("""
+            UPDATE customers SET balance =
+                COALESCE(opening_balance, 0)
+                + (SELECT COALESCE(SUM(i.grand_total), 0) FROM invoices i WHERE i.customer_id = customers.id)
+                - (SELECT COALESCE(SUM(p.amount), 0) FROM payments p WHERE p.customer_id = customers.id)
+        """)
+
+
+def downgrade() -> None:
+    # The baseline already has these columns and indexes; nothing to undo
+    pass
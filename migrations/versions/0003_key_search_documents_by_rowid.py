@@ -0,0 +1,55 @@
+"""Key SQLite search documents by a rowid derived from (kind, ref_id)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 14:05:37.402118
+
+The FTS5 columns kind and ref_id are UNINDEXED, so updating or deleting a
+document by them scanned the whole index. search_service now stores each
+document at rowid ref_id * 4 + kind code and updates and deletes by rowid;
+this copies existing documents to those rowids. Postgres already has a
+(kind, ref_id) primary key and is left alone.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Must match search_service.document_rowid()
+ROWID_SQL = (
+    "CAST(ref_id AS INTEGER) * 4 + "
+    "CASE kind WHEN 'customer' THEN 1 WHEN 'product' THEN 2 WHEN 'invoice' THEN 3 END"
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite" or context.is_offline_mode():
+        return  # offline (--sql) output is for empty databases
+    create_sql = bind.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE name = 'search_documents'"
+    ).scalar()
+    if not create_sql:
+        return
+
+    op.execute(create_sql.replace("search_documents", "search_documents_rekeyed", 1))
+    # In rowid order, so the newest of any duplicate documents wins
+    op.execute(
+        "INSERT OR REPLACE INTO search_documents_rekeyed (rowid, kind, ref_id, shop_id, title, body) "
+        f"SELECT {ROWID_SQL}, kind, ref_id, shop_id, title, body FROM search_documents "
+        "WHERE kind IN ('customer', 'product', 'invoice') ORDER BY rowid"
+    )
+    op.execute("DROP TABLE search_documents")
+    op.execute("ALTER TABLE search_documents_rekeyed RENAME TO search_documents")
+
+
+def downgrade() -> None:
+    # Older code finds documents by kind and ref_id whatever their rowid
+    pass
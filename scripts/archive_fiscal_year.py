@@ -0,0 +1,63 @@
+"""
+Move a closed fiscal year's invoices to cold storage.
+
+    python scripts/archive_fiscal_year.py 2023            # FY 2023-24
+    python scripts/archive_fiscal_year.py 2023 --dry-run  # counts only
+    python scripts/archive_fiscal_year.py --all           # every closed year not yet archived
+
+SQLite: Paid/Cancelled invoices, with their items and payment allocations,
+move to ARCHIVE_PATH/invoices_fy<year>.db.
+Postgres: the year's partition moves to ARCHIVE_TABLESPACE (if set) and is
+recorded as archived; run scripts/partition_invoices.py once beforehand.
+Re-running a year later sweeps invoices that were settled since.
+"""
+import argparse
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from sqlalchemy import func
+
+from app.database import SessionLocal, engine
+from app import models, schema
+from app.services import archive_service
+
+def pending_years():
+    """Closed fiscal years that still have invoices in the live tables."""
+    db = SessionLocal()
+    try:
+        first = db.query(func.min(models.Invoice.date)).scalar()
+        done = {y.fiscal_year for y in archive_service.archived_years(db)}
+    finally:
+        db.close()
+    if first is None:
+        return []
+    latest = archive_service.latest_archivable_year()
+    return [fy for fy in range(archive_service.fiscal_year_of(first), latest + 1) if fy not in done]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fiscal_year", nargs="?", type=int, help="Year the FY starts in, e.g. 2023 for 2023-24")
+    parser.add_argument("--all", action="store_true", help="Archive every closed year not archived yet")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would move")
+    parser.add_argument("--force", action="store_true", help="Allow a year inside the grace period")
+    args = parser.parse_args()
+
+    schema.verify(engine)
+
+    years = pending_years() if args.all else [args.fiscal_year]
+    if not years or years == [None]:
+        parser.error("give a fiscal year or --all")
+
+    for fiscal_year in years:
+        try:
+            result = archive_service.archive_fiscal_year(engine, fiscal_year, dry_run=args.dry_run, force=args.force)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        verb = "Would archive" if args.dry_run else "Archived"
+        print(f"✅ {verb} FY {archive_service.fiscal_year_label(fiscal_year)}: "
+              f"{result['invoices']} invoices, {result['items']} items -> {result['location']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark response compression per route: bytes on the wire and latency.
+
+    python scripts/bench_compression.py                  # default routes, 20 runs each
+    python scripts/bench_compression.py --runs 50 --kbps 1600 /invoices /dashboard
+
+Runs the app in-process (TestClient) against a throwaway SQLite database
+seeded with a shop, customers and invoices. For each route it fetches the
+page uncompressed, with gzip and with brotli, and reports the median server
+time and the body size. "3G saved" estimates the download time saved at
+--kbps (default 1600 kbit/s, a typical 3G link) minus the extra server time.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd())
+
+DEFAULT_ROUTES = [
+    "/",
+    "/auth/login",
+    "/dashboard",
+    "/invoices",
+    "/customers",
+    "/payments",
+    "/reports/gst-summary",
+    "/settings/shop",
+]
+ENCODINGS = ("identity", "gzip", "br")
+
+
+def _seed(client, invoices):
+    from app.database import SessionLocal
+    from app import models
+
+    client.post("/auth/signup", data=dict(
+        full_name="Bench", shop_name="Bench Textiles", email="bench@example.com", mobile="9876543210",
+        password="benchmark1", confirm_password="benchmark1", city="Surat", state="Gujarat",
+    ), follow_redirects=False)
+    r = client.post("/auth/login", data=dict(email="bench@example.com", password="benchmark1"), follow_redirects=False)
+    client.cookies.set("access_token", r.cookies["access_token"])
+
+    for n in range(10):
+        client.post("/customers/new", data=dict(
+            name=f"Customer {n}", billing_address="12 Ring Road", city="Surat", shipping_address="12 Ring Road",
+            state="Gujarat", state_code="24", place_of_supply="Gujarat",
+        ), follow_redirects=False)
+    db = SessionLocal()
+    customer_ids = [c.id for c in db.query(models.Customer.id)]
+    db.close()
+    for n in range(invoices):
+        items = [dict(product_id=None, description=f"Cotton yarn lot {i}", hsn_code="5205", qty=10 + i,
+                      unit="Kg", rate=180 + i, tax_rate=5) for i in range(3)]
+        client.post("/invoices/new", data=dict(
+            customer_id=customer_ids[n % len(customer_ids)], invoice_no=str(n + 1), date="2026-09-01",
+            place_of_supply="Gujarat", items_json=json.dumps(items),
+        ), follow_redirects=False)
+
+
+def _measure(client, route, encoding, runs):
+    times, size, status = [], 0, None
+    for _ in range(runs):
+        start = time.perf_counter()
+        with client.stream("GET", route, headers={"accept-encoding": encoding}) as response:
+            body = b"".join(response.iter_raw())
+        times.append((time.perf_counter() - start) * 1000)
+        size, status = len(body), response.status_code
+    return statistics.median(times), size, status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("routes", nargs="*", default=DEFAULT_ROUTES)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--invoices", type=int, default=50, help="Invoices to seed")
+    parser.add_argument("--kbps", type=float, default=1600, help="Link speed for the transfer-time estimate")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-compression-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+    from fastapi.testclient import TestClient
+    from app import schema
+    from app.database import engine
+    schema.upgrade(engine)
+    from app.main import app
+
+    client = TestClient(app)
+    _seed(client, args.invoices)
+
+    bytes_per_ms = args.kbps * 1000 / 8 / 1000
+    print(f"{'route':<24}{'status':>7}{'raw':>9}{'gzip':>9}{'br':>9}{'saved':>7}"
+          f"{'raw ms':>8}{'gzip ms':>9}{'br ms':>7}{'3G saved':>10}")
+    total_raw = total_br = 0
+    for route in args.routes:
+        results = {enc: _measure(client, route, enc, args.runs) for enc in ENCODINGS}
+        (raw_ms, raw, status), (gz_ms, gz, _), (br_ms, br, _) = (results[e] for e in ENCODINGS)
+        saved = 1 - br / raw if raw else 0
+        net_ms = (raw - br) / bytes_per_ms - (br_ms - raw_ms)
+        total_raw += raw
+        total_br += br
+        print(f"{route:<24}{status:>7}{raw:>9}{gz:>9}{br:>9}{saved:>7.0%}"
+              f"{raw_ms:>8.1f}{gz_ms:>9.1f}{br_ms:>7.1f}{net_ms:>8.0f}ms")
+
+    if total_raw:
+        print(f"\nTotal: {total_raw} -> {total_br} bytes with brotli ({1 - total_br / total_raw:.0%} less)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Concurrency benchmark for the database engine settings (app/database.py).
+
+    python scripts/bench_db_pool.py                       # 8 readers, 2 writers, 10s per run
+    python scripts/bench_db_pool.py --readers 16 --writers 4 --seconds 20
+    python scripts/bench_db_pool.py --url postgresql://...  # tuned engine only
+
+Runs the same mixed workload twice on a scratch SQLite file: once with
+SQLAlchemy/sqlite3 defaults (rollback journal, no PRAGMAs) and once with
+create_db_engine() and the DB_* settings. Readers run the invoice-list
+style query (a shop's recent invoices plus a total); writers insert an
+invoice row and commit. Prints throughput, p95 latency and lock errors.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.database import create_db_engine, is_sqlite, pool_stats, PoolStats
+
+SHOPS = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bench_invoices (
+    id INTEGER PRIMARY KEY,
+    shop_id INTEGER NOT NULL,
+    invoice_date VARCHAR(10) NOT NULL,
+    customer VARCHAR(100) NOT NULL,
+    grand_total NUMERIC(12, 2) NOT NULL
+)
+"""
+READ = text(
+    "SELECT id, invoice_date, customer, grand_total FROM bench_invoices "
+    "WHERE shop_id = :shop ORDER BY id DESC LIMIT 50"
+)
+TOTAL = text("SELECT COUNT(*), SUM(grand_total) FROM bench_invoices WHERE shop_id = :shop")
+WRITE = text(
+    "INSERT INTO bench_invoices (shop_id, invoice_date, customer, grand_total) "
+    "VALUES (:shop, '2026-10-01', :customer, :total)"
+)
+
+
+def _seed(engine, rows):
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS bench_invoices"))
+        conn.execute(text(SCHEMA))
+        conn.execute(text("CREATE INDEX ix_bench_invoices_shop ON bench_invoices (shop_id, id)"))
+        conn.execute(WRITE, [
+            {"shop": n % SHOPS, "customer": f"Customer {n % 500}", "total": (n % 9000) + 100.5}
+            for n in range(rows)
+        ])
+
+
+def _worker(engine, kind, deadline, results):
+    latencies, errors = [], 0
+    while time.perf_counter() < deadline:
+        shop = random.randrange(SHOPS)
+        start = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                if kind == "read":
+                    conn.execute(READ, {"shop": shop}).fetchall()
+                    conn.execute(TOTAL, {"shop": shop}).one()
+                else:
+                    conn.execute(WRITE, {"shop": shop, "customer": "Bench", "total": 1180})
+                    conn.commit()
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    results.append((kind, latencies, errors))
+
+
+def run(label, engine, readers, writers, seconds, rows):
+    _seed(engine, rows)
+    stats = PoolStats()
+    stats.attach(engine)
+    results = []
+    deadline = time.perf_counter() + seconds
+    threads = [threading.Thread(target=_worker, args=(engine, "read", deadline, results)) for _ in range(readers)]
+    threads += [threading.Thread(target=_worker, args=(engine, "write", deadline, results)) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"\n{label}")
+    for kind in ("read", "write"):
+        latencies = [l for k, ls, _ in results if k == kind for l in ls]
+        errors = sum(e for k, _, e in results if k == kind)
+        if not latencies:
+            print(f"  {kind:<6} no successful operations ({errors} errors)")
+            continue
+        p95 = statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) > 1 else latencies[0] * 1000
+        print(f"  {kind:<6}{len(latencies) / seconds:>9.0f}/s   p50 {statistics.median(latencies) * 1000:6.1f}ms"
+              f"   p95 {p95:6.1f}ms   errors {errors}")
+    print(f"  pool   {pool_stats(engine, stats)}")
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rows", type=int, default=50000, help="Rows seeded before each run")
+    parser.add_argument("--url", help="Benchmark this database with the tuned engine only")
+    args = parser.parse_args()
+
+    if args.url and not is_sqlite(args.url):
+        run(f"tuned ({args.url.split('@')[-1]})", create_db_engine(args.url),
+            args.readers, args.writers, args.seconds, args.rows)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="bench-db-")
+    before = f"sqlite:///{os.path.join(workdir, 'defaults.db')}"
+    after = f"sqlite:///{os.path.join(workdir, 'tuned.db')}"
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g}s per run, {args.rows} rows")
+    run("defaults (rollback journal, default pool)",
+        create_engine(before, connect_args={"check_same_thread": False}),
+        args.readers, args.writers, args.seconds, args.rows)
+    run("tuned (create_db_engine: DB_* settings)", create_db_engine(after),
+        args.readers, args.writers, args.seconds, args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Fingerprint and precompress app/static ahead of time.
+
+    python scripts/build_assets.py
+
+Writes app/static/build/ (hashed copies, .gz/.br siblings, manifest.json).
+Run it at deploy time with STATIC_BUILD_ON_STARTUP=false so workers only
+load the manifest; with the default (true) the app does this on startup.
+"""
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from app import assets
+
+
+def main():
+    manifest = assets.build()
+    build_dir = assets.STATIC_DIR / assets.BUILD_DIR
+    compressed = sum(1 for p in build_dir.rglob("*") if p.suffix in (".gz", ".br"))
+    print(f"✅ Fingerprinted {len(manifest)} static files ({compressed} precompressed copies) into {build_dir}")
+    if assets.brotli is None:
+        print("⚠️  brotli not installed: gzip copies only")
+
+
+if __name__ == "__main__":
+    main()
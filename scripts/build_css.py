@@ -0,0 +1,87 @@
+"""
+Compile the Tailwind stylesheet the templates use (replaces cdn.tailwindcss.com).
+
+    python scripts/build_css.py                # compile, check, fingerprint
+    python scripts/build_css.py --check        # check the existing build only
+    TAILWIND_CLI=/usr/local/bin/tailwindcss python scripts/build_css.py
+
+Scans app/templates (tailwind.config.js), writes a purged, minified
+app/static/css/app.css, then fails if a template uses a class that no
+stylesheet defines (see app/tailwind.py). Finally runs the static asset
+build so the stylesheet gets a fingerprinted name and .gz/.br copies.
+
+Uses the standalone Tailwind CLI if it is on PATH (or TAILWIND_CLI),
+otherwise `npx tailwindcss@<TAILWIND_VERSION>`. Run it at deploy time, and
+locally with TAILWIND_MODE=build to check a template change.
+"""
+import argparse
+import shutil
+import subprocess
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from app import assets, tailwind
+
+# Same major version as the CDN compiler the templates were written against
+TAILWIND_VERSION = "3.4.1"
+
+
+def _cli():
+    configured = os.getenv("TAILWIND_CLI") or shutil.which("tailwindcss")
+    if configured:
+        return [configured]
+    if shutil.which("npx"):
+        return ["npx", "--yes", f"tailwindcss@{TAILWIND_VERSION}"]
+    return None
+
+
+def compile_css():
+    cli = _cli()
+    if cli is None:
+        print("❌ Tailwind CLI not found: install the standalone binary "
+              "(https://tailwindcss.com/blog/standalone-cli) or Node.js, or set TAILWIND_CLI")
+        sys.exit(1)
+    tailwind.write_inventory(tailwind.template_classes())
+    command = cli + [
+        "--config", "tailwind.config.js",
+        "--input", str(tailwind.SOURCE_CSS),
+        "--output", str(tailwind.OUTPUT_CSS),
+        "--minify",
+    ]
+    result = subprocess.run(command)
+    if result.returncode != 0:
+        print(f"❌ Tailwind CLI failed ({' '.join(command)})")
+        sys.exit(result.returncode)
+
+
+def check():
+    if not tailwind.OUTPUT_CSS.exists():
+        print(f"❌ {tailwind.OUTPUT_CSS} does not exist: run without --check first")
+        sys.exit(1)
+    missing = tailwind.missing_classes()
+    if missing:
+        print(f"❌ {len(missing)} classes used in templates are missing from the stylesheet:")
+        for name, templates in missing.items():
+            print(f"  {name}  ({', '.join(templates)})")
+        print("   Fix the class, or add JavaScript-only hooks to UNSTYLED_CLASSES in app/tailwind.py")
+        sys.exit(1)
+    print(f"✅ All {len(tailwind.template_classes())} template classes are defined")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="Only check the existing app.css against the templates")
+    args = parser.parse_args()
+
+    if not args.check:
+        compile_css()
+    check()
+    if not args.check:
+        manifest = assets.build()
+        built = assets.STATIC_DIR / manifest[tailwind.OUTPUT_NAME]
+        print(f"✅ {built} ({tailwind.OUTPUT_CSS.stat().st_size / 1024:.1f}KB minified)")
+
+
+if __name__ == "__main__":
+    main()
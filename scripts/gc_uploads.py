@@ -0,0 +1,68 @@
+"""
+Delete uploaded logos, signatures, QR codes and avatars that nothing uses any
+more (replaced by a re-upload, or their shop/user is gone).
+
+    python scripts/gc_uploads.py --dry-run          # report only
+    python scripts/gc_uploads.py                    # delete orphans older than UPLOAD_GC_GRACE_HOURS
+    python scripts/gc_uploads.py --grace-hours 72 --batch-size 200
+
+Works with both storage providers (STORAGE_PROVIDER). Files are compared
+against Shop.logo_path, Shop.signature_path, User.avatar_path and
+BankDetail.qr_code_path, plus the image variants of those files.
+"""
+import argparse
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from datetime import datetime
+
+from app.config import settings
+from app.database import SessionLocal
+from app.services import upload_service
+
+
+def _size(num_bytes):
+    if num_bytes >= 1024 * 1024:
+        return f"{num_bytes / (1024 * 1024):.1f}MB"
+    return f"{num_bytes / 1024:.1f}KB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="List orphans without deleting anything")
+    parser.add_argument("--grace-hours", type=int, default=settings.UPLOAD_GC_GRACE_HOURS,
+                        help="Keep unreferenced files younger than this (default %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=settings.UPLOAD_GC_BATCH_SIZE,
+                        help="Files deleted per batch (default %(default)s)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        report = upload_service.sweep_orphans(
+            db, grace_hours=args.grace_hours, batch_size=args.batch_size, dry_run=args.dry_run,
+        )
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    now = datetime.utcnow()
+    if args.dry_run:
+        for obj in sorted(report["orphans"], key=lambda o: o.modified):
+            age_days = (now - obj.modified).days
+            print(f"  {obj.path}  {_size(obj.size)}  {age_days}d old")
+
+    verb = "Would delete" if args.dry_run else "Deleted"
+    count = len(report["orphans"]) if args.dry_run else report["deleted"]
+    print(f"✅ Scanned {report['scanned']} files: {verb} {count} orphans "
+          f"({_size(report['orphan_bytes'])}), {report['recent']} unreferenced within the "
+          f"{args.grace_hours}h grace period kept")
+    if report["variant_rows"]:
+        print(f"   Removed {report['variant_rows']} image variant records")
+
+
+if __name__ == "__main__":
+    main()
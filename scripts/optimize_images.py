@@ -0,0 +1,78 @@
+"""
+Create print/screen variants for logos, signatures, QR codes and avatars that
+were uploaded before upload-time optimisation existed. Safe to re-run; images
+that already have variants are skipped.
+
+    python scripts/optimize_images.py
+
+Local storage only: originals are read from UPLOADS_PATH.
+"""
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from pathlib import Path
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+from app.services import image_service
+from app.storage import save_stream
+
+UPLOAD_URL_PREFIX = "/static/uploads/"
+
+
+def _originals(db):
+    for (path,) in db.query(models.Shop.logo_path).filter(models.Shop.logo_path.isnot(None)):
+        yield path
+    for (path,) in db.query(models.Shop.signature_path).filter(models.Shop.signature_path.isnot(None)):
+        yield path
+    for (path,) in db.query(models.BankDetail.qr_code_path).filter(models.BankDetail.qr_code_path.isnot(None)):
+        yield path
+    for (path,) in db.query(models.User.avatar_path).filter(models.User.avatar_path.isnot(None)):
+        yield path
+
+
+def optimize():
+    if settings.STORAGE_PROVIDER.lower() != "local":
+        print("❌ Only local storage is supported by this script")
+        return
+
+    db = SessionLocal()
+    done = skipped = 0
+    try:
+        paths = set(_originals(db))
+        existing = {
+            source for (source,) in db.query(models.ImageVariant.source_path).filter(
+                models.ImageVariant.source_path.in_(paths)
+            )
+        } if paths else set()
+
+        for url in sorted(paths - existing):
+            if not url.startswith(UPLOAD_URL_PREFIX) or url.lower().endswith(".svg"):
+                skipped += 1
+                continue
+            relative = url[len(UPLOAD_URL_PREFIX):]
+            source = Path(settings.UPLOADS_PATH) / relative
+            if not source.is_file():
+                print(f"⚠️  Missing {source}")
+                skipped += 1
+                continue
+            with open(source, "rb") as f:
+                records = image_service.store_variants(f, relative, relative.split("/", 1)[0], save_stream)
+            image_service.record_variants(db, url, records)
+            db.commit()
+            done += 1
+            print(f"  {url}: " + ", ".join(f"{r['variant']} {r['size'] // 1024}KB" for r in records))
+
+        print(f"✅ Optimised {done} images ({skipped} skipped, {len(existing)} already done)")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Failed: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    optimize()
@@ -0,0 +1,124 @@
+"""
+Convert the Postgres `invoices` table into a table partitioned by fiscal year
+(RANGE on date, April-March), with a DEFAULT partition as a safety net.
+
+    python scripts/partition_invoices.py
+
+Runs in one transaction. Postgres requires the partition key in the primary
+key, so the key becomes (id, date) and invoices.date becomes NOT NULL. A
+foreign key has to name the whole key, so the ones from invoice_items /
+payment_allocations to invoices are replaced by triggers that enforce the
+same thing: a row can only point at an existing invoice, and an invoice
+that still has items or allocations cannot be deleted. Re-running the
+script on a partitioned table (re)installs the triggers. SQLite databases
+use archive files instead and need no conversion.
+"""
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from datetime import date
+
+from sqlalchemy import text
+
+from app.database import engine
+from app import models
+from app.services import archive_service
+
+# Tables whose invoice_id referenced invoices.id before partitioning
+REFERENCING_TABLES = ("invoice_items", "payment_allocations")
+
+REFERENCE_TRIGGERS = """
+CREATE OR REPLACE FUNCTION invoice_reference_exists() RETURNS trigger AS $$
+BEGIN
+    IF NEW.invoice_id IS NOT NULL THEN
+        -- Same lock a foreign key takes: the invoice can't be deleted until we commit
+        PERFORM 1 FROM invoices WHERE id = NEW.invoice_id FOR KEY SHARE;
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'invoice % referenced by % does not exist', NEW.invoice_id, TG_TABLE_NAME
+                USING ERRCODE = 'foreign_key_violation';
+        END IF;
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION invoice_unreferenced() RETURNS trigger AS $$
+BEGIN
+    -- A date change across fiscal years moves the row (DELETE + INSERT): still there
+    IF EXISTS (SELECT 1 FROM invoices WHERE id = OLD.id) THEN
+        RETURN NULL;
+    END IF;
+    IF EXISTS (SELECT 1 FROM invoice_items WHERE invoice_id = OLD.id)
+       OR EXISTS (SELECT 1 FROM payment_allocations WHERE invoice_id = OLD.id) THEN
+        RAISE EXCEPTION 'invoice % is still referenced by items or payment allocations', OLD.id
+            USING ERRCODE = 'foreign_key_violation';
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+
+def install_reference_triggers(conn):
+    """Enforce the dropped invoice foreign keys with triggers (idempotent)."""
+    conn.execute(text(REFERENCE_TRIGGERS))
+    for table in REFERENCING_TABLES:
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_invoice_fk ON {table}"))
+        conn.execute(text(
+            f"CREATE TRIGGER {table}_invoice_fk BEFORE INSERT OR UPDATE OF invoice_id ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION invoice_reference_exists()"
+        ))
+    conn.execute(text("DROP TRIGGER IF EXISTS invoices_referenced ON invoices"))
+    conn.execute(text(
+        "CREATE TRIGGER invoices_referenced AFTER DELETE OR UPDATE OF id ON invoices "
+        "FOR EACH ROW EXECUTE FUNCTION invoice_unreferenced()"
+    ))
+
+
+def partition():
+    if engine.dialect.name != "postgresql":
+        print("ℹ️  Not a Postgres database; nothing to do.")
+        return
+
+    with engine.begin() as conn:
+        if archive_service.is_partitioned(conn):
+            install_reference_triggers(conn)
+            print("ℹ️  invoices is already partitioned; invoice reference triggers are installed.")
+            return
+
+        first = conn.execute(text("SELECT MIN(date) FROM invoices")).scalar() or date.today()
+        undated = conn.execute(text("SELECT COUNT(*) FROM invoices WHERE date IS NULL")).scalar()
+        if undated:
+            raise SystemExit(f"❌ {undated} invoices have no date; set one before partitioning.")
+
+        for table in REFERENCING_TABLES:
+            for (name,) in conn.execute(text(
+                "SELECT conname FROM pg_constraint WHERE contype = 'f' "
+                "AND conrelid = CAST(:table AS regclass) AND confrelid = 'invoices'::regclass"
+            ), {"table": table}):
+                conn.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"'))
+
+        conn.execute(text("ALTER TABLE invoices RENAME TO invoices_unpartitioned"))
+        conn.execute(text(
+            "CREATE TABLE invoices (LIKE invoices_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (date)"
+        ))
+        conn.execute(text("ALTER TABLE invoices ALTER COLUMN date SET NOT NULL"))
+        conn.execute(text("ALTER TABLE invoices ADD PRIMARY KEY (id, date)"))
+        conn.execute(text("CREATE TABLE invoices_default PARTITION OF invoices DEFAULT"))
+        for fiscal_year in range(archive_service.fiscal_year_of(first), archive_service.fiscal_year_of(date.today()) + 2):
+            archive_service.create_partition(conn, fiscal_year)
+
+        conn.execute(text("INSERT INTO invoices SELECT * FROM invoices_unpartitioned"))
+        conn.execute(text("ALTER SEQUENCE invoices_id_seq OWNED BY invoices.id"))
+        conn.execute(text("DROP TABLE invoices_unpartitioned"))
+
+        # Recreate the model's indexes on the partitioned parent (cascades to partitions)
+        for index in models.Invoice.__table__.indexes:
+            index.create(conn)
+        install_reference_triggers(conn)
+
+    print("✅ invoices is now partitioned by fiscal year")
+
+if __name__ == "__main__":
+    partition()
@@ -0,0 +1,32 @@
+"""
+Rebuild the full-text search index from existing customers, products and invoices.
+Run once after upgrading, or whenever the index looks out of sync:
+
+    python scripts/rebuild_search_index.py
+
+With TENANCY_MODE=database each shop's database gets its own index.
+"""
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from app import tenancy
+from app.database import engine
+from app.services import search_service
+
+def rebuild():
+    search_service.ensure_search_schema(engine)
+    count = 0
+    # One session per shop database (tenant engines create their own index table)
+    for db in tenancy.tenant_sessions():
+        try:
+            count += search_service.rebuild_index(db)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Rebuild failed: {e}")
+            raise
+    print(f"✅ Indexed {count} documents")
+
+if __name__ == "__main__":
+    rebuild()
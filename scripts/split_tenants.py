@@ -0,0 +1,154 @@
+"""
+Split a shared database into one database per shop (TENANCY_MODE=database).
+
+    python scripts/split_tenants.py --dry-run     # rows each shop would get
+    python scripts/split_tenants.py               # copy every shop
+    python scripts/split_tenants.py --shop 7      # copy one shop
+    python scripts/split_tenants.py --purge       # copy, verify, then delete from the shared database
+
+Copies each shop's rows of the tenant tables (app/tenancy.py) from
+DATABASE_URL into the shop's SQLite file or Postgres schema, keeping their
+ids, and rebuilds the shop's search index. Child rows follow their parent
+(invoice items via invoices, allocations via payments, audit logs via the
+shop's users). A tenant table that already has rows is left alone, so the
+script can be re-run after a partial split.
+
+Stop the app first; set TENANCY_MODE=database once every shop is copied.
+"""
+import argparse
+import os
+import sys
+sys.path.append(os.getcwd())
+
+from sqlalchemy import func, select, text
+
+from app import models, tenancy
+from app.database import SessionLocal, engine
+from app.services import search_service
+
+CHUNK_SIZE = 1000
+
+
+def _shop_rows(table, shop_id):
+    """SELECT for one shop's rows of a tenant table."""
+    if "shop_id" in table.c:
+        return table.c.shop_id == shop_id
+    if table.name == "invoice_items":
+        return table.c.invoice_id.in_(select(models.Invoice.id).where(models.Invoice.shop_id == shop_id))
+    if table.name == "payment_allocations":
+        return table.c.payment_id.in_(select(models.Payment.id).where(models.Payment.shop_id == shop_id))
+    if table.name == "audit_logs":
+        return table.c.user_id.in_(select(models.User.id).where(models.User.shop_id == shop_id))
+    if table.name == "price_revision_items":
+        return table.c.product_id.in_(select(models.Product.id).where(models.Product.shop_id == shop_id))
+    raise ValueError(f"No shop filter for tenant table {table.name}")
+
+
+def _count(conn, table, condition=None):
+    query = select(func.count()).select_from(table)
+    if condition is not None:
+        query = query.where(condition)
+    return conn.execute(query).scalar()
+
+
+def _reset_sequence(conn, table):
+    # Postgres: the next id continues after the copied ones
+    if conn.dialect.name == "postgresql" and "id" in table.c:
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table.name}), 0) + 1, false)"
+        ))
+
+
+def split_shop(shop_id, dry_run=False):
+    """Copy one shop's rows; returns {table: rows copied (or to copy)}."""
+    copied = {}
+    with engine.connect() as source:
+        if dry_run:
+            for table in tenancy.tenant_tables():
+                copied[table.name] = _count(source, table, _shop_rows(table, shop_id))
+            return copied
+
+        tenant_engine = tenancy.get_engine(shop_id)
+        with tenant_engine.begin() as target:
+            for table in tenancy.tenant_tables():
+                if _count(target, table):
+                    print(f"   {table.name}: already has rows, skipped")
+                    continue
+                rows = source.execute(select(table).where(_shop_rows(table, shop_id)).order_by(*table.primary_key))
+                copied[table.name] = 0
+                while True:
+                    chunk = rows.fetchmany(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    target.execute(table.insert(), [dict(row._mapping) for row in chunk])
+                    copied[table.name] += len(chunk)
+                _reset_sequence(target, table)
+
+    db = SessionLocal(tenant_tables=tenancy.TENANT_TABLES)
+    try:
+        db.bind_tenant(tenant_engine)
+        search_service.rebuild_index(db, shop_id)
+        db.commit()
+    finally:
+        db.close()
+    return copied
+
+
+def verify_shop(shop_id):
+    """Tables whose row count differs between the shared and the shop's database."""
+    mismatched = []
+    with engine.connect() as source, tenancy.get_engine(shop_id).connect() as target:
+        for table in tenancy.tenant_tables():
+            if _count(source, table, _shop_rows(table, shop_id)) != _count(target, table):
+                mismatched.append(table.name)
+    return mismatched
+
+
+def purge_shop(shop_id):
+    """Delete the shop's rows from the shared database (children first)."""
+    with engine.begin() as conn:
+        for table in reversed(tenancy.tenant_tables()):
+            conn.execute(table.delete().where(_shop_rows(table, shop_id)))
+        conn.execute(text("DELETE FROM search_documents WHERE shop_id = :shop_id"), {"shop_id": shop_id})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shop", type=int, action="append", help="Only this shop id (repeatable)")
+    parser.add_argument("--dry-run", action="store_true", help="Count rows without copying anything")
+    parser.add_argument("--purge", action="store_true",
+                        help="Delete copied rows from the shared database once the counts match")
+    args = parser.parse_args()
+
+    shop_ids = args.shop or tenancy.shop_ids()
+    failed = False
+    for shop_id in shop_ids:
+        try:
+            copied = split_shop(shop_id, dry_run=args.dry_run)
+        except Exception as e:
+            print(f"❌ Shop {shop_id}: {e}")
+            failed = True
+            continue
+
+        summary = ", ".join(f"{name} {count}" for name, count in copied.items() if count)
+        verb = "Would copy" if args.dry_run else "Copied"
+        print(f"✅ Shop {shop_id}: {verb} {summary or 'nothing'}")
+        if args.dry_run or not args.purge:
+            continue
+
+        mismatched = verify_shop(shop_id)
+        if mismatched:
+            print(f"❌ Shop {shop_id}: row counts differ in {', '.join(mismatched)}; shared rows kept")
+            failed = True
+            continue
+        purge_shop(shop_id)
+        print(f"   Removed shop {shop_id}'s rows from the shared database")
+
+    tenancy.engines.clear()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
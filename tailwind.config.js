@@ -0,0 +1,14 @@
+// Tailwind CLI config for scripts/build_css.py (see app/tailwind.py).
+// Matches the defaults of the cdn.tailwindcss.com compiler it replaces.
+/** @type {import('tailwindcss').Config} */
+module.exports = {
+  content: [
+    "./app/templates/**/*.html",
+    // Written by scripts/build_css.py: classes Tailwind cannot split out of Jinja tags
+    "./app/styles/template-classes.txt",
+  ],
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+};
@@ -0,0 +1,94 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.database import Base, get_db
+from app.dependencies import get_current_user
+from app.routers import settings as settings_router
+from app.services import api_token_service
+
+
+def _setup(scopes):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    shop = models.Shop(name="Test Shop")
+    db.add(shop)
+    db.flush()
+    user = models.User(email="owner@example.com", shop_id=shop.id, is_active=True)
+    db.add(user)
+    db.flush()
+    token, raw = api_token_service.issue_token(db, user, "ci", scopes)
+    db.commit()
+
+    app = FastAPI()
+    app.include_router(settings_router.router)
+
+    def override_get_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return app, Session, user.id, raw
+
+
+def _bearer(raw):
+    return {"Authorization": f"Bearer {raw}"}
+
+
+def test_scope_allows():
+    assert api_token_service.scope_allows(["invoices"], "invoices", "POST")
+    assert api_token_service.scope_allows(["invoices:read"], "invoices", "GET")
+    assert not api_token_service.scope_allows(["invoices:read"], "invoices", "POST")
+    assert not api_token_service.scope_allows(["invoices"], "settings", "GET")
+    assert api_token_service.scope_allows(["*"], "settings", "POST")
+
+
+def test_token_without_router_scope_gets_403():
+    app, _, _, raw = _setup(["invoices"])
+    client = TestClient(app)
+    response = client.post("/settings/security/api-tokens", data={"scopes": "*"}, headers=_bearer(raw))
+    assert response.status_code == 403
+    assert "scope" in response.json()["detail"]
+
+
+def test_settings_token_cannot_issue_or_revoke_tokens():
+    app, Session, user_id, raw = _setup(["settings"])
+    client = TestClient(app)
+
+    response = client.post("/settings/security/api-tokens", data={"name": "x", "scopes": "*"}, headers=_bearer(raw))
+    assert response.status_code == 403
+
+    db = Session()
+    token_id = db.query(models.APIToken.id).scalar()
+    assert db.query(models.APIToken).count() == 1
+    db.close()
+
+    response = client.post(f"/settings/security/api-tokens/{token_id}/revoke", headers=_bearer(raw))
+    assert response.status_code == 403
+    assert client.post("/settings/security/logout-all", headers=_bearer(raw)).status_code == 403
+
+
+def test_signed_in_user_can_issue_tokens():
+    app, Session, user_id, _ = _setup(["settings"])
+
+    def signed_in():
+        db = Session()
+        return db.get(models.User, user_id)
+
+    app.dependency_overrides[get_current_user] = signed_in
+    client = TestClient(app)
+    response = client.post("/settings/security/api-tokens", data={"name": "new", "scopes": "invoices:read"})
+    assert response.status_code == 200
+    assert response.json()["scopes"] == ["invoices:read"]
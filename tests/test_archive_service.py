@@ -0,0 +1,100 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+import sqlite3
+from datetime import date
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import models, schema
+from app.config import settings
+from app.services import archive_service, payment_service
+
+
+def _setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ARCHIVE_PATH", str(tmp_path / "archive"))
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    schema.upgrade(engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    shop = models.Shop(name="Test Shop")
+    db.add(shop)
+    db.flush()
+    customer = models.Customer(shop_id=shop.id, name="Party", opening_balance=0.0, balance=0.0)
+    db.add(customer)
+    db.flush()
+    for no, d, amount in [("1", date(2023, 6, 1), 1000.0), ("2", date(2025, 5, 1), 500.0)]:
+        invoice = models.Invoice(shop_id=shop.id, customer_id=customer.id, invoice_no=no, date=d,
+                                 grand_total=amount, amount_paid=0.0, status="Generated")
+        db.add(invoice)
+        payment_service.post_invoice(customer, invoice)
+    db.flush()
+    # Pays invoice 1 in full and 200 of invoice 2
+    settling = payment_service.record_payment(db, shop.id, customer, 1200.0, date(2025, 6, 1))
+    db.commit()
+    return engine, Session, shop.id, customer.id, settling.id
+
+
+def test_allocations_move_with_archived_invoices(tmp_path, monkeypatch):
+    print("Testing archived payment allocations...")
+    engine, Session, shop_id, customer_id, payment_id = _setup(tmp_path, monkeypatch)
+
+    result = archive_service.archive_fiscal_year(engine, 2023, force=True)
+    assert result["invoices"] == 1
+
+    with engine.connect() as conn:
+        dangling = conn.exec_driver_sql(
+            "SELECT COUNT(*) FROM payment_allocations WHERE invoice_id NOT IN (SELECT id FROM invoices)"
+        ).scalar()
+        live = conn.exec_driver_sql("SELECT amount FROM payment_allocations").scalars().all()
+    archived = sqlite3.connect(result["location"]).execute("SELECT amount FROM payment_allocations").fetchall()
+    assert dangling == 0
+    assert live == [200.0], live
+    assert archived == [(1000.0,)], archived
+    print("✅ Allocations archived Passed")
+
+
+def test_delete_payment_refuses_archived_allocations(tmp_path, monkeypatch):
+    print("Testing payment deletion after archiving...")
+    engine, Session, shop_id, customer_id, payment_id = _setup(tmp_path, monkeypatch)
+    archive_service.archive_fiscal_year(engine, 2023, force=True)
+
+    db = Session()
+    with pytest.raises(ValueError):
+        payment_service.delete_payment(db, db.get(models.Payment, payment_id))
+    db.rollback()
+
+    # A payment that only touched live invoices can still be reversed
+    customer = db.get(models.Customer, customer_id)
+    later = payment_service.record_payment(db, shop_id, customer, 100.0, date(2025, 7, 1))
+    db.commit()
+    payment_service.delete_payment(db, later)
+    db.commit()
+    assert customer.balance == 300.0, f"Expected balance 300, got {customer.balance}"
+    db.close()
+    print("✅ Payment deletion Passed")
+
+
+def test_find_archived_invoice_across_many_years(tmp_path, monkeypatch):
+    print("Testing archived invoice lookup across many years...")
+    engine, Session, shop_id, customer_id, payment_id = _setup(tmp_path, monkeypatch)
+    db = Session()
+    years = range(2010, 2022)  # more archive files than SQLite can attach at once
+    for fiscal_year in years:
+        db.add(models.Invoice(shop_id=shop_id, customer_id=customer_id, invoice_no=f"FY{fiscal_year}",
+                              date=date(fiscal_year, 5, 1), grand_total=10.0, amount_paid=10.0, status="Paid"))
+    # The newest invoice id always stays live
+    db.add(models.Invoice(shop_id=shop_id, customer_id=customer_id, invoice_no="3", date=date(2025, 7, 1),
+                          grand_total=10.0, amount_paid=10.0, status="Paid"))
+    db.commit()
+    db.close()
+    locations = {y: archive_service.archive_fiscal_year(engine, y, force=True)["location"] for y in years}
+
+    db = Session()
+    for fiscal_year in (years[0], years[-1]):
+        invoice_id = sqlite3.connect(locations[fiscal_year]).execute("SELECT id FROM invoices").fetchone()[0]
+        invoice = archive_service.find_archived_invoice(db, shop_id, invoice_id)
+        assert invoice is not None and invoice.invoice_no == f"FY{fiscal_year}"
+        assert invoice.customer.name == "Party"
+    db.close()
+    print("✅ Archived invoice lookup Passed")
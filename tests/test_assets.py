@@ -0,0 +1,73 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+import gzip
+import hashlib
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import assets
+from app.config import settings
+from app.middleware.cache import CachedStaticFiles
+
+CSS = b"body { color: #222; }\n" * 40
+
+
+def _static_dir(monkeypatch, tmp_path):
+    static = tmp_path / "static"
+    (static / "css").mkdir(parents=True)
+    (static / "uploads").mkdir()
+    (static / "css" / "app.css").write_bytes(CSS)
+    (static / "uploads" / "logo.png").write_bytes(b"not an asset")
+    monkeypatch.setattr(settings, "UPLOADS_PATH", str(static / "uploads"))
+    monkeypatch.setattr(assets, "_manifest", {})
+    return static
+
+
+def test_build_fingerprints_assets(monkeypatch, tmp_path):
+    print("Testing fingerprinted asset names...")
+    static = _static_dir(monkeypatch, tmp_path)
+
+    manifest = assets.build(static)
+
+    fingerprinted = manifest["css/app.css"]
+    assert fingerprinted == f"build/css/app.{hashlib.sha256(CSS).hexdigest()[:assets.HASH_LENGTH]}.css"
+    assert (static / fingerprinted).read_bytes() == CSS
+    assert gzip.decompress((static / (fingerprinted + ".gz")).read_bytes()) == CSS
+    assert list(manifest) == ["css/app.css"], "uploads are not static assets"
+    assert json.loads((static / "build" / assets.MANIFEST_NAME).read_text()) == manifest
+    assert assets.static_url("css/app.css") == f"/static/{fingerprinted}"
+    assert assets.static_url("/static/img/missing.png") == "/static/img/missing.png"
+
+    # Changed content gets a new name; the old file stays for cached pages
+    (static / "css" / "app.css").write_bytes(CSS + b"a { color: red; }\n")
+    rebuilt = assets.build(static)["css/app.css"]
+    assert rebuilt != fingerprinted and (static / fingerprinted).exists()
+    assert assets.static_url("css/app.css") == f"/static/{rebuilt}"
+    print("✅ Fingerprinting Passed")
+
+
+def test_static_files_serve_precompressed_siblings(monkeypatch, tmp_path):
+    print("Testing precompressed static files...")
+    static = _static_dir(monkeypatch, tmp_path)
+    fingerprinted = assets.build(static)["css/app.css"]
+    app = FastAPI()
+    app.mount("/static", CachedStaticFiles(directory=str(static)), name="static")
+    client = TestClient(app)
+
+    expected = {"br, gzip": "br", "gzip, deflate": "gzip", "br;q=0, gzip": "gzip", "identity": None}
+    for accept, encoding in expected.items():
+        response = client.get(f"/static/{fingerprinted}", headers={"Accept-Encoding": accept})
+        assert response.status_code == 200
+        assert response.headers.get("content-encoding") == encoding, accept
+        assert response.headers["content-type"].startswith("text/css")
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert response.content == CSS  # decoded by the client
+
+    response = client.get("/static/css/app.css", headers={"Accept-Encoding": "gzip"})
+    assert response.headers.get("content-encoding") is None, "unversioned files have no siblings"
+    assert response.headers["cache-control"] == "public, max-age=86400"
+    print("✅ Precompressed static files Passed")
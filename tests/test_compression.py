@@ -0,0 +1,106 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+import gzip
+import zlib
+
+import anyio
+import brotli
+from fastapi import FastAPI
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+from fastapi.testclient import TestClient
+
+from app.middleware.compression import CompressionMiddleware
+
+PAGE = "<tr><td>Ravi Traders</td><td>1,250.00</td></tr>\n" * 200
+
+
+def _client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024, offload_size=4096, flush_size=1024)
+
+    @app.get("/page")
+    def page():
+        return HTMLResponse(PAGE)
+
+    @app.get("/small")
+    def small():
+        return HTMLResponse("<p>ok</p>")
+
+    @app.get("/data")
+    def data():
+        return JSONResponse({"rows": [PAGE]})
+
+    @app.get("/pdf")
+    def pdf():
+        return Response(PAGE.encode(), media_type="application/pdf")
+
+    @app.get("/raw")
+    def raw():
+        return HTMLResponse(PAGE, headers={"Cache-Control": "no-transform"})
+
+    return TestClient(app)
+
+
+def _raw_get(client, path, accept):
+    """GET without letting the client decode the body."""
+    with client.stream("GET", path, headers={"Accept-Encoding": accept}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def test_responses_are_compressed_by_negotiation():
+    print("Testing response compression...")
+    client = _client()
+
+    response, body = _raw_get(client, "/page", "gzip, br")
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(body) < len(PAGE) // 4
+    assert brotli.decompress(body).decode() == PAGE
+
+    response, body = _raw_get(client, "/page", "br;q=0, gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body).decode() == PAGE
+
+    response, body = _raw_get(client, "/data", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert PAGE.strip() in gzip.decompress(body).decode().replace("\\n", "\n")
+
+    for path, accept in (("/page", "identity"), ("/small", "gzip"), ("/pdf", "gzip"), ("/raw", "gzip")):
+        response, body = _raw_get(client, path, accept)
+        assert "content-encoding" not in response.headers, path
+    print("✅ Response compression Passed")
+
+
+def test_streamed_responses_are_compressed_in_flushed_chunks():
+    print("Testing streamed compression...")
+    part = PAGE[:2000].encode()
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/html; charset=utf-8")]})
+        for _ in range(5):
+            await send({"type": "http.response.body", "body": part, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", b"gzip")]}
+    middleware = CompressionMiddleware(app, minimum_size=1024, flush_size=1024)
+    anyio.run(middleware, scope, receive, send)
+
+    headers = dict(sent[0]["headers"])
+    assert headers[b"content-encoding"] == b"gzip" and b"content-length" not in headers
+    chunks = [m["body"] for m in sent[1:]]
+    assert len(chunks) == 6 and sent[-1]["more_body"] is False
+    # Every input chunk is flushed as it arrives, so the browser can render it right away
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    assert [decoder.decompress(c) for c in chunks[:5]] == [part] * 5
+    assert decoder.decompress(chunks[5]) == b"" and decoder.eof
+    print("✅ Streamed compression Passed")
@@ -0,0 +1,68 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+import io
+
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.services import image_service
+
+
+def _image(fmt, size, mode="RGB", color=(200, 30, 30), **save_args):
+    out = io.BytesIO()
+    Image.new(mode, size, color).save(out, fmt, **save_args)
+    out.seek(0)
+    return out
+
+
+def test_variants_are_capped_upright_and_stripped():
+    print("Testing image variants...")
+    exif = Image.Exif()
+    exif[0x0112] = 6  # orientation: rotate 90 degrees clockwise to display
+    exif[0x010F] = "Phone Maker"
+    source = _image("JPEG", (2000, 1000), exif=exif.tobytes())
+
+    variants = image_service.render_variants(source, "logos")
+
+    assert set(variants) == {image_service.VARIANT_PRINT, image_service.VARIANT_SCREEN}
+    printed, screen = variants[image_service.VARIANT_PRINT], variants[image_service.VARIANT_SCREEN]
+    # Rotated upright (portrait), longest edge capped per the logos profile
+    assert (printed["width"], printed["height"]) == (300, 600)
+    assert (screen["width"], screen["height"]) == (160, 320)
+    assert (printed["ext"], printed["content_type"]) == (".png", "image/png")
+    assert (screen["ext"], screen["content_type"]) == (".webp", "image/webp")
+    with Image.open(io.BytesIO(printed["data"])) as img:
+        assert img.format == "PNG" and img.size == (300, 600)
+        assert not img.getexif(), "metadata must not be copied into variants"
+    with Image.open(io.BytesIO(screen["data"])) as img:
+        assert img.format == "WEBP"
+    print("✅ Image variants Passed")
+
+
+def test_small_images_keep_their_size_and_transparency():
+    source = _image("PNG", (64, 48), mode="RGBA", color=(200, 30, 30, 0))
+    variants = image_service.render_variants(source, "avatars")
+    with Image.open(io.BytesIO(variants[image_service.VARIANT_PRINT]["data"])) as img:
+        assert img.size == (64, 48)
+        assert img.convert("RGBA").getpixel((0, 0))[3] == 0
+
+
+def test_unreadable_files_have_no_variants_and_fall_back_to_the_original():
+    assert image_service.render_variants(io.BytesIO(b"<svg/>"), "logos") == {}
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    image_service.record_variants(db, "/static/uploads/logos/a.png", [{
+        "variant": image_service.VARIANT_PRINT, "path": "/static/uploads/logos/a.print.png",
+        "content_type": "image/png", "width": 10, "height": 10, "size": 100,
+    }])
+    db.commit()
+    assert image_service.variant_url(db, "/static/uploads/logos/a.png", "print") == "/static/uploads/logos/a.print.png"
+    assert image_service.variant_url(db, "/static/uploads/logos/a.png", "screen") == "/static/uploads/logos/a.png"
+    assert image_service.variant_url(db, "/static/uploads/logos/b.svg", "print") == "/static/uploads/logos/b.svg"
+    db.close()
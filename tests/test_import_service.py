@@ -0,0 +1,81 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+import csv
+import io
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models, schema
+from app.services import import_service
+
+HEADER = "name,gstin,phone,state,opening_balance\n"
+
+
+def _setup(monkeypatch, tmp_path):
+    monkeypatch.setattr(import_service, "REPORT_DIR", str(tmp_path / "reports"))
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    schema.upgrade(engine)
+    db = sessionmaker(bind=engine)()
+    shop = models.Shop(name="Test Shop")
+    db.add(shop)
+    db.flush()
+    db.add(models.Customer(shop_id=shop.id, name="Ravi Textiles", phone="9876543210", state="Tamil Nadu",
+                           opening_balance=100.0, balance=100.0))
+    db.add(models.Customer(shop_id=shop.id, name="Kumar Mills", gstin="33ABCDE1234F1Z5", state="Tamil Nadu",
+                           opening_balance=0.0, balance=0.0))
+    db.commit()
+    return db, shop.id
+
+
+def _import(db, shop_id, body):
+    return import_service.import_customers(db, shop_id, io.BytesIO((HEADER + body).encode()))
+
+
+def _customers(db):
+    return [(c.name, c.gstin, c.phone, c.balance) for c in db.query(models.Customer).order_by(models.Customer.id)]
+
+
+def test_rows_match_existing_customers_by_gstin_then_phone_then_name(monkeypatch, tmp_path):
+    print("Testing customer import matching...")
+    db, shop_id = _setup(monkeypatch, tmp_path)
+
+    result = _import(db, shop_id, (
+        "Ravi Traders,33AAAAA1111A1Z5,98765 43210,Tamil Nadu,250\n"  # phone: the existing row has no GSTIN
+        "Kumar Mills Pvt,33ABCDE1234F1Z5,9000000001,Tamil Nadu,\n"  # GSTIN wins over phone and name
+        "Kumar Mills,33ZZZZZ9999Z1Z5,,Tamil Nadu,\n"  # same name, other GSTIN: another party
+    ))
+
+    assert (result["created"], result["updated"], result["failed"]) == (1, 2, 0), result
+    assert _customers(db) == [
+        ("Ravi Traders", "33AAAAA1111A1Z5", "9876543210", 250.0),
+        ("Kumar Mills Pvt", "33ABCDE1234F1Z5", "9000000001", 0.0),
+        ("Kumar Mills", "33ZZZZZ9999Z1Z5", None, 0.0),
+    ]
+    print("✅ Import matching Passed")
+
+
+def test_rows_sharing_any_key_in_the_file_are_duplicates(monkeypatch, tmp_path):
+    print("Testing duplicate rows within an import...")
+    db, shop_id = _setup(monkeypatch, tmp_path)
+
+    result = _import(db, shop_id, (
+        "Ravi Traders,33AAAAA1111A1Z5,9876543210,Tamil Nadu,\n"
+        "Ravi T,,9876543210,Tamil Nadu,\n"  # repeats the phone of the row above
+        "ravi traders,,9123456789,Tamil Nadu,\n"  # repeats its name
+    ))
+
+    assert (result["created"], result["updated"], result["failed"]) == (0, 1, 2), result
+    assert _customers(db)[0][:3] == ("Ravi Traders", "33AAAAA1111A1Z5", "9876543210")
+    with open(import_service.report_path(result["report_id"]), encoding="utf-8") as f:
+        report = f.read()
+    assert "duplicate phone of row 2" in report and "duplicate name of row 2" in report, report
+    print("✅ Duplicate rows Passed")
+
+
+def test_malformed_csv_is_a_value_error(monkeypatch, tmp_path):
+    db, shop_id = _setup(monkeypatch, tmp_path)
+    with pytest.raises(ValueError):
+        _import(db, shop_id, "Ravi Traders,,9876543210,Tamil Nadu,\n" + "x" * (csv.field_size_limit() + 1) + "\n")
@@ -0,0 +1,125 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+import asyncio
+import threading
+import time
+
+import bcrypt
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.config import settings
+from app.database import Base, get_db
+from app.routers import auth
+from app.services import password_service
+
+
+def _limit(monkeypatch, per_ip, per_email, window=60):
+    monkeypatch.setattr(password_service, "_ip_attempts", password_service.SlidingWindowLimiter(per_ip, window))
+    monkeypatch.setattr(password_service, "_email_failures", password_service.SlidingWindowLimiter(per_email, window))
+
+
+def test_ip_attempts_are_limited(monkeypatch):
+    _limit(monkeypatch, per_ip=2, per_email=10)
+    password_service.check_login_allowed("10.0.0.1", "a@example.com")
+    password_service.check_login_allowed("10.0.0.1", "b@example.com")
+
+    with pytest.raises(HTTPException) as e:
+        password_service.check_login_allowed("10.0.0.1", "c@example.com")
+    assert e.value.status_code == 429
+    assert int(e.value.headers["Retry-After"]) >= 1
+    password_service.check_login_allowed("10.0.0.2", "c@example.com")  # other clients are unaffected
+
+
+def test_email_failures_are_limited_until_success(monkeypatch):
+    _limit(monkeypatch, per_ip=100, per_email=2)
+    for _ in range(2):
+        password_service.check_login_allowed("10.0.0.1", "Owner@Example.com")
+        password_service.record_login_result("owner@example.com", False)
+
+    # From any IP, however the address is written
+    with pytest.raises(HTTPException) as e:
+        password_service.check_login_allowed("10.0.0.9", " OWNER@example.com ")
+    assert e.value.status_code == 429
+
+    password_service.record_login_result("owner@example.com", True)
+    password_service.check_login_allowed("10.0.0.9", "owner@example.com")
+
+
+def test_window_slides(monkeypatch):
+    _limit(monkeypatch, per_ip=1, per_email=10, window=0.05)
+    password_service.check_login_allowed("10.0.0.1", None)
+    with pytest.raises(HTTPException):
+        password_service.check_login_allowed("10.0.0.1", None)
+    time.sleep(0.06)
+    password_service.check_login_allowed("10.0.0.1", None)
+
+
+def test_hash_queue_limit_returns_503(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 0)  # thread executor, no processes
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_PENDING", 1)
+    release = threading.Event()
+    hashed = bcrypt.hashpw(b"other", bcrypt.gensalt(4)).decode()
+
+    async def scenario():
+        busy = asyncio.ensure_future(password_service._run(release.wait, 5))
+        while password_service._pending < 1:
+            await asyncio.sleep(0.01)
+        try:
+            with pytest.raises(HTTPException) as e:
+                await password_service.verify_password("secret", hashed)
+            assert e.value.status_code == 503
+            assert e.value.headers["Retry-After"] == "5"
+        finally:
+            release.set()
+            await busy
+        # The slot is free again once the queued job finishes
+        assert not await password_service.verify_password("secret", hashed)
+
+    asyncio.run(scenario())
+    assert password_service._pending == 0
+
+
+def test_login_and_signup_query_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 0)
+    _limit(monkeypatch, per_ip=100, per_email=100)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    on_loop = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(statement)
+        except RuntimeError:
+            pass
+
+    def override_get_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app = FastAPI()
+    app.include_router(auth.router)
+    app.dependency_overrides[get_db] = override_get_db
+    client = TestClient(app)
+
+    response = client.post("/auth/signup", data={
+        "full_name": "Owner", "shop_name": "Shop", "email": "owner@example.com", "mobile": "9876543210",
+        "password": "secret", "confirm_password": "secret", "city": "Erode", "state": "Tamil Nadu",
+    }, follow_redirects=False)
+    assert response.status_code == 302, response.text
+    response = client.post("/auth/login", data={"email": "owner@example.com", "password": "secret"},
+                           follow_redirects=False)
+    assert response.status_code == 302, response.text
+    assert on_loop == [], f"queries ran on the event loop: {on_loop}"
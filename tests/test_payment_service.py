@@ -0,0 +1,130 @@
+import sys
+import os
+import tempfile
+sys.path.append(os.getcwd())
+from datetime import date
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import models
+from app.services import payment_service
+
+
+def _setup():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    shop = models.Shop(name="Test Shop")
+    db.add(shop)
+    db.flush()
+    customer = models.Customer(shop_id=shop.id, name="Party", opening_balance=100.0, balance=100.0)
+    db.add(customer)
+    db.flush()
+    invoices = []
+    for no, d, amount in [("1", date(2026, 1, 10), 1000.0), ("2", date(2026, 3, 5), 500.0)]:
+        inv = models.Invoice(shop_id=shop.id, customer_id=customer.id, invoice_no=no, date=d,
+                             grand_total=amount, amount_paid=0.0, status="Generated")
+        db.add(inv)
+        payment_service.post_invoice(customer, inv)
+        invoices.append(inv)
+    db.commit()
+    return db, shop, customer, invoices
+
+
+def test_fifo_partial_payment():
+    print("Testing FIFO allocation...")
+    db, shop, customer, (old, new) = _setup()
+    payment = payment_service.record_payment(db, shop.id, customer, 1200.0, date(2026, 4, 1))
+    db.commit()
+
+    assert old.status == "Paid", f"Expected Paid, got {old.status}"
+    assert new.status == "Partially Paid", f"Expected Partially Paid, got {new.status}"
+    assert new.amount_paid == 200.0, f"Expected 200 paid, got {new.amount_paid}"
+    assert customer.balance == 400.0, f"Expected balance 400, got {customer.balance}"
+    assert payment.unallocated_amount == 0.0
+    print("✅ FIFO allocation Passed")
+
+
+def test_explicit_allocation_and_delete():
+    print("Testing explicit allocation and reversal...")
+    db, shop, customer, (old, new) = _setup()
+    payment = payment_service.record_payment(db, shop.id, customer, 800.0, date(2026, 4, 1),
+                                             allocations={new.id: 500.0})
+    db.commit()
+
+    assert new.status == "Paid" and old.status == "Generated"
+    assert payment.unallocated_amount == 300.0, f"Expected 300 on account, got {payment.unallocated_amount}"
+    assert payment_service.total_outstanding(db, shop.id) == 800.0
+
+    payment_service.delete_payment(db, payment)
+    db.commit()
+    assert new.status == "Generated" and new.amount_paid == 0.0
+    assert customer.balance == 1600.0, f"Expected balance 1600, got {customer.balance}"
+    print("✅ Explicit allocation Passed")
+
+
+def test_concurrent_updates_all_count():
+    print("Testing concurrent balance updates...")
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'concurrent.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        shop = models.Shop(name="Test Shop")
+        db.add(shop)
+        db.flush()
+        customer = models.Customer(shop_id=shop.id, name="Party", opening_balance=100.0, balance=100.0)
+        invoice = models.Invoice(shop_id=shop.id, customer=customer, invoice_no="1", date=date(2026, 1, 10),
+                                 grand_total=1000.0, amount_paid=0.0, status="Generated")
+        db.add_all([customer, invoice])
+        db.commit()
+        shop_id, customer_id = shop.id, customer.id
+        db.close()
+
+        # Two requests load the same customer before either writes
+        first, second = Session(), Session()
+        first_customer = first.get(models.Customer, customer_id)
+        second_customer = second.get(models.Customer, customer_id)
+        assert first_customer.balance == second_customer.balance == 100.0
+
+        payment_service.post_invoice(first_customer, models.Invoice(grand_total=500.0))
+        first.commit()
+        payment_service.record_payment(second, shop_id, second_customer, 300.0, date(2026, 4, 1))
+        second.commit()
+        payment_service.adjust_opening_balance(first_customer, 150.0)
+        first.commit()
+
+        db = Session()
+        customer = db.get(models.Customer, customer_id)
+        assert customer.balance == 350.0, f"Expected balance 350, got {customer.balance}"
+        assert customer.opening_balance == 150.0
+        assert db.query(models.Invoice).one().amount_paid == 300.0
+        for session in (first, second, db):
+            session.close()
+        engine.dispose()
+    print("✅ Concurrent updates Passed")
+
+
+def test_aging_buckets():
+    print("Testing aging buckets...")
+    db, shop, customer, _ = _setup()
+    rows = payment_service.aging_summary(db, shop.id, as_of=date(2026, 3, 20))
+
+    assert len(rows) == 1
+    assert rows[0]["0-30"] == 500.0, f"Expected 500 in 0-30, got {rows[0]['0-30']}"
+    assert rows[0]["61-90"] == 1000.0, f"Expected 1000 in 61-90, got {rows[0]['61-90']}"
+    assert rows[0]["total"] == 1500.0
+    print("✅ Aging buckets Passed")
+
+
+if __name__ == "__main__":
+    try:
+        test_fifo_partial_payment()
+        test_explicit_allocation_and_delete()
+        test_concurrent_updates_all_count()
+        test_aging_buckets()
+        print("\n🎉 All Payment Tests Passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test Failed: {e}")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
@@ -0,0 +1,77 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models, schema
+from app.services import pricing_service
+
+RATES = {"Cotton Yarn 40s": 187.37, "Cotton Yarn 60s": 0.07, "Polyester Thread": 52.5}
+
+
+def _setup(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    schema.upgrade(engine)
+    db = sessionmaker(bind=engine)()
+    shops = [models.Shop(name="Test Shop"), models.Shop(name="Other Shop")]
+    db.add_all(shops)
+    db.flush()
+    for shop in shops:
+        db.add_all([
+            models.Product(shop_id=shop.id, name="Cotton Yarn 40s", hsn_code="520512", rate=187.37, gst_rate=5.0),
+            models.Product(shop_id=shop.id, name="Cotton Yarn 60s", hsn_code="520522", rate=0.07, gst_rate=5.0),
+            models.Product(shop_id=shop.id, name="Polyester Thread", hsn_code="5401", rate=52.5, gst_rate=12.0),
+        ])
+    db.commit()
+    return db, shops[0].id, shops[1].id
+
+
+def _rates(db, shop_id):
+    return {p.name: p.rate for p in db.query(models.Product).filter(models.Product.shop_id == shop_id)}
+
+
+def test_revision_then_undo_restores_exact_rates(tmp_path):
+    print("Testing price revision and undo...")
+    db, shop_id, other_shop_id = _setup(tmp_path)
+
+    preview = pricing_service.preview(db, shop_id, pricing_service.MODE_PERCENT, 12.5, hsn_code="5205")
+    assert preview["count"] == 2
+    assert [(r["old_rate"], r["new_rate"]) for r in preview["rows"]] == [(187.37, 210.79), (0.07, 0.08)]
+
+    audit = pricing_service.apply_revision(db, shop_id, None, pricing_service.MODE_PERCENT, 12.5, hsn_code="5205")
+    db.commit()
+    assert audit.details["count"] == 2
+    assert _rates(db, shop_id) == {"Cotton Yarn 40s": 210.79, "Cotton Yarn 60s": 0.08, "Polyester Thread": 52.5}
+    assert _rates(db, other_shop_id) == RATES
+
+    assert pricing_service.undo_revision(db, shop_id, None, audit.id) == 2
+    db.commit()
+    db.expire_all()
+    assert _rates(db, shop_id) == RATES  # exactly, not recomputed from the revised rates
+    with pytest.raises(ValueError):
+        pricing_service.undo_revision(db, shop_id, None, audit.id)
+    print("✅ Revision undo Passed")
+
+
+def test_undo_skips_rates_changed_since(tmp_path):
+    print("Testing undo after a manual edit...")
+    db, shop_id, other_shop_id = _setup(tmp_path)
+    audit = pricing_service.apply_revision(db, shop_id, None, pricing_service.MODE_ABSOLUTE, -60.0)
+    db.commit()
+    assert _rates(db, shop_id) == {"Cotton Yarn 40s": 127.37, "Cotton Yarn 60s": 0.0, "Polyester Thread": 0.0}
+
+    edited = db.query(models.Product).filter(models.Product.shop_id == shop_id,
+                                             models.Product.name == "Polyester Thread").one()
+    edited.rate = 55.0
+    db.commit()
+
+    with pytest.raises(LookupError):
+        pricing_service.undo_revision(db, other_shop_id, None, audit.id)
+    assert pricing_service.undo_revision(db, shop_id, None, audit.id) == 2
+    db.commit()
+    db.expire_all()
+    assert _rates(db, shop_id) == {**RATES, "Polyester Thread": 55.0}
+    print("✅ Undo after edit Passed")
@@ -0,0 +1,101 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from app import database, models
+from app.database import Base, PRIMARY_READS_COOKIE, RoutingSession, get_read_db, mark_written, reads_own_writes, request_writes
+
+
+def _setup(tmp_path):
+    # Two SQLite files stand in for a primary and its (lagging) replica
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine, name in ((primary, "Primary Shop"), (replica, "Replica Shop")):
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(models.Shop.__table__.insert().values(id=1, name=name))
+    factory = sessionmaker(class_=RoutingSession, primary=primary, replica=replica, autoflush=False)
+    return factory
+
+
+def _request(method="GET", cookie=None):
+    headers = [(b"cookie", cookie.encode())] if cookie else []
+    return Request({"type": "http", "method": method, "path": "/", "headers": headers, "query_string": b""})
+
+
+def test_reads_go_to_replica_and_writes_to_primary(tmp_path):
+    factory = _setup(tmp_path)
+    db = factory()
+    assert db.get(models.Shop, 1).name == "Replica Shop"
+
+    db.add(models.Shop(id=2, name="New Shop"))
+    db.commit()
+    # After its first write the session reads from the primary
+    assert db.query(models.Shop).filter(models.Shop.id == 2).one().name == "New Shop"
+    db.close()
+
+    with factory.kw["primary"].connect() as conn:
+        assert conn.execute(text("SELECT name FROM shops WHERE id = 2")).scalar() == "New Shop"
+    with factory.kw["replica"].connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM shops WHERE id = 2")).scalar() == 0
+
+
+def test_write_statement_switches_to_primary(tmp_path):
+    factory = _setup(tmp_path)
+    db = factory()
+    db.execute(models.Shop.__table__.update().where(models.Shop.id == 1).values(name="Renamed"))
+    assert db.get(models.Shop, 1).name == "Renamed"
+    db.rollback()
+    db.close()
+
+
+def test_primary_only_session(tmp_path):
+    factory = _setup(tmp_path)
+    db = factory(use_replica=False)
+    assert db.get(models.Shop, 1).name == "Primary Shop"
+    db.close()
+
+
+def test_read_your_writes_cookie():
+    assert not reads_own_writes(_request())
+    assert reads_own_writes(_request(cookie=f"{PRIMARY_READS_COOKIE}={int(time.time()) + 10}"))
+    assert not reads_own_writes(_request(cookie=f"{PRIMARY_READS_COOKIE}={int(time.time()) - 1}"))
+    assert not reads_own_writes(_request(cookie=f"{PRIMARY_READS_COOKIE}=junk"))
+
+
+def test_mark_written_records_commit_for_request():
+    writes = {}
+    token = request_writes.set(writes)
+    try:
+        mark_written()
+    finally:
+        request_writes.reset(token)
+    assert "at" in writes
+    mark_written()  # outside a request: no-op
+
+
+def test_get_read_db_uses_primary_for_posts_and_recent_writers(tmp_path, monkeypatch):
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setattr(database, "replica_engine", replica)
+    monkeypatch.setitem(database.ReadSessionLocal.kw, "replica", replica)
+    for request, expected in [
+        (_request("GET"), True),
+        (_request("POST"), False),
+        (_request("GET", f"{PRIMARY_READS_COOKIE}={int(time.time()) + 10}"), False),
+    ]:
+        dependency = get_read_db(request, db=None)
+        db = next(dependency)
+        assert db.use_replica is expected
+        dependency.close()
+
+
+def test_get_read_db_without_replica_yields_request_session(monkeypatch):
+    monkeypatch.setattr(database, "replica_engine", None)
+    session = object()
+    dependency = get_read_db(_request(), db=session)
+    assert next(dependency) is session
@@ -0,0 +1,120 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+import time
+from datetime import datetime, timedelta
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.config import settings
+from app.database import Base, get_db
+from app.dependencies import get_current_user
+from app.services import auth_service, principal_service, revocation_service
+
+EMAIL = "owner@example.com"
+
+
+def _setup(monkeypatch, refresh_seconds=0):
+    monkeypatch.setattr(settings, "REVOCATION_REFRESH_SECONDS", refresh_seconds)
+    monkeypatch.setattr(settings, "AUTH_CACHE_TTL_SECONDS", 300)
+    revocation_service.reset()
+    principal_service.clear()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    shop = models.Shop(name="Test Shop")
+    db.add(shop)
+    db.flush()
+    db.add(models.User(email=EMAIL, shop_id=shop.id, is_active=True))
+    db.commit()
+    db.close()
+    return Session
+
+
+def _revoked_elsewhere(Session, **values):
+    """A revocation committed by another worker (this process's filter doesn't know it yet)."""
+    db = Session()
+    db.add(models.TokenRevocation(expires_at=datetime.utcnow() + timedelta(hours=1), **values))
+    db.commit()
+    db.close()
+
+
+def _claims(token):
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+
+def test_bloom_filter_membership():
+    bloom = revocation_service.BloomFilter(1000, 0.01)
+    for i in range(1000):
+        bloom.add(f"jti:{i}")
+
+    assert all(f"jti:{i}" in bloom for i in range(1000))
+    false_positives = sum(f"jti:other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300, f"{false_positives} false positives at a 1% target"
+
+
+def test_incremental_refresh_sees_other_workers(monkeypatch):
+    Session = _setup(monkeypatch, refresh_seconds=3600)
+    db = Session()
+    claims = _claims(auth_service.create_access_token({"sub": EMAIL}))
+    assert not revocation_service.is_revoked(db, claims)  # builds the filter
+
+    _revoked_elsewhere(Session, jti=claims["jti"])
+    assert not revocation_service.is_revoked(db, claims), "filter refreshed before REVOCATION_REFRESH_SECONDS"
+
+    monkeypatch.setattr(settings, "REVOCATION_REFRESH_SECONDS", 0)
+    assert revocation_service.is_revoked(db, claims)
+    db.close()
+
+
+def test_revoke_subject_only_hits_older_tokens(monkeypatch):
+    Session = _setup(monkeypatch)
+    db = Session()
+    before = _claims(auth_service.create_access_token({"sub": EMAIL}))
+    time.sleep(0.01)
+    revocation_service.revoke_subject(db, EMAIL)
+    db.commit()
+    time.sleep(0.01)
+    after = _claims(auth_service.create_access_token({"sub": EMAIL}))
+
+    assert revocation_service.is_revoked(db, before)
+    assert not revocation_service.is_revoked(db, after)
+    assert not revocation_service.is_revoked(db, _claims(auth_service.create_access_token({"sub": "other@example.com"})))
+    db.close()
+
+
+def test_cached_principal_is_still_checked(monkeypatch):
+    Session = _setup(monkeypatch)
+    app = FastAPI()
+
+    @app.get("/me")
+    def me(user: models.User = Depends(get_current_user)):
+        return {"email": user.email}
+
+    def override_get_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    client = TestClient(app)
+    token = auth_service.create_access_token({"sub": EMAIL})
+    client.cookies.set("access_token", token)
+
+    assert client.get("/me").status_code == 200
+    assert principal_service.get(token) is not None  # the next request is a cache hit
+
+    _revoked_elsewhere(Session, jti=_claims(token)["jti"])
+    response = client.get("/me")
+    assert response.status_code == 401, response.text
+    assert principal_service.get(token) is None
@@ -0,0 +1,150 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+import pytest
+
+moto = pytest.importorskip("moto")
+
+from app import storage as storage_module
+from app.storage import IMMUTABLE_CACHE_CONTROL, S3Storage, UploadRejected, _checked_chunks
+
+BUCKET = "winder-test"
+MB = 1024 * 1024
+
+
+def _setup():
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    storage = S3Storage()
+    storage.bucket = BUCKET
+    storage.region = "us-east-1"
+    storage.s3_client.create_bucket(Bucket=BUCKET)
+    return storage, storage.s3_client
+
+
+def _count_calls(client, operation):
+    calls = []
+    client.meta.events.register(f"before-call.s3.{operation}", lambda **kw: calls.append(1))
+    return calls
+
+
+def test_client_is_created_lazily():
+    print("Testing lazy client...")
+    storage = S3Storage()
+    assert storage._client is None, "S3Storage() must not build a boto3 client"
+    with moto.mock_aws():
+        _, client = _setup()
+        assert client.meta.config.max_pool_connections == storage_module.settings.S3_MAX_POOL_CONNECTIONS
+    print("✅ Lazy client Passed")
+
+
+@moto.mock_aws
+def test_small_upload_is_private_and_presigned():
+    print("Testing private upload with presigned URLs...")
+    storage, client = _setup()
+    key = storage.save_stream([b"hello ", b"world"], "logos/a.png", "image/png")
+
+    assert key == "logos/a.png", f"Expected the object key back, got {key}"
+    head = client.head_object(Bucket=BUCKET, Key=key)
+    assert head["ContentType"] == "image/png"
+    grants = client.get_object_acl(Bucket=BUCKET, Key=key)["Grants"]
+    assert not any(g["Grantee"].get("URI", "").endswith("AllUsers") for g in grants), "Object must not be public"
+
+    url = storage.get_url(key)
+    assert "X-Amz-Signature=" in url and "X-Amz-Expires=3600" in url
+    assert storage.get_url(key) == url, "Signed URL should be reused while fresh"
+
+    storage.presign_seconds = 0
+    assert storage.get_url(key) == f"https://{BUCKET}.s3.us-east-1.amazonaws.com/{key}"
+    print("✅ Presigned URLs Passed")
+
+
+@moto.mock_aws
+def test_large_stream_uses_multipart():
+    print("Testing multipart upload...")
+    storage, client = _setup()
+    part = storage_module.settings.S3_MULTIPART_CHUNK_BYTES
+    chunks = [b"x" * MB] * (2 * part // MB + 1)
+    creates = _count_calls(client, "CreateMultipartUpload")
+
+    storage.save_stream(chunks, "exports/big.bin")
+
+    head = client.head_object(Bucket=BUCKET, Key="exports/big.bin")
+    assert head["ContentLength"] == 2 * part + MB
+    assert head["ETag"].strip('"').endswith("-3"), f"Expected 3 parts, got ETag {head['ETag']}"
+    assert len(creates) == 1
+    print("✅ Multipart upload Passed")
+
+
+@moto.mock_aws
+def test_failed_stream_aborts_multipart():
+    print("Testing abort on a rejected stream...")
+    storage, client = _setup()
+    part = storage_module.settings.S3_MULTIPART_CHUNK_BYTES
+
+    class Big:
+        def __init__(self):
+            self.left = part + 2 * MB
+
+        def read(self, n):
+            n = min(n, self.left)
+            self.left -= n
+            return b"x" * n
+
+    with pytest.raises(UploadRejected):
+        storage.save_stream(_checked_chunks(Big(), part + MB), "logos/too-big.png")
+
+    assert client.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+    assert not storage.exists("logos/too-big.png")
+    print("✅ Abort Passed")
+
+
+@moto.mock_aws
+def test_content_addressed_dedupe():
+    print("Testing content-addressed dedupe...")
+    storage, client = _setup()
+    puts = _count_calls(client, "PutObject")
+
+    first = storage.save_addressed([b"same", b" bytes"], "logos", ".PNG", "image/png")
+    second = storage.save_addressed([b"same bytes"], "logos", ".png", "image/png")
+
+    assert first.url == second.url == f"logos/{first.sha256}.png"
+    assert not first.deduplicated and second.deduplicated
+    assert len(puts) == 1, f"Expected one upload, got {len(puts)}"
+    assert client.head_object(Bucket=BUCKET, Key=first.url)["CacheControl"] == IMMUTABLE_CACHE_CONTROL
+    print("✅ Dedupe Passed")
+
+
+@moto.mock_aws
+def test_exists_cache():
+    print("Testing existence cache...")
+    storage, client = _setup()
+    client.put_object(Bucket=BUCKET, Key="qr_codes/q.png", Body=b"q")
+    heads = _count_calls(client, "HeadObject")
+
+    assert storage.exists("qr_codes/q.png") and storage.exists("qr_codes/q.png")
+    assert len(heads) == 1, f"Expected one HEAD, got {len(heads)}"
+    assert not storage.exists("qr_codes/missing.png")
+
+    assert storage.delete("qr_codes/q.png")
+    assert not storage.exists("qr_codes/q.png"), "delete must evict the cached entry"
+
+    legacy = f"https://{BUCKET}.s3.us-east-1.amazonaws.com/qr_codes/old.png"
+    client.put_object(Bucket=BUCKET, Key="qr_codes/old.png", Body=b"o")
+    assert storage.exists(legacy), "Full public URLs from older rows resolve to their key"
+    print("✅ Existence cache Passed")
+
+
+if __name__ == "__main__":
+    try:
+        test_client_is_created_lazily()
+        test_small_upload_is_private_and_presigned()
+        test_large_stream_uses_multipart()
+        test_failed_stream_aborts_multipart()
+        test_content_addressed_dedupe()
+        test_exists_cache()
+        print("\n🎉 All S3 Storage Tests Passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test Failed: {e}")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
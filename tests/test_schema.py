@@ -0,0 +1,43 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine, inspect
+
+from app import schema
+from app.database import Base
+
+
+def test_migrations_match_the_models(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    schema.upgrade(engine)
+    schema.verify(engine)
+    assert "search_documents" in inspect(engine).get_table_names()
+
+    # A model change without a migration shows up here
+    with engine.connect() as conn:
+        context = MigrationContext.configure(conn, opts={"compare_type": True, "include_object": schema.include_object})
+        assert compare_metadata(context, Base.metadata) == []
+
+
+def test_verify_rejects_an_unmigrated_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    with pytest.raises(schema.SchemaOutOfDate):
+        schema.verify(engine)
+
+    schema.upgrade(engine, "0001")
+    with pytest.raises(schema.SchemaOutOfDate):
+        schema.verify(engine)
+
+
+def test_adopts_a_database_created_without_migrations(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE invoice_items DROP COLUMN no_of_pkts")
+    schema.upgrade(engine)
+    schema.verify(engine)
+    assert "no_of_pkts" in {c["name"] for c in inspect(engine).get_columns("invoice_items")}
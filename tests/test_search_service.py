@@ -0,0 +1,102 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+from types import SimpleNamespace
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app import schema
+from app.services import search_service
+
+OLD_ROWS = [  # indexed before documents were keyed by rowid; customer 1 twice
+    ("customer", 1, 1, "Ravi Traders", "9876500001"),
+    ("product", 1, 1, "Cotton Yarn", "5205"),
+    ("customer", 1, 1, "Ravi Traders Pvt", "9876500001"),
+]
+
+
+def _rows(db):
+    return db.execute(text("SELECT rowid, kind, ref_id, title FROM search_documents ORDER BY rowid")).all()
+
+
+def test_documents_are_keyed_by_rowid(tmp_path):
+    print("Testing search documents keyed by rowid...")
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    schema.upgrade(engine)
+    search_service.ensure_search_schema(engine)
+    db = sessionmaker(bind=engine)()
+
+    customer = SimpleNamespace(id=7, shop_id=1, name="Ravi Traders", phone="98765", gstin=None, party_code=None, city="Erode")
+    search_service.index_customer(db, customer)
+    customer.name = "Ravi Textiles"
+    search_service.index_customer(db, customer)
+    search_service.index_many(db, search_service.KIND_PRODUCT, [{"ref_id": 7, "shop_id": 1, "title": "Cotton"}])
+    search_service.index_many(db, search_service.KIND_PRODUCT, [{"ref_id": 7, "shop_id": 1, "title": "Cotton Yarn"}])
+
+    rows = _rows(db)
+    assert [(r.rowid, r.kind, r.title) for r in rows] == [
+        (search_service.document_rowid("customer", 7), "customer", "Ravi Textiles"),
+        (search_service.document_rowid("product", 7), "product", "Cotton Yarn"),
+    ], rows
+    assert [r["title"] for r in search_service.search(db, 1, "Textiles")] == ["Ravi Textiles"]
+
+    search_service.remove_document(db, search_service.KIND_CUSTOMER, 7)
+    assert [r.kind for r in _rows(db)] == ["product"]
+    print("✅ Rowid keying Passed")
+
+
+def test_migration_rekeys_existing_documents(tmp_path):
+    print("Testing search document re-keying...")
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    schema.upgrade(engine, "0002")
+    with engine.begin() as conn:
+        for kind, ref_id, shop_id, title, body in OLD_ROWS:
+            conn.execute(text(
+                "INSERT INTO search_documents (kind, ref_id, shop_id, title, body) "
+                "VALUES (:kind, :ref_id, :shop_id, :title, :body)"
+            ), {"kind": kind, "ref_id": ref_id, "shop_id": shop_id, "title": title, "body": body})
+
+    schema.upgrade(engine)
+    with engine.connect() as conn:
+        rows = _rows(conn)
+    assert [(r.rowid, r.title) for r in rows] == [(5, "Ravi Traders Pvt"), (6, "Cotton Yarn")], rows
+    print("✅ Migration re-keying Passed")
+
+
+def test_ensure_search_schema_rekeys_tenant_index(tmp_path, monkeypatch):
+    print("Testing tenant index re-keying...")
+    monkeypatch.setattr(search_service, "_fts_tokenizer", search_service._fts_tokenizer)
+    engine = create_engine(f"sqlite:///{tmp_path / 'shop_1.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE search_documents USING fts5("
+            "kind UNINDEXED, ref_id UNINDEXED, shop_id UNINDEXED, title, body, tokenize='unicode61')"
+        ))
+        for kind, ref_id, shop_id, title, body in OLD_ROWS:
+            conn.execute(text(
+                "INSERT INTO search_documents (kind, ref_id, shop_id, title, body) "
+                "VALUES (:kind, :ref_id, :shop_id, :title, :body)"
+            ), {"kind": kind, "ref_id": ref_id, "shop_id": shop_id, "title": title, "body": body})
+
+    search_service.ensure_search_schema(engine)
+    with engine.connect() as conn:
+        rows = _rows(conn)
+        create_sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'search_documents'")).scalar()
+    assert [(r.rowid, r.title) for r in rows] == [(5, "Ravi Traders Pvt"), (6, "Cotton Yarn")], rows
+    assert "unicode61" in create_sql
+    print("✅ Tenant re-keying Passed")
+
+
+def test_unknown_kinds_and_like_wildcards(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    schema.upgrade(engine)
+    search_service.ensure_search_schema(engine)
+    db = sessionmaker(bind=engine)()
+    search_service.index_many(db, search_service.KIND_PRODUCT, [
+        {"ref_id": 1, "shop_id": 1, "title": "Yarn 5% off"},
+        {"ref_id": 2, "shop_id": 1, "title": "Yarn 50 off"},
+    ])
+
+    assert search_service.search(db, 1, "Yarn", kinds=["supplier"]) == []
+    if search_service._fts_tokenizer == "trigram":  # short terms go through LIKE
+        assert [r["title"] for r in search_service.search(db, 1, "5%")] == ["Yarn 5% off"]
+        assert search_service.search(db, 1, "n_5") == []
@@ -0,0 +1,47 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+import zipfile
+from datetime import date
+from io import BytesIO
+from app.services import statement_service
+
+
+def _statement(customer_id, name):
+    return {"customer": {"id": customer_id, "name": name}, "entries": []}
+
+
+def _zip(statements, render_html):
+    data = b"".join(statement_service.stream_pdf_zip(iter(statements), render_html, date(2026, 3, 31)))
+    return zipfile.ZipFile(BytesIO(data))
+
+
+def test_same_name_customers_get_separate_entries():
+    print("Testing statement ZIP entry names...")
+    archive = _zip([_statement(1, "Ravi Traders"), _statement(2, "Ravi Traders")],
+                   lambda s: f"<p>{s['customer']['id']}</p>")
+
+    names = archive.namelist()
+    assert names == ["Statement-Ravi-Traders-1-2026-03-31.pdf", "Statement-Ravi-Traders-2-2026-03-31.pdf"], names
+    print("✅ Entry names Passed")
+
+
+def test_failed_pdf_leaves_error_entry(monkeypatch):
+    print("Testing failed statement render...")
+    from xhtml2pdf import pisa
+    create_pdf = pisa.CreatePDF
+
+    def flaky_create_pdf(html, dest):
+        status = create_pdf("<p>ok</p>", dest=dest)
+        if "broken" in html:
+            status.err = 1
+        return status
+
+    monkeypatch.setattr(pisa, "CreatePDF", flaky_create_pdf)
+    archive = _zip([_statement(1, "Good"), _statement(2, "Bad")],
+                   lambda s: "broken" if s["customer"]["id"] == 2 else "fine")
+
+    names = archive.namelist()
+    assert names == ["Statement-Good-1-2026-03-31.pdf", "Statement-Bad-2-2026-03-31.error.txt"], names
+    assert b"customer 2" in archive.read(names[1])
+    print("✅ Failed render Passed")
@@ -0,0 +1,69 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models, tenancy
+from app.database import Base, TenantSession
+
+
+def _setup(tmp_path):
+    # A directory database plus one shop's database
+    directory = create_engine(f"sqlite:///{tmp_path / 'directory.db'}")
+    shop = create_engine(f"sqlite:///{tmp_path / 'shop_1.db'}")
+    Base.metadata.create_all(bind=directory)
+    Base.metadata.create_all(bind=shop, tables=tenancy.tenant_tables())
+    with directory.begin() as conn:
+        conn.execute(models.Shop.__table__.insert().values(id=1, name="Shop"))
+    factory = sessionmaker(class_=TenantSession, bind=directory, tenant_tables=tenancy.TENANT_TABLES)
+    return factory, directory, shop
+
+
+def test_shop_data_goes_to_the_tenant_database(tmp_path):
+    factory, directory, shop = _setup(tmp_path)
+    db = factory()
+    db.bind_tenant(shop)
+    assert db.get(models.Shop, 1).name == "Shop"
+    db.add(models.Customer(shop_id=1, name="Acme"))
+    db.commit()
+    db.close()
+
+    with shop.connect() as conn:
+        assert conn.execute(models.Customer.__table__.select()).one().name == "Acme"
+    with directory.connect() as conn:
+        assert conn.execute(models.Customer.__table__.select()).first() is None
+
+
+def test_unbound_session_refuses_shop_data(tmp_path):
+    factory, directory, shop = _setup(tmp_path)
+    db = factory()
+    assert db.get(models.Shop, 1).name == "Shop"
+    with pytest.raises(RuntimeError):
+        db.query(models.Customer).all()
+    db.bind_tenant(shop)
+    with pytest.raises(RuntimeError):
+        db.bind_tenant(create_engine("sqlite://"))
+    db.close()
+
+
+def test_engine_cache_evicts_least_recently_used(monkeypatch):
+    created = []
+
+    def fake_engine(shop_id):
+        created.append(shop_id)
+        return create_engine("sqlite://")
+
+    monkeypatch.setattr(tenancy, "_create_tenant_engine", fake_engine)
+    cache = tenancy.TenantEngines(2)
+    first = cache.get(1)
+    cache.get(2)
+    assert cache.get(1) is first  # 1 is now the most recently used
+    cache.get(3)                  # evicts 2
+    assert len(cache) == 2
+    cache.get(2)
+    assert created == [1, 2, 3, 2]
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,51 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+from types import SimpleNamespace
+
+from app.services import typeahead_service
+
+
+def _customer(id, name, phone=None, gstin=None, city=None):
+    return SimpleNamespace(id=id, shop_id=1, name=name, state="Tamil Nadu", state_code="33", gstin=gstin,
+                           phone=phone, place_of_supply="Tamil Nadu", party_code=None, city=city)
+
+
+def _index():
+    index = typeahead_service.TypeaheadIndex()
+    index.load(typeahead_service._customer_entry(c) for c in [
+        _customer(1, "Sri Ravi Textiles", phone="9876500001"),
+        _customer(2, "Ravi Traders", city="Erode"),
+        _customer(3, "Kumar Ravindra Mills", gstin="33ABCDE1234F1Z5"),
+        _customer(4, "Anand Yarns", city="Ravipuram"),
+        _customer(5, "Balaji Cotton", phone="9123456789"),
+    ])
+    return index
+
+
+def _names(results):
+    return [r["name"] for r in results]
+
+
+def test_lookup_ranks_leading_matches_first():
+    print("Testing typeahead ranking...")
+    index = _index()
+    # A name starting with the query wins, then the other word-prefix hits by name
+    assert _names(index.lookup("ravi")) == ["Ravi Traders", "Anand Yarns", "Kumar Ravindra Mills", "Sri Ravi Textiles"]
+    # Every query word has to match; order doesn't matter
+    assert _names(index.lookup("textiles ravi")) == ["Sri Ravi Textiles"]
+    assert _names(index.lookup("ravi", limit=2)) == ["Ravi Traders", "Anand Yarns"]
+    print("✅ Typeahead ranking Passed")
+
+
+def test_lookup_falls_back_to_substrings_and_sees_writes():
+    print("Testing typeahead substring fallback and write-through...")
+    index = _index()
+    assert _names(index.lookup("3456")) == ["Balaji Cotton"]  # middle digits of a phone
+    assert _names(index.lookup("abcde1234")) == ["Kumar Ravindra Mills"]  # middle of a GSTIN
+
+    index.add(*typeahead_service._customer_entry(_customer(2, "Lakshmi Traders", city="Erode")))
+    index.remove(1)
+    assert _names(index.lookup("ravi")) == ["Anand Yarns", "Kumar Ravindra Mills"]
+    assert _names(index.lookup("lak")) == ["Lakshmi Traders"]
+    print("✅ Typeahead fallback Passed")
@@ -0,0 +1,81 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+import hashlib
+import io
+
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.datastructures import Headers, UploadFile
+
+from app import models
+from app import storage as storage_module
+from app.database import Base
+from app.routers import settings as settings_router
+from app.services import image_service, upload_service
+
+
+def _png(color):
+    out = io.BytesIO()
+    Image.new("RGB", (40, 20), color).save(out, "PNG")
+    return out.getvalue()
+
+
+def _setup(monkeypatch, tmp_path):
+    local = storage_module.LocalStorage(str(tmp_path / "uploads"))
+    monkeypatch.setattr(storage_module, "_storage", local)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return local, sessionmaker(bind=engine)()
+
+
+def _save(data, subdirectory="logos"):
+    upload = UploadFile(io.BytesIO(data), filename="logo.png", headers=Headers({"content-type": "image/png"}))
+    return settings_router.save_upload_file(upload, subdirectory)
+
+
+def _files(local, directory):
+    return sorted(o.path for o in local.list_objects(directory))
+
+
+def test_identical_uploads_share_one_object(monkeypatch, tmp_path):
+    print("Testing content-addressed dedupe...")
+    local, db = _setup(monkeypatch, tmp_path)
+
+    first = _save(_png("red"))
+    second = _save(_png("red"))
+    other = _save(_png("blue"))
+
+    assert first.url == second.url != other.url
+    assert first.url == f"/static/uploads/logos/{hashlib.sha256(_png('red')).hexdigest()}.png"
+    assert [v["variant"] for v in first.variants] == [image_service.VARIANT_PRINT, image_service.VARIANT_SCREEN]
+    assert second.variants is None, "a deduplicated upload reuses the recorded variants"
+    assert len(_files(local, "logos")) == 6  # two originals, each with a print and a screen variant
+    db.close()
+    print("✅ Dedupe Passed")
+
+
+def test_shared_objects_are_collected_only_when_unreferenced(monkeypatch, tmp_path):
+    print("Testing garbage collection of shared uploads...")
+    local, db = _setup(monkeypatch, tmp_path)
+    saved = _save(_png("red"))
+    image_service.record_variants(db, saved.url, saved.variants)
+    shops = [models.Shop(name="A", logo_path=saved.url), models.Shop(name="B", logo_path=saved.url)]
+    db.add_all(shops)
+    db.commit()
+
+    assert upload_service.reference_counts(db, [saved.url]) == {saved.url: 2}
+    shops[0].logo_path = None
+    db.commit()
+    report = upload_service.sweep_orphans(db, grace_hours=0, storage=local)
+    assert report["deleted"] == 0 and len(_files(local, "logos")) == 3, "still used by shop B"
+
+    shops[1].logo_path = None
+    db.commit()
+    report = upload_service.sweep_orphans(db, grace_hours=0, storage=local)
+    assert report["deleted"] == 3 and report["variant_rows"] == 2
+    assert _files(local, "logos") == []
+    db.close()
+    print("✅ Shared upload GC Passed")
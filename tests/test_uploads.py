@@ -0,0 +1,78 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+import io
+
+import pytest
+from fastapi import HTTPException
+from starlette.datastructures import Headers, UploadFile
+
+from app import storage as storage_module
+from app.routers import settings as settings_router
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+class CountingReader(io.BytesIO):
+    """An upload body that records how much of it was read."""
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, n=-1):
+        chunk = super().read(n)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def _use_local_storage(monkeypatch, tmp_path):
+    local = storage_module.LocalStorage(str(tmp_path / "uploads"))
+    monkeypatch.setattr(storage_module, "_storage", local)
+    return tmp_path / "uploads"
+
+
+def _upload(body, filename="logo.png", content_type="image/png"):
+    return UploadFile(body, filename=filename, headers=Headers({"content-type": content_type}))
+
+
+def _stored_files(root):
+    return sorted(p.relative_to(root).as_posix() for p in root.rglob("*") if p.is_file())
+
+
+def test_oversized_upload_stops_reading_and_stores_nothing(monkeypatch, tmp_path):
+    print("Testing streamed upload size limit...")
+    root = _use_local_storage(monkeypatch, tmp_path)
+    limit = settings_router.MAX_UPLOAD_BYTES
+    body = CountingReader(PNG_HEADER + b"\0" * (3 * limit))
+
+    with pytest.raises(HTTPException) as e:
+        settings_router.save_upload_file(_upload(body), "logos")
+
+    assert e.value.status_code == 400 and "too large" in e.value.detail
+    # Rejected within one chunk of the limit, not after reading the whole body
+    assert body.bytes_read <= limit + storage_module.UPLOAD_CHUNK_BYTES
+    assert _stored_files(root) == [], "no partial or temporary file may be left behind"
+    print("✅ Upload size limit Passed")
+
+
+def test_upload_at_the_limit_is_accepted(monkeypatch, tmp_path):
+    root = _use_local_storage(monkeypatch, tmp_path)
+    body = io.BytesIO(b"<svg xmlns='http://www.w3.org/2000/svg'/>".ljust(settings_router.MAX_UPLOAD_BYTES, b" "))
+
+    saved = settings_router.save_upload_file(_upload(body, "logo.svg", "image/svg+xml"), "logos")
+
+    assert saved.url.startswith("/static/uploads/logos/") and saved.variants == []
+    assert os.path.getsize(root / saved.url.replace("/static/uploads/", "")) == settings_router.MAX_UPLOAD_BYTES
+
+
+def test_content_is_sniffed_from_the_first_chunk(monkeypatch, tmp_path):
+    root = _use_local_storage(monkeypatch, tmp_path)
+    body = CountingReader(b"MZ" + b"\0" * (10 * storage_module.UPLOAD_CHUNK_BYTES))
+
+    with pytest.raises(HTTPException) as e:
+        settings_router.save_upload_file(_upload(body), "logos")
+
+    assert e.value.status_code == 400 and "not a supported image" in e.value.detail
+    assert body.bytes_read == storage_module.UPLOAD_CHUNK_BYTES
+    assert _stored_files(root) == []
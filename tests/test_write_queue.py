@@ -0,0 +1,115 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from app import write_queue
+
+
+def _notes_db(tmp_path):
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE notes (id INTEGER PRIMARY KEY, body TEXT NOT NULL)"))
+    return url, engine
+
+
+def _add_note(body, fail=False):
+    def job(db):
+        db.execute(text("INSERT INTO notes (body) VALUES (:body)"), {"body": body})
+        if fail:
+            raise ValueError(f"{body} failed")
+        return body
+    return job
+
+
+def _bodies(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT body FROM notes ORDER BY id")).scalars().all()
+
+
+def test_writer_lock_hands_turns_over_in_order(tmp_path):
+    lock = write_queue.WriterLock(str(tmp_path / "app.db-writer.lock"))
+    order = []
+    lock.acquire()
+
+    def writer(name):
+        with lock:
+            order.append(name)
+
+    threads = []
+    for name in ("first", "second", "third"):
+        thread = threading.Thread(target=writer, args=(name,))
+        thread.start()
+        threads.append(thread)
+        while len(lock._waiters) < len(threads):  # queued in start order
+            time.sleep(0.001)
+
+    lock.release()
+    for thread in threads:
+        thread.join(5)
+    assert order == ["first", "second", "third"]
+
+
+def test_writer_lock_times_out_across_processes(tmp_path):
+    # Two instances on one file behave like two worker processes
+    path = str(tmp_path / "app.db-writer.lock")
+    worker_a, worker_b = write_queue.WriterLock(path), write_queue.WriterLock(path)
+    worker_a.acquire()
+    with pytest.raises(write_queue.WriteQueueTimeout):
+        worker_b.acquire(timeout=0.05)
+
+    worker_a.release()
+    worker_b.acquire(timeout=1)
+    worker_b.release()
+    assert not worker_b._held and not worker_b._waiters
+
+
+def test_installed_engine_serializes_write_transactions(tmp_path):
+    url, engine = _notes_db(tmp_path)
+    write_queue.install(engine, write_queue.WriterLock(write_queue.lock_path(engine)))
+    Session = sessionmaker(bind=engine)
+    events = []
+
+    first = Session()
+    first.execute(text("INSERT INTO notes (body) VALUES ('first')"))  # takes the writer turn
+
+    def second_writer():
+        db = Session()
+        db.execute(text("INSERT INTO notes (body) VALUES ('second')"))
+        events.append("second wrote")
+        db.commit()
+        db.close()
+
+    thread = threading.Thread(target=second_writer)
+    thread.start()
+    time.sleep(0.1)
+    assert events == []  # waiting for the lock, not failing with "database is locked"
+
+    events.append("first committed")
+    first.commit()
+    first.close()  # connection back to the pool: turn handed over
+    thread.join(5)
+    assert events == ["first committed", "second wrote"]
+    assert _bodies(engine) == ["first", "second"]
+
+
+def test_failing_job_rolls_back_only_its_savepoint(tmp_path):
+    url, engine = _notes_db(tmp_path)
+    writes = write_queue.WriteQueue(url, write_queue.WriterLock(str(tmp_path / "queue.lock")), max_batch=10, window_ms=200)
+    commits = []
+    event.listen(writes.engine, "commit", lambda conn: commits.append(1))
+
+    futures = [writes.submit(_add_note("one")), writes.submit(_add_note("broken", fail=True)), writes.submit(_add_note("two"))]
+
+    assert futures[0].result(5) == "one"
+    with pytest.raises(ValueError):
+        futures[1].result(5)
+    assert futures[2].result(5) == "two"
+    assert _bodies(engine) == ["one", "two"]
+    assert len(commits) == 1, "expected the three jobs to share one commit"